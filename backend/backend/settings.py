@@ -79,6 +79,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'calendar_app.audit.BufferMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -162,6 +163,45 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache holding the ETag version stamps (calendar_app.versioning, no timeout),
+# cohort timetables, feed dirtiness, room occupancy bitmaps and unread counters.
+# They are all invalidated by the process that writes, so every process must
+# share this cache: with several workers, or management commands such as
+# run_jobs and schedule_term, use Redis/Memcached/the database. The in-process
+# LocMemCache default only suits a single-process development server; the
+# calendar_app.W001 system check flags it whenever DEBUG is off.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'academic-calendar',
+    }
+}
+SILENCED_SYSTEM_CHECKS = ['calendar_app.W001'] if DEBUG else []
+
+# Rendered iCalendar subscription feeds (calendar_app.feeds), one file per
+# cohort / tutor / staff audience. Regenerated on demand; safe to delete.
+CALENDAR_FEED_DIR = BASE_DIR / 'feeds'
+
+# Audit log entries are written in one INSERT per request (calendar_app.audit).
+# True hands them to a background thread instead, off the request path.
+AUDIT_LOG_ASYNC = False
+
+# `manage.py archive_audit_logs` moves whole months of audit entries older than
+# AUDIT_RETENTION_DAYS into gzip'd JSON Lines files here; the audit API still
+# serves them. Back this directory up: it is the only copy of those entries.
+AUDIT_ARCHIVE_DIR = BASE_DIR / 'audit_archive'
+AUDIT_RETENTION_DAYS = 180
+
+# Processes hashing passwords during a student import (users.importing);
+# 1 keeps the hashing in the request's process, None uses one per CPU. The
+# import runs inside a web request, so raise it only where the server can
+# spare those processes per upload.
+STUDENT_IMPORT_WORKERS = 1
+
+# Processes a POST /schedule_term/ may start for its restarts (calendar_app.scheduler);
+# 1 searches in the request's process. `manage.py schedule_term --workers` isn't capped.
+SCHEDULE_TERM_MAX_WORKERS = 1
+
 # Use custom user model from the users app
 AUTH_USER_MODEL = 'users.User'
 
@@ -9,7 +9,7 @@ class ScheduledEventAdmin(admin.ModelAdmin):
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ("name",)
+    list_display = ("name", "lecture_hours", "lab_hours")
     search_fields = ("name",)
 
 @admin.register(Room)
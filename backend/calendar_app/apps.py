@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CalendarAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'calendar_app'
+
+    def ready(self):
+        from django.core import checks
+        from . import signals
+        from .checks import check_shared_cache
+        signals.connect()
+        checks.register(check_shared_cache, checks.Tags.caches)
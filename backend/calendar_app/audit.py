@@ -0,0 +1,237 @@
+"""Buffered audit log writes.
+
+Views call `record()` instead of creating AuditLog rows one by one. Inside a
+`batch()` the entries are only collected, and they are written with a single
+bulk_create when the outermost batch ends:
+
+  - BufferMiddleware opens a batch around every request, so a request writes
+    its audit entries in one INSERT, after the view has returned;
+  - code that records many entries outside a request (management commands,
+    the term scheduler) opens its own batch;
+  - a batch left by an exception drops what it collected: the work it
+    describes was rolled back. A nested batch hands its entries to the
+    enclosing one.
+
+Outside any batch `record()` writes the entry straight away.
+
+With `AUDIT_LOG_ASYNC = True` in the settings, flushed entries go to a
+background thread instead (`writer()`), once the surrounding transaction
+commits; the thread writes them in batches of up to BATCH_SIZE on its own
+connection. The request no longer waits for the INSERT, but entries still in
+the thread's queue are lost if the process is killed (a normal exit drains
+it). `manage.py bench_audit` compares the modes.
+
+Every write also adds its entries to the AuditDailyCount rollup (action x
+user x day) in the same transaction, so `daily_counts()` answers the stats
+API from at most one row per day and key instead of scanning the log. The
+rollup counts what was recorded: archiving entries, or deleting them along
+with their event, leaves it as it is.
+"""
+import atexit
+import contextlib
+import contextvars
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import AuditDailyCount, AuditLog
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+# how long the background writer waits for more entries before writing a partial batch
+MAX_DELAY = 0.5
+
+_buffer = contextvars.ContextVar("audit_buffer", default=None)
+
+
+def record(user, action, event=None, notes=""):
+    """Log `action` by `user` (on `event`); written when the current batch ends."""
+    entry = AuditLog(user=user, action=action, event=event, notes=notes, timestamp=timezone.now())
+    buffer = _buffer.get()
+    if buffer is None:
+        flush([entry])
+    else:
+        buffer.append(entry)
+    return entry
+
+
+@contextlib.contextmanager
+def batch():
+    """Collect the entries recorded inside and write them together at the end (see the module docstring)."""
+    parent = _buffer.get()
+    entries = []
+    token = _buffer.set(entries)
+    try:
+        yield entries
+    finally:
+        _buffer.reset(token)
+    # not reached when the block raised: its entries are dropped
+    if parent is not None:
+        parent.extend(entries)
+    else:
+        flush(entries)
+
+
+def flush(entries):
+    """Write `entries` now, or hand them to the background writer in async mode."""
+    if not entries:
+        return
+    if getattr(settings, "AUDIT_LOG_ASYNC", False):
+        # the writer uses another connection: it must only see committed events
+        transaction.on_commit(lambda: writer().submit(entries))
+        return
+    try:
+        # in a savepoint, so a failed write doesn't break the caller's transaction
+        with transaction.atomic():
+            AuditLog.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+            _count(entries)
+    except Exception:
+        logger.exception(f"Failed to write {len(entries)} audit log entries")
+
+
+def _count(entries):
+    """Add `entries` to the daily rollup: one INSERT for the new keys, then one UPDATE per key."""
+    counts = Counter((timezone.localdate(e.timestamp), e.action, e.user_id) for e in entries)
+    AuditDailyCount.objects.bulk_create(
+        [AuditDailyCount(day=day, action=action, user_id=user_id) for day, action, user_id in counts],
+        ignore_conflicts=True,
+    )
+    for (day, action, user_id), n in counts.items():
+        # F() so concurrent writers add up instead of overwriting each other
+        AuditDailyCount.objects.filter(day=day, action=action, user_id=user_id).update(count=F("count") + n)
+
+
+def daily_counts(start, end, actions=None, user_id=None, group_by=()):
+    """Entries per day from `start` to `end` (dates, inclusive), split by the fields in `group_by` ("action", "user").
+
+    Returns dicts with `day`, the group_by fields and `total`, by day then
+    group; combinations with no entries are left out.
+    """
+    qs = AuditDailyCount.objects.filter(day__gte=start, day__lte=end)
+    if actions:
+        qs = qs.filter(action__in=actions)
+    if user_id is not None:
+        qs = qs.filter(user_id=user_id)
+    fields = ["day"] + [{"action": "action", "user": "user_id"}[g] for g in group_by]
+    return list(qs.values(*fields).annotate(total=Sum("count")).order_by(*fields))
+
+
+class Writer:
+    """A thread that writes submitted entries in batches."""
+
+    def __init__(self, batch_size=BATCH_SIZE, max_delay=MAX_DELAY):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, entries):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self.thread.start()
+        for entry in entries:
+            self.queue.put(entry)
+
+    def drain(self):
+        """Block until everything submitted so far is written."""
+        self.queue.join()
+
+    def _next_batch(self):
+        entries = [self.queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(entries) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entries.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return entries
+
+    def _run(self):
+        while True:
+            entries = self._next_batch()
+            try:
+                self._write(entries)
+            finally:
+                close_old_connections()
+                for _ in entries:
+                    self.queue.task_done()
+
+    def _write(self, entries):
+        try:
+            with transaction.atomic():
+                AuditLog.objects.bulk_create(entries, batch_size=self.batch_size)
+                _count(entries)
+            return
+        except Exception:
+            logger.exception(f"Failed to write a batch of {len(entries)} audit log entries, retrying them one by one")
+        # e.g. an event deleted before the batch was written: keep the other entries
+        for entry in entries:
+            try:
+                with transaction.atomic():
+                    entry.save()
+                    _count([entry])
+            except Exception:
+                logger.exception(f"Dropped audit log entry: {entry.action} by user {entry.user_id}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def writer():
+    """The background Writer of this process."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = Writer()
+            atexit.register(_writer.drain)
+        return _writer
+
+
+class BufferMiddleware:
+    """Writes the audit entries of each request together once its view has returned."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        entries = []
+        token = _buffer.set(entries)
+        try:
+            return self.get_response(request)
+        finally:
+            _buffer.reset(token)
+            # Django turns view exceptions into responses: these entries describe committed work
+            flush(entries)
+
+    async def __acall__(self, request):
+        entries = []
+        token = _buffer.set(entries)
+        try:
+            return await self.get_response(request)
+        finally:
+            _buffer.reset(token)
+            if entries:
+                await sync_to_async(flush)(entries)
@@ -0,0 +1,193 @@
+"""Cold storage for old audit log entries: one compressed file per month.
+
+`archive()` (run by `manage.py archive_audit_logs`) moves every whole month
+older than AUDIT_RETENTION_DAYS out of the AuditLog table into
+AUDIT_ARCHIVE_DIR/auditlog-YYYY-MM.jsonl.gz, a gzip'd JSON Lines segment
+holding each entry as the audit API returns it plus `user_id` and
+`event_id`. The entry is rendered when it is archived, so the archive keeps
+its user's email and its event's details after they are deleted. A segment
+is written to a temporary file and renamed into place before the rows are
+deleted, and re-archiving a month merges into its segment by id, so a run
+that stops half way loses or duplicates nothing.
+
+`search()` answers the audit API's filters from the segments, newest month
+first, reading only the months in range. Decoded segments are kept in a
+small in-process cache (keyed by file size and mtime), so paging through
+a month decompresses it once.
+"""
+import datetime
+import functools
+import gzip
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+from .serializers import AuditLogSerializer
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = 1000
+# decoded months kept in memory by search()
+SEGMENT_CACHE_SIZE = 12
+
+_PREFIX = "auditlog-"
+_SUFFIX = ".jsonl.gz"
+
+
+def _directory():
+    return Path(settings.AUDIT_ARCHIVE_DIR)
+
+
+def _month_start(value):
+    return datetime.datetime(value.year, value.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def _next_month(month):
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def segment_path(month):
+    return _directory() / f"{_PREFIX}{month:%Y-%m}{_SUFFIX}"
+
+
+def segments():
+    """{month start: path} of the archived months."""
+    found = {}
+    for path in _directory().glob(f"{_PREFIX}*{_SUFFIX}"):
+        try:
+            month = datetime.datetime.strptime(path.name[len(_PREFIX):-len(_SUFFIX)], "%Y-%m")
+        except ValueError:
+            continue
+        found[month.replace(tzinfo=datetime.timezone.utc)] = path
+    return found
+
+
+def horizon():
+    """End of the newest archived month: archived entries are older than this. None without an archive."""
+    months = segments()
+    return _next_month(max(months)) if months else None
+
+
+def cutoff(retention_days=None):
+    """Start of the oldest month that is kept in the table."""
+    if retention_days is None:
+        retention_days = settings.AUDIT_RETENTION_DAYS
+    return _month_start(timezone.now() - datetime.timedelta(days=retention_days))
+
+
+def _read(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _write_atomic(path, rows):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, separators=(",", ":")) + "\n")
+            f.flush()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _archived_row(entry):
+    row = dict(AuditLogSerializer(entry).data)
+    row["user_id"] = entry.user_id
+    row["event_id"] = entry.event_id
+    return row
+
+
+def archive_month(month):
+    """Move the table's entries of `month` into its segment; returns how many were moved."""
+    qs = AuditLog.objects.with_related().filter(timestamp__gte=month, timestamp__lt=_next_month(month)).order_by("timestamp", "id")
+    rows = [_archived_row(entry) for entry in qs.iterator(chunk_size=2000)]
+    if not rows:
+        return 0
+    path = segment_path(month)
+    existing = _read(path) if path.exists() else []
+    ids = {row["id"] for row in rows}
+    _write_atomic(path, [row for row in existing if row["id"] not in ids] + rows)
+
+    # only once the segment is safely on disk
+    ids = sorted(ids)
+    with transaction.atomic():
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            AuditLog.objects.filter(id__in=ids[i:i + DELETE_BATCH_SIZE]).delete()
+    logger.info(f"Archived {len(rows)} audit log entries of {month:%Y-%m} to {path}")
+    return len(rows)
+
+
+def archive(retention_days=None):
+    """Archive every whole month older than the retention window; returns {month start: entries moved}."""
+    _directory().mkdir(parents=True, exist_ok=True)
+    before = cutoff(retention_days)
+    oldest = AuditLog.objects.filter(timestamp__lt=before).order_by("timestamp").values_list("timestamp", flat=True).first()
+    moved = {}
+    if oldest is None:
+        return moved
+    month = _month_start(oldest)
+    while month < before:
+        count = archive_month(month)
+        if count:
+            moved[month] = count
+        month = _next_month(month)
+    return moved
+
+
+@functools.lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def _segment(path, size, mtime_ns):
+    """The segment's rows as ((timestamp, id), row) pairs, newest first."""
+    # timestamps are stored as the API renders them, "...Z" included
+    rows = [((parse_datetime(row["timestamp"]), row["id"]), row) for row in _read(path)]
+    rows.sort(key=lambda item: item[0], reverse=True)
+    return tuple(rows)
+
+
+def _load(path):
+    stat = os.stat(path)
+    return _segment(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def search(limit, actions=None, user_id=None, start=None, before=None, after=None):
+    """Archived entries matching the audit API filters, newest first: up to `limit` ((timestamp, id), row) pairs.
+
+    `start` is inclusive and `before` exclusive on the timestamp; `after` is a
+    (timestamp, id) keyset position to continue below.
+    """
+    found = []
+    for month, path in sorted(segments().items(), reverse=True):
+        if before is not None and month >= before:
+            continue
+        if after is not None and month > after[0]:
+            continue
+        if start is not None and _next_month(month) <= start:
+            break
+        for key, row in _load(path):
+            timestamp = key[0]
+            if after is not None and key >= after:
+                continue
+            if before is not None and timestamp >= before:
+                continue
+            if start is not None and timestamp < start:
+                break
+            if actions and row["action"] not in actions:
+                continue
+            if user_id is not None and row["user_id"] != user_id:
+                continue
+            found.append((key, row))
+            if len(found) == limit:
+                return found
+    return found
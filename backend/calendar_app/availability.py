@@ -0,0 +1,140 @@
+"""Room availability from cached per-day occupancy bitmaps.
+
+For every day that has been asked about, each room's bookings are folded into
+a bitmap of the minutes it is occupied (bit `m` set = busy during minute `m`
+of the day). A slot [start, end) is free in a room when its own minute mask
+does not intersect the room's bitmap, so answering availability for any slot
+is a handful of integer ANDs and never touches the events table once the day
+is cached.
+
+The per-event masks are kept next to the per-room totals so an edit form can
+ask "free apart from this event" (`exclude_ids`): only the rooms the excluded
+events sit in are re-folded.
+
+Days are cached in the default Django cache. The post_save/post_delete
+handlers in calendar_app.signals invalidate the days an event or repeat rule
+occupied before and after every write; bulk_create() callers go through
+`signals.invalidate_after_bulk_write()`.
+"""
+import itertools
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .conflicts import INACTIVE_STATUSES, to_minutes
+from .models import ScheduledEvent
+from .recurrence import occurrence_dates
+
+# safety net for writes that send no signals (queryset.update(), raw SQL)
+OCCUPANCY_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(day):
+    return f"room-occupancy:{day.isoformat()}"
+
+
+def slot_mask(start_time, end_time):
+    """Bitmap of the minutes in [start_time, end_time)."""
+    start, end = to_minutes(start_time), to_minutes(end_time)
+    if end <= start:
+        return 0
+    return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+
+class DayOccupancy:
+    """Which minutes of one day each room is booked for."""
+
+    def __init__(self, day, events_by_room):
+        self.day = day
+        self.events_by_room = events_by_room  # room_id -> {event_id: mask}
+        self.rooms = {}  # room_id -> OR of its event masks
+        for room_id, masks in events_by_room.items():
+            occupied = 0
+            for mask in masks.values():
+                occupied |= mask
+            self.rooms[room_id] = occupied
+
+    @classmethod
+    def build(cls, day):
+        """Fold every active event (and series occurrence) on `day` into room bitmaps."""
+        return cls.build_many([day])[day]
+
+    @classmethod
+    def build_many(cls, days):
+        """{day: DayOccupancy} for each of `days`, from one query for singles and one for series."""
+        days = set(days)
+        first, last = min(days), max(days)
+        # singles and series in separate queries so the singles keep their date index range
+        events = ScheduledEvent.objects.filter(room__isnull=False).exclude(status__in=INACTIVE_STATUSES)
+        rows = itertools.chain.from_iterable(
+            part.values_list(
+                "id", "date", "start_time", "end_time", "room_id",
+                "recurrence__frequency", "recurrence__interval", "recurrence__until", "recurrence__exceptions",
+            )
+            for part in (events.singles().filter(date__in=days), events.series_in_window(first, last))
+        )
+        by_day = {day: {} for day in days}
+        for event_id, date, start_time, end_time, room_id, frequency, interval, until, exceptions in rows:
+            if frequency is None:
+                dates = [date]
+            else:
+                dates = [d for d in occurrence_dates(date, frequency, interval, until, exceptions, first, last) if d in days]
+            mask = slot_mask(start_time, end_time)
+            for d in dates:
+                room = by_day[d].setdefault(room_id, {})
+                room[event_id] = room.get(event_id, 0) | mask
+        return {day: cls(day, events_by_room) for day, events_by_room in by_day.items()}
+
+    def busy_rooms(self, start_time, end_time, exclude_ids=()):
+        """Ids of the rooms booked at any point of [start_time, end_time)."""
+        mask = slot_mask(start_time, end_time)
+        exclude = set(exclude_ids)
+        busy = set()
+        for room_id, occupied in self.rooms.items():
+            if not occupied & mask:
+                continue
+            masks = self.events_by_room[room_id]
+            if exclude and not exclude.isdisjoint(masks):
+                occupied = 0
+                for event_id, event_mask in masks.items():
+                    if event_id not in exclude:
+                        occupied |= event_mask
+                if not occupied & mask:
+                    continue
+            busy.add(room_id)
+        return busy
+
+
+def day_occupancy(day):
+    """The DayOccupancy for `day`, from the cache when possible."""
+    key = _cache_key(day)
+    events_by_room = cache.get(key)
+    if events_by_room is None:
+        occupancy = DayOccupancy.build(day)
+        cache.set(key, occupancy.events_by_room, OCCUPANCY_CACHE_TIMEOUT)
+        return occupancy
+    return DayOccupancy(day, events_by_room)
+
+
+def occupancy_for_days(days):
+    """{day: DayOccupancy} for `days`: cached days are reused, the others rebuilt together by build_many()."""
+    keys = {_cache_key(d): d for d in days}
+    result = {keys[key]: DayOccupancy(keys[key], events_by_room) for key, events_by_room in cache.get_many(keys).items()}
+    missing = [d for d in keys.values() if d not in result]
+    if missing:
+        built = DayOccupancy.build_many(missing)
+        cache.set_many({_cache_key(d): o.events_by_room for d, o in built.items()}, OCCUPANCY_CACHE_TIMEOUT)
+        result.update(built)
+    return result
+
+
+def invalidate_days(days):
+    """Forget the cached occupancy of `days` so the next read rebuilds them.
+
+    Forgotten again once the surrounding transaction commits, so a day rebuilt
+    from the uncommitted state in between doesn't stay cached.
+    """
+    keys = {_cache_key(d) for d in days}
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,25 @@
+"""System checks for deployment settings calendar_app relies on."""
+from django.core import checks
+
+from . import versioning
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when the default cache is per-process.
+
+    Version stamps, cohort timetables, feed dirtiness, room occupancy and
+    unread counters are all invalidated by the process that writes. Another
+    worker, or a management command such as run_jobs or schedule_term, never
+    sees that invalidation through a LocMemCache: ETag validation turns wrong,
+    not just slower.
+    """
+    if versioning.cache_is_shared():
+        return []
+    return [checks.Warning(
+        "The default cache (LocMemCache) is private to each process.",
+        hint=(
+            "Use a shared CACHES backend (Redis, Memcached, database) unless the site runs as one process "
+            "with no management commands writing events. Silence with SILENCED_SYSTEM_CHECKS = ['calendar_app.W001']."
+        ),
+        id="calendar_app.W001",
+    )]
@@ -0,0 +1,179 @@
+"""Double-booking detection for tutors and rooms.
+
+Events are grouped per (resource, date) into an `IntervalIndex` bucket: the
+intervals sorted by start time plus a running maximum of their end times. An
+overlap query for [start, end) binary-searches the last interval starting
+before `end` and walks backwards only while the running maximum end is still
+after `start`, so it touches the overlapping intervals and stops.
+
+`find_conflicts()` answers a slot (on one date, or on every date of a
+series) for a tutor and a room with two queries, one for single events and
+one for series; `ConflictIndex.load()` preloads every bucket needed to
+validate many slots at once (bulk creation), and new slots can be added to
+it as they are accepted so later rows are checked against earlier ones
+without hitting the database again.
+
+Recurring series are loaded as one row each and expanded onto the requested
+dates only, so checking against a long series costs no more than checking
+against a single event.
+"""
+import bisect
+import datetime
+import itertools
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db.models import Q
+
+from .models import ScheduledEvent
+from .recurrence import occurrence_dates
+
+# events in these states no longer occupy their tutor or room
+INACTIVE_STATUSES = ("rejected", "cancelled")
+
+TUTOR = "tutor"
+ROOM = "room"
+
+
+def to_minutes(t):
+    return t.hour * 60 + t.minute
+
+
+class _Bucket:
+    __slots__ = ("items", "starts", "max_ends", "dirty")
+
+    def __init__(self):
+        self.items = []  # (start, end, event_id)
+        self.starts = []
+        self.max_ends = []
+        self.dirty = False
+
+    def add(self, start, end, event_id):
+        self.items.append((start, end, event_id))
+        self.dirty = True
+
+    def _build(self):
+        self.items.sort()
+        self.starts = [s for s, _, _ in self.items]
+        self.max_ends = []
+        running = -1
+        for _, e, _ in self.items:
+            running = max(running, e)
+            self.max_ends.append(running)
+        self.dirty = False
+
+    def overlapping(self, start, end, exclude):
+        if self.dirty:
+            self._build()
+        hits = []
+        j = bisect.bisect_left(self.starts, end) - 1
+        while j >= 0 and self.max_ends[j] > start:
+            s, e, event_id = self.items[j]
+            if e > start and event_id not in exclude:
+                hits.append(event_id)
+            j -= 1
+        hits.reverse()
+        return hits
+
+
+class IntervalIndex:
+    """Half-open [start, end) minute intervals bucketed by (kind, resource_id, date)."""
+
+    def __init__(self):
+        self._buckets = defaultdict(_Bucket)
+
+    def add(self, kind, resource_id, date, start, end, event_id=None):
+        if resource_id is None:
+            return
+        self._buckets[(kind, resource_id, date)].add(start, end, event_id)
+
+    def overlapping(self, kind, resource_id, date, start, end, exclude=()):
+        bucket = self._buckets.get((kind, resource_id, date))
+        if bucket is None:
+            return []
+        return bucket.overlapping(start, end, exclude)
+
+
+@dataclass
+class Conflicts:
+    tutor: list = field(default_factory=list)
+    room: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.tutor or self.room)
+
+
+class ConflictIndex:
+    """An IntervalIndex over ScheduledEvent rows, keyed by tutor and by room."""
+
+    def __init__(self):
+        self.index = IntervalIndex()
+
+    @classmethod
+    def load(cls, dates, tutor_ids=(), room_ids=()):
+        """Load every active event on `dates` that uses one of the given tutors or rooms.
+
+        Two queries: the single events dated on `dates`, and the series still running then.
+        """
+        ci = cls()
+        resources = {}
+        if tutor_ids:
+            resources["tutor_id"] = set(tutor_ids)
+        if room_ids:
+            resources["room_id"] = set(room_ids)
+        if not dates or not resources:
+            return ci
+        dates = set(dates)
+        first, last = min(dates), max(dates)
+        # singles through their (resource, date) index range, series from the live repeat rules
+        events = ScheduledEvent.objects.exclude(status__in=INACTIVE_STATUSES)
+        resource_q = Q()
+        for field, ids in resources.items():
+            resource_q |= Q(**{f"{field}__in": ids})
+        singles = events.filter(resource_q).singles().filter(date__in=dates).values_list(
+            "id", "date", "start_time", "end_time", "tutor_id", "room_id",
+        )
+        for event_id, date, start_time, end_time, tutor_id, room_id in singles:
+            ci.add(date, start_time, end_time, tutor_id, room_id, event_id)
+        series = events.series_using(first, last, **resources).values_list(
+            "id", "date", "start_time", "end_time", "tutor_id", "room_id",
+            "recurrence__frequency", "recurrence__interval", "recurrence__until", "recurrence__exceptions",
+        )
+        for event_id, date, start_time, end_time, tutor_id, room_id, frequency, interval, until, exceptions in series:
+            for d in occurrence_dates(date, frequency, interval, until, exceptions, first, last):
+                if d in dates:
+                    ci.add(d, start_time, end_time, tutor_id, room_id, event_id)
+        return ci
+
+    def add(self, date, start_time, end_time, tutor_id, room_id, event_id=None):
+        start, end = to_minutes(start_time), to_minutes(end_time)
+        self.index.add(TUTOR, tutor_id, date, start, end, event_id)
+        self.index.add(ROOM, room_id, date, start, end, event_id)
+
+    def check(self, date, start_time, end_time, tutor_id=None, room_id=None, exclude_ids=()):
+        start, end = to_minutes(start_time), to_minutes(end_time)
+        exclude = set(exclude_ids)
+        return Conflicts(
+            tutor=self.index.overlapping(TUTOR, tutor_id, date, start, end, exclude) if tutor_id else [],
+            room=self.index.overlapping(ROOM, room_id, date, start, end, exclude) if room_id else [],
+        )
+
+    def check_dates(self, dates, start_time, end_time, tutor_id=None, room_id=None, exclude_ids=()):
+        """Like check(), for the same slot repeated on each of `dates`; ids are reported once."""
+        tutor, room = {}, {}
+        for d in dates:
+            c = self.check(d, start_time, end_time, tutor_id, room_id, exclude_ids)
+            tutor.update(dict.fromkeys(c.tutor))
+            room.update(dict.fromkeys(c.room))
+        return Conflicts(tutor=list(tutor), room=list(room))
+
+
+def find_conflicts(dates, start_time, end_time, tutor_id=None, room_id=None, exclude_ids=()):
+    """Return the ids of active events double-booking `tutor_id` or `room_id` in the slot.
+
+    `dates` is a single date or every occurrence date of a series.
+    """
+    if isinstance(dates, datetime.date):
+        dates = [dates]
+    ci = ConflictIndex.load(dates, [tutor_id] if tutor_id else (), [room_id] if room_id else ())
+    return ci.check_dates(dates, start_time, end_time, tutor_id, room_id, exclude_ids)
@@ -0,0 +1,241 @@
+"""Per-user iCalendar (RFC 5545) subscription feeds, rendered to disk per audience.
+
+A feed URL carries a secret token (CalendarFeed). The token resolves to an
+audience, the same way scheduledevents_list scopes what a user sees:
+
+  - students: their (major, year) cohort, `cohort-{major}-{year}`
+    (everything, `all`, if the profile names no cohort; nothing, `none`,
+    without a profile);
+  - tutors: the events they teach, `tutor-{user_id}`;
+  - staff: every event, `all`.
+
+Only approved events are published, as in the CSV export. Series become one
+VEVENT with an RRULE and EXDATEs, so a feed never expands occurrences.
+
+Each audience is rendered once to CALENDAR_FEED_DIR/{audience}.ics, next to a
+{audience}.json sidecar holding every VEVENT already rendered along with its
+event's `updated_at`. Event writes bump the audience's version stamp
+(`mark_changed()`, from the model signals and the bulk writers); the next
+poll re-renders only the events whose `updated_at` moved and splices the file
+back together. While nothing changes a poll costs cache reads and one file
+read, and no database query.
+"""
+import hashlib
+import json
+import logging
+import os
+import secrets
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import timetables, versioning
+from .models import CalendarFeed, Course, ScheduledEvent
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_TIMEOUT = 24 * 3600
+RENDER_BATCH_SIZE = 500
+
+ALL = "all"
+NONE = "none"
+STAFF_ROLES = ("administrator", "department_assistant", "academic_assistant")
+
+PRODID = "-//Academic Calendar//Timetable feed//EN"
+
+
+def _token_key(token):
+    return f"feed-token:{token}"
+
+
+def _rendered_key(audience):
+    return f"feed-rendered:{audience}"
+
+
+def _version_scope(audience):
+    return f"feed:{audience}"
+
+
+def cohort_audience(major_id, year):
+    return f"cohort-{major_id}-{year}"
+
+
+def tutor_audience(user_id):
+    return f"tutor-{user_id}"
+
+
+def token_for(user):
+    """The user's feed token, created on first use."""
+    feed = CalendarFeed.objects.filter(user=user).first()
+    if feed is None:
+        feed = CalendarFeed.objects.create(user=user, token=secrets.token_urlsafe(32))
+    return feed.token
+
+
+def rotate_token(user):
+    """Replace the user's token; subscriptions made with the old one stop working."""
+    old = CalendarFeed.objects.filter(user=user).values_list("token", flat=True).first()
+    token = secrets.token_urlsafe(32)
+    CalendarFeed.objects.update_or_create(user=user, defaults={"token": token})
+    if old:
+        cache.delete(_token_key(old))
+    return token
+
+
+def forget_user(user_id):
+    """Drop the cached token -> user resolution after the user (e.g. their role) changes."""
+    token = CalendarFeed.objects.filter(user_id=user_id).values_list("token", flat=True).first()
+    if token:
+        cache.delete(_token_key(token))
+
+
+def audience_for_token(token):
+    """Audience name for a feed token, or None for an unknown token."""
+    key = _token_key(token)
+    owner = cache.get(key)
+    if owner is None:
+        owner = CalendarFeed.objects.filter(token=token).values_list("user_id", "user__role").first()
+        if owner is None:
+            return None
+        cache.set(key, tuple(owner), FEED_CACHE_TIMEOUT)
+    user_id, role = owner
+    if role == "tutor":
+        return tutor_audience(user_id)
+    if role == "student":
+        cohort = timetables.student_cohort(user_id)
+        if cohort == timetables.NO_PROFILE:
+            return NONE
+        return cohort_audience(*cohort) if cohort else ALL
+    if role in STAFF_ROLES:
+        return ALL
+    return NONE
+
+
+def mark_changed(cohorts=(), tutor_ids=()):
+    """Record that events of these cohorts / tutors changed; their feeds and `all` re-render on next poll."""
+    scopes = [_version_scope(cohort_audience(m, y)) for m, y in cohorts if m is not None]
+    scopes += [_version_scope(tutor_audience(t)) for t in tutor_ids if t is not None]
+    versioning.bump(_version_scope(ALL), *scopes)
+
+
+def mark_events(events):
+    """mark_changed() for `events` written without model signals (bulk_create)."""
+    cohorts = Course.objects.filter(id__in={e.course_id for e in events}).values_list("major_id", "year")
+    mark_changed(set(cohorts), {e.tutor_id for e in events})
+
+
+def version(audience):
+    """Digest of everything the audience's rendering depends on."""
+    scopes = (_version_scope(audience), *timetables.NAME_SCOPES)
+    stamps = versioning.versions(scopes)
+    return hashlib.md5(",".join(str(stamps[s]) for s in scopes).encode()).hexdigest()
+
+
+def _events(audience):
+    qs = ScheduledEvent.objects.filter(status="approved")
+    if audience == ALL:
+        return qs
+    if audience == NONE:
+        return qs.none()
+    kind, _, rest = audience.partition("-")
+    if kind == "tutor":
+        return qs.filter(tutor_id=int(rest))
+    major_id, year = rest.split("-")
+    return qs.filter(course__major_id=int(major_id), course__year=int(year))
+
+
+def _escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces joined by CRLF + space (RFC 5545 3.1)."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, start, width = [], 0, 75
+    while start < len(raw):
+        end = min(start + width, len(raw))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:  # never split a UTF-8 sequence
+            end -= 1
+        parts.append(raw[start:end].decode())
+        start, width = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _stamp(d, t):
+    return f"{d:%Y%m%d}T{t:%H%M%S}"
+
+
+def render_event(row):
+    """One VEVENT for an `as_rows()` dict; times are floating (the calendar's local time)."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{row['id']}@academic-calendar",
+        f"DTSTAMP:{row['updated_at']:%Y%m%dT%H%M%SZ}",
+        f"DTSTART:{_stamp(row['date'], row['start_time'])}",
+        f"DTEND:{_stamp(row['date'], row['end_time'])}",
+        f"SUMMARY:{_escape(row['course_name'])} - {_escape(row['title'])} ({_escape(row['event_type'])})",
+        f"DESCRIPTION:Tutor: {_escape(row['tutor_username'] or 'TBD')}",
+        f"LOCATION:{_escape(row['room_name'] or 'TBD')}",
+    ]
+    if row["recurrence_frequency"]:
+        lines.append(
+            f"RRULE:FREQ={row['recurrence_frequency'].upper()};INTERVAL={row['recurrence_interval']};"
+            f"UNTIL={row['recurrence_until']:%Y%m%d}T235959"
+        )
+        if row["recurrence_exceptions"]:
+            lines.append("EXDATE:" + ",".join(
+                f"{d.replace('-', '')}T{row['start_time']:%H%M%S}" for d in sorted(row["recurrence_exceptions"])
+            ))
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def _write_atomic(path, text):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def render(audience):
+    """Bring the audience's .ics up to date, re-rendering only changed events; returns how many were rendered."""
+    directory = Path(settings.CALENDAR_FEED_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    sidecar = directory / f"{audience}.json"
+    try:
+        previous = json.loads(sidecar.read_text())
+    except (OSError, ValueError):
+        previous = {}
+
+    qs = _events(audience)
+    current = {str(pk): updated_at.isoformat() for pk, updated_at in qs.values_list("id", "updated_at")}
+    fragments = {pk: previous[pk] for pk, stamp in current.items() if pk in previous and previous[pk][0] == stamp}
+    stale = [int(pk) for pk in current if pk not in fragments]
+    for i in range(0, len(stale), RENDER_BATCH_SIZE):
+        for row in qs.filter(id__in=stale[i:i + RENDER_BATCH_SIZE]).as_rows():
+            fragments[str(row["id"])] = [row["updated_at"].isoformat(), render_event(row)]
+
+    body = "".join(fragments[pk][1] for pk in sorted(fragments, key=int))
+    header = "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN", "METHOD:PUBLISH",
+        "X-WR-CALNAME:Academic Calendar",
+    ))
+    _write_atomic(directory / f"{audience}.ics", header + body + "END:VCALENDAR\r\n")
+    _write_atomic(sidecar, json.dumps(fragments))
+    logger.info(f"Rendered feed {audience}: {len(stale)} of {len(fragments)} events re-rendered")
+    return len(stale)
+
+
+def feed_file(audience):
+    """(path to the audience's up-to-date .ics, version); renders first if events changed since last time."""
+    current = version(audience)
+    path = Path(settings.CALENDAR_FEED_DIR) / f"{audience}.ics"
+    if cache.get(_rendered_key(audience)) != current or not path.exists():
+        render(audience)
+        cache.set(_rendered_key(audience), current, FEED_CACHE_TIMEOUT)
+    return path, current
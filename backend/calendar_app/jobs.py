@@ -0,0 +1,126 @@
+"""A small database-backed job queue for work that should not hold up a request.
+
+`enqueue()` inserts a Job row in the caller's transaction, so a job exists
+exactly when the write that caused it committed, and the request only pays
+for that one INSERT. `manage.py run_jobs` polls for due jobs and runs them:
+
+  - claim: up to `batch_size` due jobs are marked `running` under the
+    worker's name in one UPDATE (with SELECT ... FOR UPDATE SKIP LOCKED where
+    the database has it), so concurrent workers never run the same job;
+  - run: each job's handler runs in its own transaction together with the
+    deletion of the job, so a handler that fails half way leaves nothing
+    behind and is simply run again;
+  - retry: a failed job is queued again after an exponential backoff
+    (RETRY_BASE_DELAY * 2 ** (attempts - 1), at most RETRY_MAX_DELAY) and
+    marked `failed` after MAX_ATTEMPTS;
+  - recovery: a job left `running` for LOCK_TIMEOUT (its worker died) is
+    claimed again.
+
+Handlers are looked up by `Job.kind` in HANDLERS and called with the job's
+payload as keyword arguments.
+"""
+import datetime
+import logging
+import os
+import socket
+import traceback
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+NOTIFY = "notify"
+
+HANDLERS = {
+    NOTIFY: "calendar_app.notifications.deliver",
+}
+
+DEFAULT_BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = datetime.timedelta(seconds=30)
+RETRY_MAX_DELAY = datetime.timedelta(hours=1)
+LOCK_TIMEOUT = datetime.timedelta(minutes=10)
+
+
+def enqueue(kind, run_after=None, **payload):
+    """Queue a `kind` job; the handler is called with `payload` as keyword arguments."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(kind=kind, payload=payload, run_after=run_after or timezone.now())
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+def claim(worker, batch_size=DEFAULT_BATCH_SIZE):
+    """Mark up to `batch_size` due jobs as running under `worker` and return them, oldest first."""
+    now = timezone.now()
+    stale = now - LOCK_TIMEOUT
+    with transaction.atomic():
+        # a job whose worker died with it running already used up its attempts: give up on it
+        Job.objects.filter(status=Job.RUNNING, locked_at__lt=stale, attempts__gte=MAX_ATTEMPTS).update(
+            status=Job.FAILED, locked_by="", locked_at=None, last_error="Worker lost while running the job",
+        )
+        due = Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale)
+        qs = Job.objects.filter(due).order_by("run_after", "id")
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        ids = list(qs.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return []
+        # re-checking `due` makes the UPDATE a no-op for rows another worker claimed meanwhile
+        Job.objects.filter(due, id__in=ids).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F("attempts") + 1,
+        )
+    return list(Job.objects.filter(id__in=ids, status=Job.RUNNING, locked_by=worker, locked_at=now).order_by("run_after", "id"))
+
+
+def run(job):
+    """Run one claimed job; returns True if it succeeded."""
+    try:
+        handler = import_string(HANDLERS[job.kind])
+        with transaction.atomic():
+            handler(**job.payload)
+            Job.objects.filter(id=job.id).delete()
+        return True
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= MAX_ATTEMPTS:
+            logger.error(f"Job {job.id} ({job.kind}) failed for good after {job.attempts} attempts:\n{error}")
+            changes = {"status": Job.FAILED}
+        else:
+            delay = retry_delay(job.attempts)
+            logger.warning(f"Job {job.id} ({job.kind}) failed (attempt {job.attempts}), retrying in {delay}:\n{error}")
+            changes = {"status": Job.QUEUED, "run_after": timezone.now() + delay}
+        Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+            locked_by="", locked_at=None, last_error=error, **changes,
+        )
+        return False
+
+
+def run_pending(worker=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Claim and run one batch of due jobs; returns (succeeded, failed)."""
+    jobs = claim(worker or worker_name(), batch_size)
+    succeeded = sum(run(job) for job in jobs)
+    return succeeded, len(jobs) - succeeded
+
+
+def drain(worker=None, batch_size=DEFAULT_BATCH_SIZE):
+    """run_pending() until no job is due; returns the total (succeeded, failed)."""
+    total_ok = total_failed = 0
+    while True:
+        ok, failed = run_pending(worker, batch_size)
+        if not ok and not failed:
+            return total_ok, total_failed
+        total_ok += ok
+        total_failed += failed
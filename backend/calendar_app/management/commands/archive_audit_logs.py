@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from calendar_app import audit_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move whole months of audit log entries older than the retention window out of the database "
+        "into compressed monthly archive files. The audit API keeps serving them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days", type=int, default=None,
+            help=f"days of history kept in the table (default AUDIT_RETENTION_DAYS, {settings.AUDIT_RETENTION_DAYS})",
+        )
+
+    def handle(self, *args, **options):
+        moved = audit_archive.archive(options["retention_days"])
+        for month, count in sorted(moved.items()):
+            self.stdout.write(f"{month:%Y-%m}: {count} entries -> {audit_archive.segment_path(month)}")
+        self.stdout.write(f"Archived {sum(moved.values())} entries from {len(moved)} month(s)")
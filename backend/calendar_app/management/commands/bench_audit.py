@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+import time as timer
+import uuid
+
+from calendar_app import audit
+from calendar_app.models import AuditLog
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark audit log writes per second: one INSERT per entry, buffered batches and the "
+        "background writer. Entries are committed (the writer has its own connection) and removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entries", type=int, default=5000)
+        parser.add_argument("--per-request", type=int, default=20, help="entries recorded per simulated request")
+
+    def handle(self, *args, **options):
+        user = User.objects.create(username=f"bench-audit-{uuid.uuid4().hex[:8]}", role="administrator")
+        try:
+            self.run(user, options["entries"], options["per_request"])
+        finally:
+            audit.writer().drain()
+            # cascades to the entries written
+            user.delete()
+
+    def run(self, user, entries, per_request):
+        requests = range(0, entries, per_request)
+
+        def one_by_one():
+            for i in range(entries):
+                AuditLog.objects.create(user=user, action="createEvent", notes=f"bench {i}")
+
+        def buffered():
+            for start in requests:
+                with audit.batch():
+                    for i in range(start, min(start + per_request, entries)):
+                        audit.record(user, "createEvent", notes=f"bench {i}")
+
+        self.report("one INSERT per entry", entries, self.time(one_by_one))
+        self.report(f"batch per request ({per_request} entries)", entries, self.time(buffered))
+
+        with override_settings(AUDIT_LOG_ASYNC=True):
+            recorded = self.time(buffered)
+            written = recorded + self.time(audit.writer().drain)
+        self.report("background writer, request side", entries, recorded)
+        self.report("background writer, until written", entries, written)
+
+    def time(self, fn):
+        started = timer.perf_counter()
+        fn()
+        return timer.perf_counter() - started
+
+    def report(self, label, entries, seconds):
+        self.stdout.write(f"{label}: {entries} entries in {seconds * 1000:.0f} ms, {entries / seconds:,.0f} writes/s")
@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.contrib.auth import get_user_model
+import random
+import time as timer
+from datetime import date, time, timedelta
+
+from calendar_app.models import Major, Course, Room, ScheduledEvent
+from calendar_app.conflicts import ConflictIndex, find_conflicts
+
+User = get_user_model()
+
+
+def legacy_check(tutor_id, room_id, d, start_time, end_time):
+    """The queryset approach create_event used before calendar_app.conflicts existed."""
+    tutor_conflicts = ScheduledEvent.objects.filter(
+        tutor_id=tutor_id,
+        date=d,
+    ).filter(~Q(end_time__lte=start_time) & ~Q(start_time__gte=end_time))
+    if tutor_conflicts.exists():
+        tutor_conflicts.count()
+        return True
+    room_conflicts = ScheduledEvent.objects.filter(
+        room_id=room_id,
+        date=d,
+    ).filter(~Q(end_time__lte=start_time) & ~Q(start_time__gte=end_time))
+    if room_conflicts.exists():
+        room_conflicts.count()
+        return True
+    return False
+
+
+class Command(BaseCommand):
+    help = "Benchmark tutor/room conflict detection: legacy querysets vs calendar_app.conflicts. Seeds data in a rolled-back transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=20000)
+        parser.add_argument("--checks", type=int, default=2000)
+        parser.add_argument("--tutors", type=int, default=60)
+        parser.add_argument("--rooms", type=int, default=40)
+        parser.add_argument("--days", type=int, default=120)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            slots = self.seed(rng, options)
+            self.run(slots, options["checks"], rng)
+            transaction.set_rollback(True)
+
+    def seed(self, rng, options):
+        major = Major.objects.create(name=f"bench-{rng.random()}")
+        course = Course.objects.create(name="Bench course", major=major)
+        tutors = [
+            User(username=f"bench-tutor-{rng.random()}-{i}", role="tutor")
+            for i in range(options["tutors"])
+        ]
+        tutors = User.objects.bulk_create(tutors)
+        rooms = Room.objects.bulk_create([Room(name=f"Bench room {i}") for i in range(options["rooms"])])
+        start_day = date(2030, 1, 1)
+
+        def slot():
+            d = start_day + timedelta(days=rng.randrange(options["days"]))
+            hour = rng.randrange(7, 19)
+            return d, time(hour, rng.choice((0, 30))), time(hour + 1, rng.choice((0, 30))), rng.choice(tutors).id, rng.choice(rooms).id
+
+        events = []
+        for _ in range(options["events"]):
+            d, s, e, tutor_id, room_id = slot()
+            events.append(ScheduledEvent(
+                date=d, start_time=s, end_time=e, course=course, tutor_id=tutor_id, room_id=room_id,
+                event_type="lecture", status="approved",
+            ))
+        ScheduledEvent.objects.bulk_create(events, batch_size=2000)
+        self.stdout.write(f"Seeded {len(events)} events over {options['days']} days")
+        return slot
+
+    def run(self, slot, checks, rng):
+        probes = [slot() for _ in range(checks)]
+
+        started = timer.perf_counter()
+        legacy = [legacy_check(t, r, d, s, e) for d, s, e, t, r in probes]
+        legacy_s = timer.perf_counter() - started
+
+        started = timer.perf_counter()
+        single = [bool(find_conflicts(d, s, e, tutor_id=t, room_id=r)) for d, s, e, t, r in probes]
+        single_s = timer.perf_counter() - started
+
+        started = timer.perf_counter()
+        ci = ConflictIndex.load({p[0] for p in probes}, {p[3] for p in probes}, {p[4] for p in probes})
+        load_s = timer.perf_counter() - started
+        batch = [bool(ci.check(d, s, e, tutor_id=t, room_id=r)) for d, s, e, t, r in probes]
+        batch_s = timer.perf_counter() - started
+
+        if not (legacy == single == batch):
+            self.stderr.write(self.style.ERROR("Result mismatch between strategies"))
+
+        def line(name, seconds):
+            per = seconds / len(probes) * 1e6
+            self.stdout.write(f"{name:<34} {seconds * 1000:9.1f} ms total {per:9.1f} us/check")
+
+        self.stdout.write(f"{len(probes)} checks, {sum(legacy)} conflicting")
+        line("legacy querysets (2-4 queries)", legacy_s)
+        line("find_conflicts (2 queries)", single_s)
+        line(f"ConflictIndex batch (load {load_s * 1000:.1f} ms)", batch_s)
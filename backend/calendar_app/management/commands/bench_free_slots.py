@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.contrib.auth import get_user_model
+import random
+import time as timer
+from datetime import date, time, timedelta
+
+from calendar_app.models import Major, Course, Room, ScheduledEvent
+from calendar_app.slots import OccupancyGrid, find_free_slots
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark the free-slot finder over a whole term. Seeds data in a rolled-back transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=20000)
+        parser.add_argument("--searches", type=int, default=20)
+        parser.add_argument("--tutors", type=int, default=60)
+        parser.add_argument("--rooms", type=int, default=40)
+        parser.add_argument("--majors", type=int, default=10)
+        parser.add_argument("--courses", type=int, default=300)
+        parser.add_argument("--days", type=int, default=120)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            courses, tutors = self.seed(rng, options)
+            self.run(rng, courses, tutors, options)
+            transaction.set_rollback(True)
+
+    def seed(self, rng, options):
+        majors = [Major.objects.create(name=f"bench-{rng.random()}-{i}") for i in range(options["majors"])]
+        courses = Course.objects.bulk_create([
+            Course(name=f"Bench course {i}", major=majors[i % len(majors)], year=1 + i // len(majors) % 4)
+            for i in range(options["courses"])
+        ])
+        tutors = User.objects.bulk_create([
+            User(username=f"bench-tutor-{rng.random()}-{i}", role="tutor") for i in range(options["tutors"])
+        ])
+        rooms = Room.objects.bulk_create([Room(name=f"Bench room {i}") for i in range(options["rooms"])])
+        self.start_day = date(2030, 1, 7)
+        events = []
+        for _ in range(options["events"]):
+            hour = rng.randrange(7, 18)
+            events.append(ScheduledEvent(
+                date=self.start_day + timedelta(days=rng.randrange(options["days"])),
+                start_time=time(hour, rng.choice((0, 30))), end_time=time(hour + 1, rng.choice((0, 30))),
+                course=rng.choice(courses), tutor=rng.choice(tutors), room=rng.choice(rooms),
+                event_type="lecture", status="approved",
+            ))
+        ScheduledEvent.objects.bulk_create(events, batch_size=2000)
+        self.stdout.write(f"Seeded {len(events)} events over {options['days']} days, {len(rooms)} rooms")
+        return courses, tutors
+
+    def run(self, rng, courses, tutors, options):
+        end_day = self.start_day + timedelta(days=options["days"] - 1)
+
+        started = timer.perf_counter()
+        OccupancyGrid.load(self.start_day, end_day)
+        load_s = timer.perf_counter() - started
+
+        timings = []
+        found = 0
+        for _ in range(options["searches"]):
+            started = timer.perf_counter()
+            found += len(find_free_slots(
+                rng.choice(courses), rng.choice(tutors).id, rng.choice((60, 90, 120)), self.start_day, end_day, limit=50,
+            ))
+            timings.append(timer.perf_counter() - started)
+
+        timings.sort()
+        self.stdout.write(f"full grid load (every tutor/room/cohort): {load_s * 1000:.1f} ms")
+        self.stdout.write(
+            f"{len(timings)} term searches, {found} slots returned: "
+            f"median {timings[len(timings) // 2] * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms"
+        )
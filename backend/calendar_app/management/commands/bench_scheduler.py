@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.contrib.auth import get_user_model
+import os
+import random
+import time as timer
+from datetime import date, time, timedelta
+
+from calendar_app.models import Major, Course, Room, ScheduledEvent
+from calendar_app.scheduler import build_problem, search
+from users.models import TutorProfile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Benchmark the term scheduler on seeded data (serial vs worker processes). Seeds data in a rolled-back transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--majors", type=int, default=6)
+        parser.add_argument("--courses", type=int, default=150)
+        parser.add_argument("--tutors", type=int, default=60)
+        parser.add_argument("--rooms", type=int, default=25)
+        parser.add_argument("--existing", type=int, default=500, help="events already booked in the term")
+        parser.add_argument("--weeks", type=int, default=15)
+        parser.add_argument("--restarts", type=int, default=16)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            term_start, term_end = self.seed(rng, options)
+            self.run(term_start, term_end, options)
+            transaction.set_rollback(True)
+
+    def seed(self, rng, options):
+        majors = [Major.objects.create(name=f"bench-{rng.random()}-{i}") for i in range(options["majors"])]
+        courses = Course.objects.bulk_create([
+            Course(
+                name=f"Bench course {i}", major=majors[i % len(majors)], year=1 + i // len(majors) % 4,
+                lecture_hours=rng.choice((2, 3, 4)), lab_hours=rng.choice((0, 1, 2)),
+            )
+            for i in range(options["courses"])
+        ])
+        users = User.objects.bulk_create([
+            User(username=f"bench-tutor-{rng.random()}-{i}", role="tutor") for i in range(options["tutors"])
+        ])
+        profiles = TutorProfile.objects.bulk_create([
+            TutorProfile(user=u, email=f"{u.username}@bench.test", name=u.username, dob=date(1980, 1, 1), tutor_id=u.username)
+            for u in users
+        ])
+        links = []
+        for i, course in enumerate(courses):
+            for profile in rng.sample(profiles, k=2):
+                links.append(TutorProfile.courses.through(tutorprofile_id=profile.id, course_id=course.id))
+        TutorProfile.courses.through.objects.bulk_create(links, ignore_conflicts=True)
+        rooms = Room.objects.bulk_create([Room(name=f"Bench room {i}") for i in range(options["rooms"])])
+
+        term_start = date(2030, 9, 2)
+        term_end = term_start + timedelta(weeks=options["weeks"]) - timedelta(days=3)
+        other = Course.objects.create(name="Bench external", major=None)
+        existing = []
+        for _ in range(options["existing"]):
+            hour = rng.randrange(8, 17)
+            existing.append(ScheduledEvent(
+                date=term_start + timedelta(days=rng.randrange((term_end - term_start).days)),
+                start_time=time(hour, 0), end_time=time(hour + 1, 0), course=other,
+                tutor=rng.choice(users), room=rng.choice(rooms), event_type="lecture", status="approved",
+            ))
+        ScheduledEvent.objects.bulk_create(existing, batch_size=2000)
+        hours = sum(c.lecture_hours + c.lab_hours for c in courses)
+        self.stdout.write(
+            f"Seeded {len(courses)} courses ({hours} weekly hours), {len(users)} tutors, {len(rooms)} rooms, "
+            f"{len(existing)} existing events over {options['weeks']} weeks"
+        )
+        return term_start, term_end
+
+    def run(self, term_start, term_end, options):
+        started = timer.perf_counter()
+        problem, skipped = build_problem(term_start, term_end, course_ids=None)
+        self.stdout.write(f"build_problem: {len(problem.sessions)} sessions in {(timer.perf_counter() - started) * 1000:.0f} ms")
+
+        for workers in sorted({1, options["workers"]}):
+            started = timer.perf_counter()
+            best = search(problem, restarts=options["restarts"], workers=workers)
+            seconds = timer.perf_counter() - started
+            self.stdout.write(
+                f"{options['restarts']} restarts on {workers} worker(s): {seconds:.2f}s, "
+                f"best placed {len(best.placements)}/{len(problem.sessions)} (seed {best.seed})"
+            )
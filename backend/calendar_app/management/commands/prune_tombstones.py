@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+
+from calendar_app.models import EventTombstone
+from calendar_app.sync import TOMBSTONE_RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete event tombstones older than the delta-sync retention window. "
+        "Clients holding an older cursor are told to resync."
+    )
+
+    def handle(self, *args, **options):
+        horizon = timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+        deleted, _ = EventTombstone.objects.filter(deleted_at__lt=horizon).delete()
+        self.stdout.write(f"Pruned {deleted} tombstones older than {TOMBSTONE_RETENTION_DAYS} days")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+import time
+
+from calendar_app import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (notification fan-out). Polls for due jobs until "
+        "interrupted; with --once, runs everything due and exits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="exit once no job is due")
+        parser.add_argument("--batch-size", type=int, default=jobs.DEFAULT_BATCH_SIZE, help="jobs claimed per round")
+        parser.add_argument("--poll", type=float, default=1.0, help="seconds to sleep while the queue is empty")
+        parser.add_argument("--worker", default=None, help="worker name recorded on claimed jobs (default host:pid)")
+
+    def handle(self, *args, **options):
+        worker = options["worker"] or jobs.worker_name()
+        if options["once"]:
+            ok, failed = jobs.drain(worker, options["batch_size"])
+            self.stdout.write(f"Ran {ok + failed} jobs: {ok} succeeded, {failed} failed")
+            return
+
+        self.stdout.write(f"Worker {worker} polling for jobs every {options['poll']}s")
+        try:
+            while True:
+                ok, failed = jobs.run_pending(worker, options["batch_size"])
+                if ok or failed:
+                    self.stdout.write(f"Ran {ok + failed} jobs: {ok} succeeded, {failed} failed")
+                else:
+                    time.sleep(options["poll"])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker stopped")
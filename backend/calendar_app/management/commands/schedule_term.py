@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+import os
+from datetime import date
+
+from calendar_app import versioning
+from calendar_app.scheduler import commit, describe, schedule_term
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Place every course's weekly lecture/lab hours (and optionally one exam) as conflict-free pending events. "
+        "No notifications are sent; approving the events notifies as usual."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", required=True, type=date.fromisoformat, help="first day of term (YYYY-MM-DD)")
+        parser.add_argument("--end", required=True, type=date.fromisoformat, help="last day of term (YYYY-MM-DD)")
+        parser.add_argument("--exam-start", type=date.fromisoformat)
+        parser.add_argument("--exam-end", type=date.fromisoformat)
+        parser.add_argument("--exam-minutes", type=int, default=120)
+        parser.add_argument("--course", type=int, action="append", dest="courses", help="limit to these course ids")
+        parser.add_argument("--restarts", type=int, default=16)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--user", help="username recorded in the audit log")
+        parser.add_argument("--dry-run", action="store_true", help="print the plan without creating events")
+
+    def handle(self, *args, **options):
+        if options["end"] < options["start"]:
+            raise CommandError("--end must not be before --start")
+        if bool(options["exam_start"]) != bool(options["exam_end"]):
+            raise CommandError("--exam-start and --exam-end go together")
+        if options["restarts"] < 1:
+            raise CommandError("--restarts must be at least 1")
+        if not options["dry_run"] and not versioning.cache_is_shared():
+            # the cache invalidations below would only reach this process
+            raise CommandError(
+                "schedule_term writes events from its own process: configure a shared CACHES backend "
+                "(Redis, Memcached, database) or use --dry-run / the schedule_term API"
+            )
+        user = None
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No user {options['user']!r}")
+
+        def progress(done, total, best):
+            placed = len(best.placements)
+            self.stdout.write(f"[{done}/{total}] best so far: {placed}/{placed + len(best.unplaced)} sessions placed (seed {best.seed}, score {best.score})")
+
+        problem, skipped, best, seconds = schedule_term(
+            options["start"], options["end"],
+            restarts=options["restarts"], workers=options["workers"], seed=options["seed"], progress=progress,
+            exam_start=options["exam_start"], exam_end=options["exam_end"],
+            exam_minutes=options["exam_minutes"], course_ids=options["courses"],
+        )
+        for item in skipped:
+            self.stdout.write(f"skipped course {item['course']}: {item['reason']}")
+        for index in best.unplaced:
+            session = problem.sessions[index]
+            self.stdout.write(self.style.WARNING(f"could not place: {session.title} ({session.minutes} min)"))
+        self.stdout.write(f"searched {options['restarts']} restarts on {options['workers']} worker(s) in {seconds:.2f}s")
+
+        if options["dry_run"]:
+            for placement in best.placements:
+                row = describe(problem, placement)
+                self.stdout.write(f"{row['date']} {row['start_time']}-{row['end_time']} {row['title']} tutor={row['tutor']} room={row['room']}")
+            return
+        events, clashed = commit(problem, best, user)
+        for row in clashed:
+            self.stdout.write(self.style.WARNING(f"booked meanwhile, not created: {row['date']} {row['start_time']}-{row['end_time']} {row['title']}"))
+        self.stdout.write(self.style.SUCCESS(f"Created {len(events)} pending events"))
@@ -117,7 +117,10 @@ class Command(BaseCommand):
             name = course_names[i]
             year = random.randint(1,4)
             major = random.choice(majors) if majors else None
-            c, _ = Course.objects.get_or_create(name=name, year=year, major=major)
+            c, _ = Course.objects.get_or_create(
+                name=name, year=year, major=major,
+                defaults={"lecture_hours": random.choice([2, 3, 4]), "lab_hours": random.choice([0, 1, 2])},
+            )
             courses.append(c)
 
         self.stdout.write("Seeding rooms...")
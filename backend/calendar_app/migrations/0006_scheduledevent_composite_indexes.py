@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0005_scheduledevent_related_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['major', 'year'], name='course_major_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduledevent',
+            index=models.Index(fields=['tutor', 'date', 'start_time', 'end_time'], name='event_tutor_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduledevent',
+            index=models.Index(fields=['room', 'date', 'start_time', 'end_time'], name='event_room_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduledevent',
+            index=models.Index(fields=['date', 'start_time', 'end_time'], name='event_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduledevent',
+            index=models.Index(fields=['status', 'date', 'start_time'], name='event_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0006_scheduledevent_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventRecurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly')], default='weekly', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1)),
+                ('until', models.DateField()),
+                ('exceptions', models.JSONField(blank=True, default=list)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recurrence', to='calendar_app.scheduledevent')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['until'], name='recurrence_until_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0007_eventrecurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lab_hours',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='lecture_hours',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
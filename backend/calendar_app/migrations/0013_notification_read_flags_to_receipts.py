@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-17 16:05
+
+from django.db import migrations
+
+
+def read_flags_to_receipts(apps, schema_editor):
+    # existing rows keep their single user as a `user` audience; their read flags become receipts
+    Notification = apps.get_model('calendar_app', 'Notification')
+    NotificationReceipt = apps.get_model('calendar_app', 'NotificationReceipt')
+    read = Notification.objects.filter(is_read=True).values_list('id', 'user_id')
+    NotificationReceipt.objects.bulk_create(
+        [NotificationReceipt(notification_id=pk, user_id=user_id) for pk, user_id in read.iterator()],
+        batch_size=1000,
+    )
+
+
+def receipts_to_read_flags(apps, schema_editor):
+    Notification = apps.get_model('calendar_app', 'Notification')
+    NotificationReceipt = apps.get_model('calendar_app', 'NotificationReceipt')
+    Notification.objects.filter(
+        audience='user', id__in=NotificationReceipt.objects.values('notification_id'),
+    ).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+    # on its own: PostgreSQL refuses to alter a table with pending trigger events in the same transaction
+
+    dependencies = [
+        ('calendar_app', '0012_notification_audience_notificationreceipt'),
+    ]
+
+    operations = [
+        migrations.RunPython(read_flags_to_receipts, receipts_to_read_flags),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-17 16:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0013_notification_read_flags_to_receipts'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='notification',
+            name='is_read',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0016_auditlog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='notes',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('createEvent', 'Create Event'), ('approveEvent', 'Approve Event'), ('createStudent', 'Create Student'), ('promoteStudent', 'Promote Student'), ('editEvent', 'Edit Event'), ('cancelEvent', 'Cancel Event'), ('rejectEvent', 'Reject Event'), ('createStaff', 'Create Staff')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
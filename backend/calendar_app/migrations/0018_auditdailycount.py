@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def count_existing_entries(apps, schema_editor):
+    AuditLog = apps.get_model('calendar_app', 'AuditLog')
+    AuditDailyCount = apps.get_model('calendar_app', 'AuditDailyCount')
+    rows = (
+        AuditLog.objects.annotate(day=TruncDate('timestamp'))
+        .values('day', 'action', 'user_id').annotate(count=Count('id')).order_by()
+    )
+    AuditDailyCount.objects.bulk_create(
+        [AuditDailyCount(day=r['day'], action=r['action'], user_id=r['user_id'], count=r['count']) for r in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0017_auditlog_notes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditDailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('action', models.CharField(choices=[('createEvent', 'Create Event'), ('approveEvent', 'Approve Event'), ('createStudent', 'Create Student'), ('promoteStudent', 'Promote Student'), ('editEvent', 'Edit Event'), ('cancelEvent', 'Cancel Event'), ('rejectEvent', 'Reject Event'), ('createStaff', 'Create Staff')], max_length=30)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audit_daily_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'action', 'user'), name='audit_daily_count_unique')],
+            },
+        ),
+        migrations.RunPython(count_existing_entries, migrations.RunPython.noop),
+    ]
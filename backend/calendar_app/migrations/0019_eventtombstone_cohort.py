@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0018_auditdailycount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventtombstone',
+            name='major_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventtombstone',
+            name='year',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
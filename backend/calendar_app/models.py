@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 class Major(models.Model):
@@ -13,10 +14,102 @@ class Course(models.Model):
     name = models.CharField(max_length=255)
     year = models.IntegerField(default=1)
     major = models.ForeignKey(Major, on_delete=models.SET_NULL, null=True, blank=True)
+    # weekly teaching load, placed by the term scheduler (calendar_app.scheduler)
+    lecture_hours = models.PositiveSmallIntegerField(default=0)
+    lab_hours = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # student timetable: events of courses in the student's (major, year) cohort
+            models.Index(fields=["major", "year"], name="course_major_year_idx"),
+        ]
+
+
 class Room(models.Model):
     name = models.CharField(max_length=255)
 
 
+class ScheduledEventQuerySet(models.QuerySet):
+    # flat columns projected by as_rows(); names match ScheduledEventSerializer's output
+    ROW_FIELDS = (
+        "id", "title", "date", "start_time", "end_time", "event_type", "status", "notes",
+        "course", "tutor", "room", "related_event", "created_at", "updated_at",
+    )
+
+    def with_related(self):
+        """Join the FKs read by ScheduledEventSerializer so rendering doesn't lazy-load per row."""
+        return self.select_related("course", "room", "tutor", "recurrence")
+
+    def as_rows(self):
+        """Project to plain dicts (one joined query) for ScheduledEventRowSerializer."""
+        return self.values(
+            *self.ROW_FIELDS,
+            course_name=models.F("course__name"),
+            room_name=models.F("room__name"),
+            tutor_username=models.F("tutor__username"),
+            tutor_email=models.F("tutor__email"),
+            recurrence_frequency=models.F("recurrence__frequency"),
+            recurrence_interval=models.F("recurrence__interval"),
+            recurrence_until=models.F("recurrence__until"),
+            recurrence_exceptions=models.F("recurrence__exceptions"),
+        )
+
+    def singles(self):
+        """Events without a repeat rule."""
+        return self.filter(recurrence__isnull=True)
+
+    def series(self):
+        """Events carrying a repeat rule (one row per series)."""
+        return self.filter(recurrence__isnull=False)
+
+    def singles_in_window(self, start=None, end=None):
+        """Singles dated inside [start, end]; a plain date range, so the (resource, date) indexes apply."""
+        qs = self.singles()
+        if start:
+            qs = qs.filter(date__gte=start)
+        if end:
+            qs = qs.filter(date__lte=end)
+        return qs
+
+    def series_in_window(self, start=None, end=None):
+        """Series whose occurrence window [date, until] touches [start, end].
+
+        Driven from the EventRecurrence until index so old, finished series are
+        never read. Series still have to be expanded (calendar_app.recurrence)
+        to find their actual dates.
+        """
+        if start:
+            qs = self.filter(pk__in=EventRecurrence.objects.filter(until__gte=start).values("event_id"))
+        else:
+            qs = self.series()
+        if end:
+            qs = qs.filter(date__lte=end)
+        return qs
+
+    def series_using(self, start, end, **resources):
+        """series_in_window() narrowed to events using any of the given resources (`field=ids`, OR-ed).
+
+        The resource columns are compared as `column + 0`, which no index
+        covers. Compared directly, the planner walks each resource's whole
+        history through its (resource, date) index and only then applies the
+        until subquery; this way it starts from recurrence_until_idx and reads
+        only the series still running.
+        """
+        keys, q = {}, models.Q()
+        for field, ids in resources.items():
+            keys[f"{field}_key"] = models.ExpressionWrapper(models.F(field) + 0, output_field=models.BigIntegerField())
+            q |= models.Q(**{f"{field}_key__in": ids})
+        return self.alias(**keys).filter(q).series_in_window(start, end)
+
+    def split_window(self, start=None, end=None):
+        """(singles, series) touching [start, end], as two querysets.
+
+        They are kept apart rather than OR-ed together: an OR of the two shapes
+        loses the date range on the singles side and scans all past history.
+        """
+        return self.singles_in_window(start, end), self.series_in_window(start, end)
+
+
 class ScheduledEvent(models.Model):
     EVENT_TYPES = [
         ("lecture", "Lecture"),
@@ -41,10 +134,138 @@ class ScheduledEvent(models.Model):
 
     notes = models.TextField(null=True, blank=True)
 
+    # delta sync (/scheduledevents/changes/): bulk_create() fills these too, QuerySet.update() does not
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ScheduledEventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # tutor / room double-booking checks: equality on (resource, date),
+            # then a range test on start/end which the trailing columns cover
+            models.Index(fields=["tutor", "date", "start_time", "end_time"], name="event_tutor_date_time_idx"),
+            models.Index(fields=["room", "date", "start_time", "end_time"], name="event_room_date_time_idx"),
+            # rooms_available (date + overlap) and list ordering / keyset on (date, start_time, id)
+            models.Index(fields=["date", "start_time", "end_time"], name="event_date_time_idx"),
+            # export_calendar: approved events in a date range, already in (date, start_time) order
+            models.Index(fields=["status", "date", "start_time"], name="event_status_date_idx"),
+            # delta sync: keyset on (updated_at, id)
+            models.Index(fields=["updated_at", "id"], name="event_updated_idx"),
+        ]
+
     def __str__(self):
         return f"{self.course.name} - {self.event_type}"
 
 
+class EventRecurrence(models.Model):
+    """Repeat rule for a ScheduledEvent series.
+
+    The event row is the series: its date is the first occurrence and its times,
+    tutor, room and course apply to every occurrence. Occurrences are never
+    stored; they are expanded per requested window (see calendar_app.recurrence).
+    """
+    FREQUENCIES = [
+        ("daily", "Daily"),
+        ("weekly", "Weekly"),
+    ]
+    event = models.OneToOneField(ScheduledEvent, on_delete=models.CASCADE, related_name="recurrence")
+    frequency = models.CharField(max_length=10, choices=FREQUENCIES, default="weekly")
+    interval = models.PositiveSmallIntegerField(default=1)
+    # last date an occurrence may fall on (inclusive)
+    until = models.DateField()
+    # ISO dates (YYYY-MM-DD) of skipped occurrences
+    exceptions = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["until"], name="recurrence_until_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.event} every {self.interval} {self.frequency} until {self.until}"
+
+
+class EventTombstone(models.Model):
+    """Marker left behind when a ScheduledEvent is deleted (e.g. a change request
+    merged into its parent), so delta-sync clients learn to drop it.
+
+    A marker with a cohort (major_id, year) records instead that the event left
+    that cohort (its course changed, or the course moved): only that cohort's
+    students are told to drop it.
+
+    Written by the handlers in calendar_app.signals; pruned after
+    TOMBSTONE_RETENTION_DAYS by `manage.py prune_tombstones`.
+    """
+    event_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    # the cohort the event left; both None when it was deleted
+    major_id = models.BigIntegerField(null=True, blank=True)
+    year = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="tombstone_deleted_idx"),
+        ]
+
+    def __str__(self):
+        if self.major_id is not None:
+            return f"event {self.event_id} left cohort {self.major_id}/{self.year} at {self.deleted_at}"
+        return f"event {self.event_id} deleted at {self.deleted_at}"
+
+
+class CalendarFeed(models.Model):
+    """Secret token behind a user's iCalendar subscription URL (calendar_app.feeds).
+
+    Calendar clients cannot send a JWT, so the token in the URL is the
+    credential; rotating it revokes every subscription made with the old one.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="calendar_feed")
+    token = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Calendar feed of {self.user}"
+
+
+class Job(models.Model):
+    """A unit of deferred work, run by the `manage.py run_jobs` worker (calendar_app.jobs).
+
+    `kind` names the handler and `payload` holds its keyword arguments. A job
+    is deleted once its handler succeeds; a job that keeps failing is left
+    behind as `failed` with its last error.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = [(QUEUED, "Queued"), (RUNNING, "Running"), (FAILED, "Failed")]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # worker claim: due jobs of a status, oldest first
+            models.Index(fields=["status", "run_after", "id"], name="job_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+
+class AuditLogQuerySet(models.QuerySet):
+    def with_related(self):
+        """Join what AuditLogSerializer reads (user, event and its course) so rows don't lazy-load."""
+        return self.select_related("user", "event__course")
+
+
 class AuditLog(models.Model):
     ACTIONS = [
         ("createEvent", "Create Event"),
@@ -54,24 +275,97 @@ class AuditLog(models.Model):
         ("editEvent", "Edit Event"),
         ("cancelEvent", "Cancel Event"),
         ("rejectEvent", "Reject Event"),
+        ("createStaff", "Create Staff"),
     ]
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     action = models.CharField(max_length=30, choices=ACTIONS)
     # link to event or student depending on action
     event = models.ForeignKey(ScheduledEvent, on_delete=models.CASCADE, null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # set by calendar_app.audit.record() when the action happens, not when the buffered row is written
+    timestamp = models.DateTimeField(default=timezone.now)
     # optional free-text notes to record aggregate counts or details
+    notes = models.TextField(blank=True, default="")
+
+    objects = AuditLogQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # audit API: newest first, keyset on (timestamp, id), optionally by action or user
+            models.Index(fields=["timestamp", "id"], name="audit_timestamp_idx"),
+            models.Index(fields=["action", "timestamp", "id"], name="audit_action_timestamp_idx"),
+            models.Index(fields=["user", "timestamp", "id"], name="audit_user_timestamp_idx"),
+        ]
 
     def __str__(self):
         target = self.event or "No Target"
         return f"{self.user.username} {self.action} {target}"
 
+
+class AuditDailyCount(models.Model):
+    """How many times `user` did `action` on `day` (UTC): the audit stats rollup, kept by calendar_app.audit."""
+    day = models.DateField()
+    action = models.CharField(max_length=30, choices=AuditLog.ACTIONS)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="audit_daily_counts")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "action", "user"], name="audit_daily_count_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.action} {self.user_id}: {self.count}"
+
 class Notification(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
+    """A message about an event operation, stored once per audience and resolved
+    per user when read (calendar_app.notifications):
+
+      - `cohort`: students of the (major, year) cohort;
+      - `user`: one user (the event's tutor);
+      - `staff`: every Admin/DAA/AA user.
+
+    Whether a user has read it is a NotificationReceipt or their
+    NotificationReadMark, so unread costs no row.
+    """
+    COHORT = "cohort"
+    USER = "user"
+    STAFF = "staff"
+    AUDIENCES = [(COHORT, "Cohort"), (USER, "User"), (STAFF, "Staff")]
+
+    audience = models.CharField(max_length=10, choices=AUDIENCES, default=USER)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="notifications")
+    major = models.ForeignKey(Major, on_delete=models.CASCADE, null=True, blank=True)
+    year = models.IntegerField(null=True, blank=True)
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
     event = models.ForeignKey(ScheduledEvent, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # a user's notifications, newest first: one range per audience they belong to
+            models.Index(fields=["user", "created_at"], name="notification_user_idx"),
+            models.Index(fields=["major", "year", "created_at"], name="notification_cohort_idx"),
+            models.Index(fields=["audience", "created_at"], name="notification_audience_idx"),
+        ]
+
     def __str__(self):
-        return f"Notification for {self.user.username}: {self.message[:20]}..." 
+        target = self.user.username if self.user_id else self.audience
+        return f"Notification for {target}: {self.message[:20]}..."
+
+
+class NotificationReadMark(models.Model):
+    """`user` has read every notification created up to `read_until` ("mark all as read")."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="notification_read_mark")
+    read_until = models.DateTimeField()
+
+
+class NotificationReceipt(models.Model):
+    """`user` has read `notification` (one read after their NotificationReadMark)."""
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name="receipts")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notification_receipts")
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "notification"], name="notification_receipt_unique"),
+        ]
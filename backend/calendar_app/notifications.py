@@ -0,0 +1,193 @@
+"""Notifications about event operations, stored once per audience (fan-out on read).
+
+An operation on an event writes at most three Notification rows, whatever
+the size of the audience:
+  - students taking the course: one `cohort` row for (major, year);
+  - the tutor assigned to the event: one `user` row;
+  - Admin/DAA/AA staff: one `staff` row.
+
+`for_user()` resolves a user's notifications when they are read: the rows
+of their own cohort (a student's current one), the rows addressed to them
+and, for staff, the staff rows, all created since the user joined. Read
+state is sparse: a NotificationReadMark per user ("everything up to here is
+read", set by mark-all-read) plus a NotificationReceipt per notification read
+after it.
+
+Each user's unread count is cached under the id of the newest row of each
+of their audiences, read from the database (one query, an index seek per
+audience): `deliver()` runs in the `run_jobs` worker, whose cache is not the
+web process's, so a new row retires the counters of everyone in its audience
+through the table itself. Marking read adjusts the caller's counter in place.
+Open notification streams (calendar_app.push) find new rows by polling the
+table and route them by audience scope name (`row_scope()`).
+
+Requests only queue the work (`notify()`, one Job row); the `run_jobs` worker
+calls `deliver()`.
+"""
+import hashlib
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from . import jobs, push, timetables
+from .models import Notification, NotificationReadMark, NotificationReceipt, ScheduledEvent
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+STAFF_ROLES = ["administrator", "department_assistant", "academic_assistant"]
+
+UNREAD_CACHE_TIMEOUT = 24 * 3600
+
+
+def _cohort_scope(major_id, year):
+    return f"notifications:cohort-{major_id}-{year}"
+
+
+def _user_scope(user_id):
+    return f"notifications:user-{user_id}"
+
+
+STAFF_SCOPE = "notifications:staff"
+
+
+def row_scope(audience, user_id, major_id, year):
+    """Scope name of the audience a Notification row is addressed to; push streams subscribe by it."""
+    if audience == Notification.COHORT:
+        return _cohort_scope(major_id, year)
+    if audience == Notification.USER:
+        return _user_scope(user_id)
+    return STAFF_SCOPE
+
+
+def notify(events, action_description):
+    """Queue notifications about `action_description` happening to `events`."""
+    event_ids = [e.id for e in events]
+    if event_ids:
+        jobs.enqueue(jobs.NOTIFY, event_ids=event_ids, action_description=action_description)
+
+
+def deliver(event_ids, action_description):
+    """Write the cohort, tutor and staff notifications for `event_ids`; events deleted since are skipped."""
+    # plain ids and names: one query, no model instances
+    events = list(ScheduledEvent.objects.filter(id__in=event_ids).values_list(
+        "id", "title", "tutor_id", "course__name", "course__major_id", "course__year",
+    ))
+    if len(events) < len(event_ids):
+        logger.info(f"Skipping notifications for {len(event_ids) - len(events)} deleted event(s)")
+
+    notifications = []
+    for event_id, title, tutor_id, course_name, major_id, year in events:
+        if major_id:
+            notifications.append(Notification(
+                audience=Notification.COHORT, major_id=major_id, year=year,
+                message=f"Event '{title}' for course '{course_name}' was {action_description}.",
+                event_id=event_id
+            ))
+        if tutor_id:
+            notifications.append(Notification(
+                audience=Notification.USER, user_id=tutor_id,
+                message=f"Your event '{title}' for '{course_name}' was {action_description}.",
+                event_id=event_id
+            ))
+        notifications.append(Notification(
+            audience=Notification.STAFF,
+            message=f"Event '{title}' ({course_name}) was {action_description}.",
+            event_id=event_id
+        ))
+
+    if notifications:
+        Notification.objects.bulk_create(notifications, batch_size=1000)
+        transaction.on_commit(push.wake)
+        logger.info(f"Created {len(notifications)} notifications for action '{action_description}' on {len(events)} event(s)")
+
+
+def _audiences(user):
+    """[(scope name, Q matching the rows of that audience)] for every audience `user` belongs to."""
+    audiences = [(_user_scope(user.pk), Q(audience=Notification.USER, user_id=user.pk))]
+    if user.role in STAFF_ROLES:
+        # a staff member who tutors the event already has its tutor message
+        audiences.append((STAFF_SCOPE, Q(audience=Notification.STAFF) & ~Q(event__tutor_id=user.pk)))
+    if user.role == "student":
+        cohort = timetables.student_cohort(user.pk)
+        if cohort and cohort != timetables.NO_PROFILE:
+            audiences.append((_cohort_scope(*cohort), Q(audience=Notification.COHORT, major_id=cohort[0], year=cohort[1])))
+    return audiences
+
+
+def scopes_for(user):
+    """Scope names of the audiences `user` belongs to."""
+    return [scope for scope, _ in _audiences(user)]
+
+
+def audience_q(user):
+    """Q matching the Notification rows addressed to `user`."""
+    q = Q()
+    for _, audience in _audiences(user):
+        q |= audience
+    return q
+
+
+def for_user(user):
+    """`user`'s notifications, annotated with `is_read`."""
+    read = Exists(NotificationReceipt.objects.filter(notification=OuterRef("pk"), user_id=user.pk))
+    read_until = NotificationReadMark.objects.filter(user_id=user.pk).values_list("read_until", flat=True).first()
+    if read_until is not None:
+        read = Q(created_at__lte=read_until) | read
+    return Notification.objects.filter(audience_q(user), created_at__gte=user.date_joined).annotate(
+        is_read=ExpressionWrapper(read, output_field=BooleanField()),
+    )
+
+
+def _unread_key(user):
+    # newest row of each audience, newest first off the audience's index
+    latest = {
+        f"latest_{i}": Subquery(Notification.objects.filter(audience).order_by("-created_at", "-id").values("id")[:1])
+        for i, (_, audience) in enumerate(_audiences(user))
+    }
+    ids = User.objects.filter(pk=user.pk).annotate(**latest).values_list(*latest).first() or ()
+    digest = hashlib.md5(",".join(str(i) for i in ids).encode()).hexdigest()[:12]
+    return f"notifications-unread:{user.pk}:{digest}"
+
+
+def unread_count(user):
+    """How many of `user`'s notifications are unread; counted once, then served from the cache."""
+    key = _unread_key(user)
+    count = cache.get(key)
+    if count is None:
+        count = for_user(user).filter(is_read=False).count()
+        cache.set(key, count, UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def mark_read(user, ids):
+    """Mark the notifications `ids` read for `user` (ids that aren't theirs are ignored); returns how many were unread."""
+    unread = list(for_user(user).filter(id__in=ids, is_read=False).values_list("id", flat=True))
+    if unread:
+        NotificationReceipt.objects.bulk_create(
+            [NotificationReceipt(notification_id=pk, user_id=user.pk) for pk in unread], ignore_conflicts=True,
+        )
+        try:
+            cache.decr(_unread_key(user), len(unread))
+        except ValueError:  # not cached
+            pass
+    return len(unread)
+
+
+def mark_all_read(user):
+    """Mark everything `user` has received so far as read: moves their read mark up to now."""
+    now = timezone.now()
+    if not NotificationReadMark.objects.filter(user_id=user.pk).update(read_until=now):
+        try:
+            with transaction.atomic():
+                NotificationReadMark.objects.create(user_id=user.pk, read_until=now)
+        except IntegrityError:  # created concurrently
+            NotificationReadMark.objects.filter(user_id=user.pk).update(read_until=now)
+    # receipts of notifications below the mark are redundant now
+    NotificationReceipt.objects.filter(user_id=user.pk, notification__created_at__lte=now).delete()
+    cache.set(_unread_key(user), 0, UNREAD_CACHE_TIMEOUT)
@@ -0,0 +1,67 @@
+"""Keyset (cursor) pagination helpers.
+
+Offset pagination gets slower the further a client pages, because the database
+still has to walk every skipped row. Keyset pagination instead remembers the
+sort key of the last row that was returned and asks for rows strictly after it,
+which an index on the same columns can answer directly.
+
+Cursors are opaque to clients: a url-safe base64 encoded JSON list holding the
+sort key values of the last row of the previous page.
+"""
+import base64
+import datetime
+import json
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _to_json(value):
+    if isinstance(value, (datetime.date, datetime.time, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, parsers):
+    """Decode `cursor` into a tuple, converting each item with the matching parser."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError("cursor has the wrong shape")
+        return tuple(parse(v) for parse, v in zip(parsers, values))
+    except Exception as exc:
+        raise InvalidCursor(f"Invalid cursor: {exc}") from exc
+
+
+def keyset_q(fields, values, descending=False):
+    """Build a Q matching rows that sort strictly after `values` on `fields`.
+
+    For fields (a, b, c) ascending this is:
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    """
+    op = "lt" if descending else "gt"
+    q = Q()
+    for i, field in enumerate(fields):
+        cond = {f"{f}": v for f, v in zip(fields[:i], values[:i])}
+        cond[f"{field}__{op}"] = values[i]
+        q |= Q(**cond)
+    return q
+
+
+def parse_limit(value, default, maximum):
+    """Parse a `limit` query param, clamping it to [1, maximum]."""
+    if value in (None, ""):
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, maximum)
@@ -0,0 +1,211 @@
+"""Live notifications over Server-Sent Events, for ASGI workers.
+
+Each open stream is an asyncio.Queue subscribed to the scope names of its
+user's audiences (`notifications.scopes_for()`). A Hub, one per process
+and event loop, runs a single polling task for all of them: every
+POLL_INTERVAL it reads the Notification rows added since the last poll (one
+query however many streams are open) and puts each on the queues of its
+audience. An idle stream costs a queue and a suspended coroutine, no thread.
+
+Notifications are written by the `run_jobs` worker, which is usually another
+process; polling is how rows reach the streams. When `deliver()` runs in this
+process, its commit calls `wake()` (in-process publish) and the poller looks
+right away instead of at the next interval.
+
+Rows are read by id, plus a SETTLE window on `created_at` for rows whose
+transaction committed after a higher id was already seen.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import threading
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from . import notifications
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2.0
+HEARTBEAT_INTERVAL = 15.0
+SETTLE = datetime.timedelta(seconds=5)
+FETCH_LIMIT = 1000
+QUEUE_SIZE = 100
+REPLAY_LIMIT = 100
+# reconnection delay suggested to EventSource clients, in milliseconds
+RETRY_MS = 5000
+
+# put on a queue that overflowed: the client should refetch the list
+RESYNC = object()
+
+_hubs = weakref.WeakKeyDictionary()
+_hubs_lock = threading.Lock()
+
+
+class Subscription:
+    def __init__(self, user_id, scopes):
+        self.user_id = user_id
+        self.scopes = scopes
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, item):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # make room for the marker; everything queued is superseded by the refetch
+            self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class Hub:
+    """Routes new Notification rows to the subscriptions of one event loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.subscribers = {}
+        self.wakeup = asyncio.Event()
+        # set once the poller knows where to start from
+        self.started = asyncio.Event()
+        self.task = None
+        self.last_id = None
+        self.recent = {}
+
+    def subscribe(self, user_id, scopes):
+        sub = Subscription(user_id, scopes)
+        for scope in scopes:
+            self.subscribers.setdefault(scope, set()).add(sub)
+        if self.task is None:
+            self.task = self.loop.create_task(self._run())
+        return sub
+
+    def unsubscribe(self, sub):
+        for scope in sub.scopes:
+            subs = self.subscribers.get(scope)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self.subscribers[scope]
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+            self.started = asyncio.Event()
+            self.last_id = None
+            self.recent = {}
+
+    def _fetch(self):
+        since = timezone.now() - SETTLE
+        if self.last_id is None:
+            # start from here: rows written before the first subscriber are not pushed
+            self.last_id = Notification.objects.aggregate(last=Max("id"))["last"] or 0
+            self.recent = dict(Notification.objects.filter(created_at__gte=since).values_list("id", "created_at"))
+            return []
+        self.recent = {pk: created for pk, created in self.recent.items() if created >= since}
+        rows = (
+            Notification.objects.filter(Q(id__gt=self.last_id) | Q(created_at__gte=since))
+            .exclude(id__in=list(self.recent))
+            .order_by("id")
+            .values("id", "audience", "user_id", "major_id", "year", "message", "created_at", "event__tutor_id")
+        )
+        return list(rows[:FETCH_LIMIT])
+
+    def _dispatch(self, rows):
+        for row in rows:
+            self.recent[row["id"]] = row["created_at"]
+            self.last_id = max(self.last_id, row["id"])
+            scope = notifications.row_scope(row["audience"], row["user_id"], row["major_id"], row["year"])
+            item = {
+                "id": row["id"],
+                "message": row["message"],
+                "is_read": False,
+                "created_at": row["created_at"].isoformat(),
+            }
+            for sub in self.subscribers.get(scope, ()):
+                # a staff member who tutors the event already has its tutor message
+                if row["audience"] == Notification.STAFF and row["event__tutor_id"] == sub.user_id:
+                    continue
+                sub.put(item)
+
+    async def _run(self):
+        while True:
+            try:
+                rows = await sync_to_async(self._fetch)()
+                self.started.set()
+                self._dispatch(rows)
+                if len(rows) == FETCH_LIMIT:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Polling for new notifications failed")
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+def hub():
+    """The Hub of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _hubs_lock:
+        if loop not in _hubs:
+            _hubs[loop] = Hub(loop)
+        return _hubs[loop]
+
+
+def wake():
+    """Make every hub of this process poll now; safe to call from any thread."""
+    with _hubs_lock:
+        hubs = list(_hubs.values())
+    for h in hubs:
+        if not h.loop.is_closed():
+            h.loop.call_soon_threadsafe(h.wakeup.set)
+
+
+def _event(item):
+    return f"id: {item['id']}\nevent: notification\ndata: {json.dumps(item)}\n\n"
+
+
+def _replay(user, last_event_id):
+    qs = notifications.for_user(user).filter(id__gt=last_event_id).order_by("id")
+    return [
+        {"id": n.id, "message": n.message, "is_read": n.is_read, "created_at": n.created_at.isoformat()}
+        for n in qs[:REPLAY_LIMIT]
+    ]
+
+
+async def stream(user, last_event_id=None):
+    """SSE body for `user`: notifications newer than `last_event_id` (on reconnect), then live ones."""
+    scopes = await sync_to_async(notifications.scopes_for)(user)
+    h = hub()
+    sub = h.subscribe(user.pk, scopes)
+    try:
+        await h.started.wait()
+        yield f"retry: {RETRY_MS}\n\n"
+        seen = 0
+        if last_event_id is not None:
+            for item in await sync_to_async(_replay)(user, last_event_id):
+                seen = item["id"]
+                yield _event(item)
+        while True:
+            try:
+                item = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if item is RESYNC:
+                sub.overflowed = False
+                yield "event: resync\ndata: {}\n\n"
+            elif item["id"] > seen:
+                yield _event(item)
+    finally:
+        h.unsubscribe(sub)
@@ -0,0 +1,74 @@
+"""Lazy expansion of recurring ScheduledEvent series.
+
+A series is a single ScheduledEvent row with an EventRecurrence rule attached.
+Occurrences are computed on demand for the window a caller asks about, so a
+15-week course costs one row in the database and 15 dates in memory, and only
+for the weeks being looked at.
+
+Rules are read either from EventRecurrence instances or from the
+`recurrence_*` columns projected by `ScheduledEventQuerySet.as_rows()`.
+"""
+import datetime
+
+# upper bound on occurrences per series, to keep expansion cheap
+MAX_OCCURRENCES = 400
+
+
+def step_days(frequency, interval):
+    return interval * (7 if frequency == "weekly" else 1)
+
+
+def occurrence_dates(anchor, frequency, interval, until, exceptions=(), start=None, end=None):
+    """Yield the dates of a series inside [start, end] (either bound optional)."""
+    step = step_days(frequency, interval)
+    last = until if end is None else min(until, end)
+    d = anchor
+    if start is not None and start > anchor:
+        # jump straight to the first occurrence on/after `start`
+        skipped = -(-(start - anchor).days // step)
+        d = anchor + datetime.timedelta(days=skipped * step)
+    skip = set(exceptions or ())
+    while d <= last:
+        if d.isoformat() not in skip:
+            yield d
+        d += datetime.timedelta(days=step)
+
+
+def occurs_on(anchor, frequency, interval, until, exceptions, day):
+    if day < anchor or day > until:
+        return False
+    if (day - anchor).days % step_days(frequency, interval):
+        return False
+    return day.isoformat() not in (exceptions or ())
+
+
+def rule_dates(anchor, rule, start=None, end=None):
+    """Dates of an event with `rule` (EventRecurrence, dict or None) inside [start, end]."""
+    if rule is None:
+        if (start is None or anchor >= start) and (end is None or anchor <= end):
+            return [anchor]
+        return []
+    get = rule.get if isinstance(rule, dict) else lambda k: getattr(rule, k)
+    return list(occurrence_dates(
+        anchor, get("frequency"), get("interval"), get("until"), get("exceptions"), start, end,
+    ))
+
+
+def expand_rows(rows, start=None, end=None):
+    """Yield `as_rows()` dicts, replacing every series row with one copy per occurrence in [start, end].
+
+    Single events pass through unchanged. Output is not re-sorted.
+    """
+    for row in rows:
+        if row.get("recurrence_frequency") is None:
+            yield row
+            continue
+        for d in occurrence_dates(
+            row["date"], row["recurrence_frequency"], row["recurrence_interval"],
+            row["recurrence_until"], row["recurrence_exceptions"], start, end,
+        ):
+            yield {**row, "date": d}
+
+
+def event_key(row):
+    return (row["date"], row["start_time"], row["id"])
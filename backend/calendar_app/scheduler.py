@@ -0,0 +1,398 @@
+"""Automatic term timetabling.
+
+`build_problem()` turns the database into a plain, picklable `Problem`:
+
+- one `Session` per weekly block a course needs: its lecture and lab hours,
+  split into blocks of at most MAX_SESSION_HOURS;
+- optionally one exam per course inside an exam window;
+- the tutors assigned to each course through `TutorProfile.courses`;
+- every room;
+- busy minute bitmaps for every tutor, room and cohort.
+
+Weekly blocks become weekly series for the whole term, so they are placed on
+a weekday "template": the OR of that weekday's bookings over every week of
+the term. A slot free in the template is free in every week. Exams are
+placed on real dates.
+
+`solve()` is a randomized greedy search. Sessions are taken hardest first
+(fewest possible tutors, longest). Each one goes to the best free
+(day, start, tutor, room) according to `_score()`. `search()` runs many
+seeded restarts, across worker processes when asked, and keeps the plan
+that places the most sessions. `commit()` writes the winning plan as pending
+ScheduledEvents (weekly series plus single exams) in one transaction, after
+checking it again against the events written while the search ran.
+"""
+import datetime
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+import django
+from django.db import transaction
+from django.db.models import Q
+
+from . import audit
+from .conflicts import INACTIVE_STATUSES, ConflictIndex
+from .models import Course, EventRecurrence, Room, ScheduledEvent
+from .recurrence import rule_dates
+from .signals import invalidate_after_bulk_write
+from .slots import DAY_END, DAY_START, OccupancyGrid, cohort_of, run_starts, start_grid
+from users.models import TutorProfile
+
+MAX_SESSION_HOURS = 2
+EXAM_MINUTES = 120
+# never put two blocks of the same course on one day if another day can take it
+SAME_DAY_PENALTY = 3
+
+TUTOR = "tutor"
+ROOM = "room"
+COHORT = "cohort"
+
+
+def split_hours(hours):
+    """Weekly hours as session lengths in minutes: 5 -> [120, 120, 60]."""
+    blocks = [MAX_SESSION_HOURS] * (hours // MAX_SESSION_HOURS)
+    if hours % MAX_SESSION_HOURS:
+        blocks.append(hours % MAX_SESSION_HOURS)
+    return [h * 60 for h in blocks]
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@dataclass
+class Session:
+    course_id: int
+    cohort: tuple
+    kind: str  # ScheduledEvent.event_type
+    minutes: int
+    tutor_ids: tuple
+    title: str
+
+
+@dataclass
+class Placement:
+    session: int  # index into Problem.sessions
+    day: tuple    # ("w", weekday) for weekly series, ("d", date) for exams
+    start: int    # minute of the day
+    tutor_id: int
+    room_id: int
+
+
+@dataclass
+class Problem:
+    term_start: datetime.date
+    term_end: datetime.date
+    weekdays: list
+    exam_dates: list
+    sessions: list
+    room_ids: list
+    busy: dict  # (day, TUTOR|ROOM|COHORT, id) -> minute mask
+    window: int
+    allowed_starts: int
+
+    def days_for(self, session):
+        if session.kind == "exam":
+            return [("d", d) for d in self.exam_dates]
+        return [("w", w) for w in self.weekdays]
+
+    def first_date(self, weekday):
+        return self.term_start + datetime.timedelta(days=(weekday - self.term_start.weekday()) % 7)
+
+    def overlapping_days(self, day):
+        """Other day keys a booking on `day` also occupies (a series hits exam dates on its weekday, and vice versa)."""
+        kind, value = day
+        if kind == "w":
+            return [("d", d) for d in self.exam_dates
+                    if d.weekday() == value and self.first_date(value) <= d <= self.term_end]
+        if self.term_start <= value <= self.term_end:
+            return [("w", value.weekday())]
+        return []
+
+
+@dataclass
+class Result:
+    seed: int
+    placements: list = field(default_factory=list)
+    unplaced: list = field(default_factory=list)
+    score: int = 0
+
+    def rank(self):
+        return (len(self.unplaced), -self.score, self.seed)
+
+
+def build_problem(term_start, term_end, exam_start=None, exam_end=None, course_ids=None,
+                  exam_minutes=EXAM_MINUTES, step=30, day_start=DAY_START, day_end=DAY_END):
+    """Load courses, tutor assignments, rooms and existing bookings into a Problem.
+
+    Returns (problem, skipped) where `skipped` lists the courses left out and why.
+    """
+    courses = Course.objects.all()
+    if course_ids:
+        courses = courses.filter(id__in=course_ids)
+    if exam_start is None:
+        courses = courses.filter(Q(lecture_hours__gt=0) | Q(lab_hours__gt=0))
+    courses = list(courses.order_by("id"))
+
+    tutors_by_course = {}
+    for course_id, user_id in (
+        TutorProfile.courses.through.objects.filter(course__in=courses)
+        .values_list("course_id", "tutorprofile__user_id")
+    ):
+        tutors_by_course.setdefault(course_id, []).append(user_id)
+
+    # courses already timetabled in these windows are left alone
+    taught = set()
+    for part in ScheduledEvent.objects.split_window(term_start, term_end):
+        taught.update(
+            part.filter(course__in=courses, event_type__in=("lecture", "labwork"))
+            .exclude(status__in=INACTIVE_STATUSES)
+            .values_list("course_id", flat=True)
+        )
+    examined = set()
+    if exam_start is not None:
+        for part in ScheduledEvent.objects.split_window(exam_start, exam_end):
+            examined.update(
+                part.filter(course__in=courses, event_type="exam")
+                .exclude(status__in=INACTIVE_STATUSES)
+                .values_list("course_id", flat=True)
+            )
+
+    sessions, skipped = [], []
+    for course in courses:
+        tutor_ids = tuple(sorted(tutors_by_course.get(course.id, ())))
+        if not tutor_ids:
+            skipped.append({"course": course.id, "reason": "no tutor assigned"})
+            continue
+        cohort = cohort_of(course.id, course.major_id, course.year)
+        wanted = []
+        if course.id in taught:
+            skipped.append({"course": course.id, "reason": "already scheduled this term"})
+        else:
+            wanted += [("lecture", m) for m in split_hours(course.lecture_hours)]
+            wanted += [("labwork", m) for m in split_hours(course.lab_hours)]
+        if exam_start is not None:
+            if course.id in examined:
+                skipped.append({"course": course.id, "reason": "exam already scheduled"})
+            else:
+                wanted.append(("exam", exam_minutes))
+        for kind, minutes in wanted:
+            title = f"{course.name} {dict(ScheduledEvent.EVENT_TYPES)[kind]}"
+            sessions.append(Session(course.id, cohort, kind, minutes, tutor_ids, title))
+
+    weekdays = sorted({(term_start + datetime.timedelta(days=i)).weekday()
+                       for i in range(min(7, (term_end - term_start).days + 1))} & set(range(5)))
+    exam_dates = []
+    if exam_start is not None:
+        exam_dates = [exam_start + datetime.timedelta(days=i) for i in range((exam_end - exam_start).days + 1)]
+        exam_dates = [d for d in exam_dates if d.weekday() < 5]
+
+    # fold existing bookings into weekday templates and exam dates
+    grid_end = max(term_end, exam_end) if exam_end else term_end
+    grid_start = min(term_start, exam_start) if exam_start else term_start
+    grid = OccupancyGrid.load(grid_start, grid_end)
+    exam_set = set(exam_dates)
+    busy = {}
+    for kind, masks in ((TUTOR, grid.tutors), (ROOM, grid.rooms), (COHORT, grid.cohorts)):
+        for (day, resource_id), mask in masks.items():
+            keys = []
+            if term_start <= day <= term_end and day.weekday() < 5:
+                keys.append(("w", day.weekday()))
+            if day in exam_set:
+                keys.append(("d", day))
+            for key in keys:
+                busy[(key, kind, resource_id)] = busy.get((key, kind, resource_id), 0) | mask
+
+    window, allowed = start_grid(day_start, day_end, step)
+    problem = Problem(
+        term_start=term_start, term_end=term_end, weekdays=weekdays, exam_dates=exam_dates,
+        sessions=sessions, room_ids=list(Room.objects.order_by("id").values_list("id", flat=True)),
+        busy=busy, window=window, allowed_starts=allowed,
+    )
+    return problem, skipped
+
+
+def _score(busy, session, day, course_days, mask, tutor_id):
+    """Split candidate starts `mask` into {score: mask}; higher is better.
+
+    +1 per slot edge touching the cohort's or tutor's other bookings (compact
+    days), -SAME_DAY_PENALTY when the course already has a block that day.
+    """
+    neighbours = busy.get((day, COHORT, session.cohort), 0) | busy.get((day, TUTOR, tutor_id), 0)
+    before = (neighbours << 1) & mask
+    after = (neighbours >> session.minutes) & mask
+    both = before & after
+    base = -SAME_DAY_PENALTY if (session.course_id, day) in course_days else 0
+    return {base + 2: both, base + 1: (before | after) & ~both, base: mask & ~(before | after)}
+
+
+def solve(problem, seed):
+    """One randomized greedy pass; returns a Result."""
+    rng = random.Random(seed)
+    busy = dict(problem.busy)
+    noise = 0 if seed == 0 else 2
+    order = sorted(
+        range(len(problem.sessions)),
+        key=lambda i: (len(problem.sessions[i].tutor_ids) + rng.random() * noise, -problem.sessions[i].minutes, rng.random()),
+    )
+    rooms = list(problem.room_ids)
+    course_days = set()
+    result = Result(seed)
+
+    for index in order:
+        session = problem.sessions[index]
+        best_score, options = None, []
+        for day in problem.days_for(session):
+            cohort_busy = busy.get((day, COHORT, session.cohort), 0)
+            room_fits = {}
+            any_room = 0
+            for room_id in rooms:
+                fits = run_starts(problem.window & ~busy.get((day, ROOM, room_id), 0), session.minutes)
+                if fits:
+                    room_fits[room_id] = fits
+                    any_room |= fits
+            if not any_room:
+                continue
+            for tutor_id in session.tutor_ids:
+                blocked = cohort_busy | busy.get((day, TUTOR, tutor_id), 0)
+                starts = run_starts(problem.window & ~blocked, session.minutes) & problem.allowed_starts & any_room
+                if not starts:
+                    continue
+                for score, mask in _score(busy, session, day, course_days, starts, tutor_id).items():
+                    if not mask or (best_score is not None and score < best_score):
+                        continue
+                    if best_score is None or score > best_score:
+                        best_score, options = score, []
+                    options.append((day, tutor_id, mask, room_fits))
+        if not options:
+            result.unplaced.append(index)
+            continue
+
+        day, tutor_id, mask, room_fits = rng.choice(options)
+        start = rng.choice(list(_bits(mask)))
+        room_id = rng.choice([r for r, fits in room_fits.items() if fits >> start & 1])
+        placement = Placement(index, day, start, tutor_id, room_id)
+        _book(problem, busy, placement)
+        course_days.add((session.course_id, day))
+        result.placements.append(placement)
+        result.score += best_score
+    return result
+
+
+def _book(problem, busy, placement):
+    session = problem.sessions[placement.session]
+    mask = ((1 << session.minutes) - 1) << placement.start
+    for day in [placement.day, *problem.overlapping_days(placement.day)]:
+        for key in ((day, TUTOR, placement.tutor_id), (day, ROOM, placement.room_id), (day, COHORT, session.cohort)):
+            busy[key] = busy.get(key, 0) | mask
+
+
+def search(problem, restarts=8, workers=1, seed=0, progress=None):
+    """Run `restarts` seeded solve() passes (in `workers` processes) and return the best Result.
+
+    `progress(done, total, best)` is called after each pass.
+    """
+    seeds = [seed + i for i in range(restarts)]
+    best = None
+
+    def finished(result, done):
+        nonlocal best
+        if best is None or result.rank() < best.rank():
+            best = result
+        if progress:
+            progress(done, len(seeds), best)
+
+    if workers <= 1 or restarts <= 1:
+        for done, s in enumerate(seeds, 1):
+            finished(solve(problem, s), done)
+        return best
+
+    # workers only need the pickled Problem; django.setup() lets them import this module under spawn
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        futures = [pool.submit(solve, problem, s) for s in seeds]
+        for done, future in enumerate(as_completed(futures), 1):
+            finished(future.result(), done)
+    return best
+
+
+def describe(problem, placement):
+    """A Placement as the JSON the API and command report."""
+    session = problem.sessions[placement.session]
+    kind, value = placement.day
+    date = problem.first_date(value) if kind == "w" else value
+    start = datetime.time(placement.start // 60, placement.start % 60)
+    end_minute = placement.start + session.minutes
+    return {
+        "course": session.course_id,
+        "title": session.title,
+        "event_type": session.kind,
+        "date": date.isoformat(),
+        "weekly_until": problem.term_end.isoformat() if kind == "w" else None,
+        "start_time": start.strftime("%H:%M"),
+        "end_time": datetime.time(end_minute // 60, end_minute % 60).strftime("%H:%M"),
+        "tutor": placement.tutor_id,
+        "room": placement.room_id,
+    }
+
+
+def commit(problem, result, user=None):
+    """Write `result` as pending events (weekly series and single exams).
+
+    The plan was searched against a snapshot of the timetable, so it is
+    checked again inside the writing transaction: a placement that now clashes
+    with an event created or approved meanwhile is dropped, not double-booked.
+    Returns (created events, describe() rows of the dropped placements).
+    """
+    planned = []
+    for placement in result.placements:
+        row = describe(problem, placement)
+        event = ScheduledEvent(
+            title=row["title"], date=datetime.date.fromisoformat(row["date"]),
+            start_time=datetime.time.fromisoformat(row["start_time"]), end_time=datetime.time.fromisoformat(row["end_time"]),
+            course_id=row["course"], tutor_id=row["tutor"], room_id=row["room"],
+            event_type=row["event_type"], status="pending",
+        )
+        until = datetime.date.fromisoformat(row["weekly_until"]) if row["weekly_until"] else None
+        dates = rule_dates(event.date, {"frequency": "weekly", "interval": 1, "until": until, "exceptions": []} if until else None)
+        planned.append((row, event, until, dates))
+
+    events, rules, clashed = [], [], []
+    with transaction.atomic():
+        index = ConflictIndex.load(
+            {d for *_, dates in planned for d in dates},
+            {e.tutor_id for _, e, _, _ in planned}, {e.room_id for _, e, _, _ in planned},
+        )
+        for row, event, until, dates in planned:
+            if index.check_dates(dates, event.start_time, event.end_time, event.tutor_id, event.room_id):
+                clashed.append(row)
+                continue
+            events.append(event)
+            rules.append(until)
+        ScheduledEvent.objects.bulk_create(events, batch_size=1000)
+        EventRecurrence.objects.bulk_create(
+            [EventRecurrence(event=e, frequency="weekly", until=until) for e, until in zip(events, rules) if until],
+            batch_size=1000,
+        )
+        if user is not None:
+            with audit.batch():
+                for e in events:
+                    audit.record(user, "createEvent", event=e)
+    if not events:
+        return events, clashed
+    # bulk_create bypasses save() and its signals; the weekly series occupy every week of the term
+    days = {problem.term_start + datetime.timedelta(days=i) for i in range((problem.term_end - problem.term_start).days + 1)}
+    invalidate_after_bulk_write(events, days | set(problem.exam_dates))
+    return events, clashed
+
+
+def schedule_term(term_start, term_end, restarts=8, workers=1, seed=0, progress=None, **problem_options):
+    """build_problem() + search(); returns (problem, skipped, best Result, seconds spent searching)."""
+    problem, skipped = build_problem(term_start, term_end, **problem_options)
+    started = time.perf_counter()
+    best = search(problem, restarts=restarts, workers=workers, seed=seed, progress=progress)
+    return problem, skipped, best, time.perf_counter() - started
@@ -1,13 +1,50 @@
 from rest_framework import serializers
-from .models import ScheduledEvent, Course, Room, AuditLog
+from .models import ScheduledEvent, EventRecurrence, Course, Room, AuditLog
+from .recurrence import MAX_OCCURRENCES, rule_dates
 from django.contrib.auth import get_user_model
+import datetime
 
 User = get_user_model()
 
+
+class EventRecurrenceSerializer(serializers.ModelSerializer):
+    """Repeat rule of a series. Pass `anchor_date` (the series' first date) in the context to validate `until`."""
+
+    class Meta:
+        model = EventRecurrence
+        fields = ["frequency", "interval", "until", "exceptions"]
+
+    def validate_interval(self, value):
+        if value < 1:
+            raise serializers.ValidationError("interval must be at least 1.")
+        return value
+
+    def validate_exceptions(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError("exceptions must be a list of YYYY-MM-DD dates.")
+        try:
+            return sorted({datetime.date.fromisoformat(str(d)).isoformat() for d in value})
+        except ValueError:
+            raise serializers.ValidationError("exceptions must be a list of YYYY-MM-DD dates.")
+
+    def validate(self, attrs):
+        # fill model defaults so validated_data is a complete rule for rule_dates()
+        attrs.setdefault("frequency", "weekly")
+        attrs.setdefault("interval", 1)
+        attrs.setdefault("exceptions", [])
+        anchor = self.context.get("anchor_date")
+        if anchor is not None:
+            if attrs["until"] < anchor:
+                raise serializers.ValidationError({"until": "until must not be before the event date."})
+            if len(rule_dates(anchor, attrs)) > MAX_OCCURRENCES:
+                raise serializers.ValidationError(f"A series may have at most {MAX_OCCURRENCES} occurrences.")
+        return attrs
+
 class ScheduledEventSerializer(serializers.ModelSerializer):
     course_name = serializers.SerializerMethodField(read_only=True)
     room_name = serializers.SerializerMethodField(read_only=True)
     tutor_name = serializers.SerializerMethodField(read_only=True)
+    recurrence = EventRecurrenceSerializer(read_only=True)
     class Meta:
         model = ScheduledEvent
         # expose all model fields; SerializerMethodFields are added automatically
@@ -42,37 +79,61 @@ class ScheduledEventSerializer(serializers.ModelSerializer):
             return None
 
 
+class ScheduledEventRowSerializer(serializers.Serializer):
+    """Read-only serializer over the dicts produced by `ScheduledEvent.objects.as_rows()`.
+
+    Renders the same payload as ScheduledEventSerializer, but from a single
+    joined `.values()` query instead of model instances with lazy FK loads.
+    Expanded series occurrences (calendar_app.recurrence.expand_rows) render
+    with the series id and the occurrence's own date.
+    """
+    id = serializers.IntegerField()
+    course_name = serializers.CharField(allow_null=True)
+    room_name = serializers.CharField(allow_null=True)
+    tutor_name = serializers.SerializerMethodField()
+    title = serializers.CharField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    event_type = serializers.CharField()
+    status = serializers.CharField()
+    notes = serializers.CharField(allow_null=True)
+    course = serializers.IntegerField()
+    tutor = serializers.IntegerField(allow_null=True)
+    room = serializers.IntegerField()
+    related_event = serializers.IntegerField(allow_null=True)
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField()
+    recurrence = serializers.SerializerMethodField()
+
+    def get_tutor_name(self, row):
+        return row.get("tutor_username") or row.get("tutor_email") or None
+
+    def get_recurrence(self, row):
+        if row.get("recurrence_frequency") is None:
+            return None
+        return {
+            "frequency": row["recurrence_frequency"],
+            "interval": row["recurrence_interval"],
+            "until": row["recurrence_until"].isoformat(),
+            "exceptions": row["recurrence_exceptions"],
+        }
+
+
 class AuditLogSerializer(serializers.ModelSerializer):
+    """Reads `user` and `event.course`: query with AuditLog.objects.with_related()."""
     user_email = serializers.SerializerMethodField()
     event_details = serializers.SerializerMethodField()
-    student_details = serializers.SerializerMethodField()
-    notes = serializers.SerializerMethodField()
 
     class Meta:
         model = AuditLog
-        fields = ['id', 'user_email', 'action', 'event_details', 'student_details', 'notes', 'timestamp']
+        fields = ['id', 'user_email', 'action', 'event_details', 'notes', 'timestamp']
 
     def get_user_email(self, obj):
         return obj.user.email or obj.user.username
 
     def get_event_details(self, obj):
-        try:
-            if obj.event:
-                return f"Course: {obj.event.course.name}, Time: {obj.event.date} {obj.event.start_time}"
-        except Exception:
-            pass
-        return None
-
-    def get_student_details(self, obj):
-        try:
-            if obj.student:
-                return {"id": obj.student.id, "student_id": obj.student.student_id, "name": obj.student.name}
-        except Exception:
-            pass
-        return None
-
-    def get_notes(self, obj):
-        try:
-            return obj.notes
-        except Exception:
+        event = obj.event
+        if event is None or event.course is None:
             return None
+        return f"Course: {event.course.name}, Time: {event.date} {event.start_time}"
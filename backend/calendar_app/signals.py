@@ -0,0 +1,213 @@
+"""Model signal handlers, connected in CalendarAppConfig.ready().
+
+- Bump the version tokens in calendar_app.versioning whenever the models
+  behind a conditional-GET endpoint are written.
+- Keep delta sync (calendar_app.sync) complete: leave an EventTombstone for
+  every deleted event and, with the cohort it left, for every event moved to
+  another cohort; touch `updated_at` on events whose rendered row changes
+  through a related model (repeat rule, course/room/tutor names).
+- Drop the cached cohort timetables (calendar_app.timetables) and mark the
+  ICS feeds (calendar_app.feeds) an event write affects; drop cached student
+  -> cohort and feed token lookups when a profile or user changes.
+- Drop the cached room occupancy (calendar_app.availability) of every day an
+  event or its repeat rule occupied before and after the write.
+
+bulk_create() and QuerySet.update() send no signals; their callers bump
+explicitly, bulk-created events through `invalidate_after_bulk_write()`.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.utils import timezone
+
+from users.models import StudentProfile, TutorProfile
+from . import feeds, timetables, versioning
+from .availability import invalidate_days
+from .models import Course, EventRecurrence, EventTombstone, Major, Room, ScheduledEvent
+from .recurrence import rule_dates
+
+User = get_user_model()
+
+SCOPES_BY_MODEL = {
+    ScheduledEvent: (versioning.EVENTS,),
+    EventRecurrence: (versioning.EVENTS,),
+    Course: (versioning.COURSES,),
+    Room: (versioning.ROOMS,),
+    Major: (versioning.MAJORS,),
+    TutorProfile: (versioning.TUTORS,),
+    StudentProfile: (versioning.STUDENTS,),
+}
+
+
+def invalidate_after_bulk_write(events, days=None):
+    """What saving each of `events` would have invalidated, for events written with bulk_create().
+
+    Drops the cached room occupancy of `days` (default: the events' dates;
+    pass every occurrence date for series), the cohort timetables and feeds
+    of the events' courses and tutors, and bumps the events version.
+    """
+    invalidate_days({e.date for e in events} if days is None else days)
+    timetables.invalidate_courses({e.course_id for e in events})
+    feeds.mark_events(events)
+    versioning.bump(versioning.EVENTS)
+
+
+def _bump_for(sender, **kwargs):
+    versioning.bump(*SCOPES_BY_MODEL[sender])
+
+
+def _user_changed(sender, instance, update_fields=None, **kwargs):
+    # logging in rewrites last_login on every token refresh; nothing listed depends on it
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    versioning.bump(versioning.TUTORS)
+
+
+def _touch_events(**filters):
+    ScheduledEvent.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+def _event_deleted(sender, instance, **kwargs):
+    EventTombstone.objects.create(event_id=instance.pk)
+
+
+def _left_cohort(event_ids, major_id, year):
+    if major_id is not None and event_ids:
+        EventTombstone.objects.bulk_create([EventTombstone(event_id=pk, major_id=major_id, year=year) for pk in event_ids])
+
+
+def _recurrence_changed(sender, instance, **kwargs):
+    _touch_events(pk=instance.event_id)
+
+
+def _course_moving(sender, instance, raw=False, **kwargs):
+    # the cohort an edited course is leaving, for _course_saved
+    instance._previous_cohort = None
+    if instance.pk and not raw:
+        instance._previous_cohort = Course.objects.filter(pk=instance.pk).values_list("major_id", "year").first()
+
+
+def _course_saved(sender, instance, created=False, **kwargs):
+    if not created:
+        previous, instance._previous_cohort = getattr(instance, "_previous_cohort", None), None
+        if previous and previous != (instance.major_id, instance.year):
+            _left_cohort(list(ScheduledEvent.objects.filter(course_id=instance.pk).values_list("id", flat=True)), *previous)
+        _touch_events(course_id=instance.pk)
+
+
+def _room_saved(sender, instance, created=False, **kwargs):
+    if not created:
+        _touch_events(room_id=instance.pk)
+
+
+def _tutor_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    # event rows render the tutor's username/email
+    if not created and not (update_fields and set(update_fields) <= {"last_login"}):
+        _touch_events(tutor_id=instance.pk)
+
+
+def _audiences_changed(rows):
+    """Invalidate what renders events with these (major_id, year, tutor_id): cohort timetables and ICS feeds."""
+    rows = list(rows)
+    timetables.invalidate({(major_id, year) for major_id, year, _ in rows})
+    feeds.mark_changed({(major_id, year) for major_id, year, _ in rows}, {tutor_id for _, _, tutor_id in rows})
+
+
+RULE_FIELDS = ("frequency", "interval", "until", "exceptions")
+
+
+def _event_moving(sender, instance, raw=False, **kwargs):
+    # the cohort / tutor / days an edited event is leaving; post_save handles the ones it lands on
+    instance._previous_cohort = None
+    instance._previous_days = ()
+    instance._rule = None
+    if instance.pk and not raw:
+        rows = list(ScheduledEvent.objects.filter(pk=instance.pk).values_list(
+            "course__major_id", "course__year", "tutor_id", "date", *(f"recurrence__{f}" for f in RULE_FIELDS),
+        ))
+        _audiences_changed(row[:3] for row in rows)
+        if rows:
+            instance._previous_cohort = rows[0][:2]
+            # saving the event leaves its rule as it is; the rule's own handlers cover rule writes
+            instance._rule = dict(zip(RULE_FIELDS, rows[0][4:])) if rows[0][4] is not None else None
+            instance._previous_days = rule_dates(rows[0][3], instance._rule)
+
+
+def _event_written(sender, instance, **kwargs):
+    major_id, year = Course.objects.filter(pk=instance.course_id).values_list("major_id", "year").first() or (None, None)
+    _audiences_changed([(major_id, year, instance.tutor_id)])
+    # set by _event_moving for this save only (post_delete passes here too, after the rule's own delete)
+    previous, instance._previous_cohort = getattr(instance, "_previous_cohort", None), None
+    if previous and previous != (major_id, year):
+        _left_cohort([instance.pk], *previous)
+    previous_days, instance._previous_days = getattr(instance, "_previous_days", ()), ()
+    rule, instance._rule = getattr(instance, "_rule", None), None
+    invalidate_days({*previous_days, *rule_dates(instance.date, rule)})
+
+
+def _recurrence_moving(sender, instance, raw=False, **kwargs):
+    # the days the rule occupied before this save
+    instance._previous_days = ()
+    if instance.pk and not raw:
+        row = EventRecurrence.objects.filter(pk=instance.pk).values("event__date", *RULE_FIELDS).first()
+        if row:
+            instance._previous_days = rule_dates(row["event__date"], row)
+
+
+def _recurrence_written(sender, instance, **kwargs):
+    rows = list(ScheduledEvent.objects.filter(pk=instance.event_id).values_list(
+        "course__major_id", "course__year", "tutor_id", "date",
+    ))
+    _audiences_changed(row[:3] for row in rows)
+    previous_days, instance._previous_days = getattr(instance, "_previous_days", ()), ()
+    invalidate_days({*previous_days, *(d for row in rows for d in rule_dates(row[3], instance))})
+
+
+def _student_moving(sender, instance, raw=False, **kwargs):
+    # a profile handed to another user: the previous one no longer has that cohort
+    if instance.pk and not raw:
+        previous = StudentProfile.objects.filter(pk=instance.pk).values_list("user_id", flat=True).first()
+        if previous and previous != instance.user_id:
+            timetables.forget_students([previous])
+
+
+def _student_written(sender, instance, **kwargs):
+    timetables.forget_students([instance.user_id])
+
+
+def _user_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    # a role change moves the user's feed to another audience
+    if not created and not (update_fields and set(update_fields) <= {"last_login"}):
+        feeds.forget_user(instance.pk)
+
+
+def _tutor_courses_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        versioning.bump(versioning.TUTORS)
+
+
+def connect():
+    for model in SCOPES_BY_MODEL:
+        post_save.connect(_bump_for, sender=model, dispatch_uid=f"versioning-save-{model._meta.label}")
+        post_delete.connect(_bump_for, sender=model, dispatch_uid=f"versioning-delete-{model._meta.label}")
+    post_save.connect(_user_changed, sender=User, dispatch_uid="versioning-save-user")
+    post_delete.connect(_user_changed, sender=User, dispatch_uid="versioning-delete-user")
+    m2m_changed.connect(_tutor_courses_changed, sender=TutorProfile.courses.through, dispatch_uid="versioning-tutor-courses")
+
+    post_delete.connect(_event_deleted, sender=ScheduledEvent, dispatch_uid="sync-tombstone")
+    post_save.connect(_recurrence_changed, sender=EventRecurrence, dispatch_uid="sync-recurrence-save")
+    post_delete.connect(_recurrence_changed, sender=EventRecurrence, dispatch_uid="sync-recurrence-delete")
+    pre_save.connect(_course_moving, sender=Course, dispatch_uid="sync-course-moving")
+    post_save.connect(_course_saved, sender=Course, dispatch_uid="sync-course-save")
+    post_save.connect(_room_saved, sender=Room, dispatch_uid="sync-room-save")
+    post_save.connect(_tutor_saved, sender=User, dispatch_uid="sync-tutor-save")
+
+    pre_save.connect(_event_moving, sender=ScheduledEvent, dispatch_uid="timetable-event-pre-save")
+    post_save.connect(_event_written, sender=ScheduledEvent, dispatch_uid="timetable-event-save")
+    post_delete.connect(_event_written, sender=ScheduledEvent, dispatch_uid="timetable-event-delete")
+    pre_save.connect(_recurrence_moving, sender=EventRecurrence, dispatch_uid="timetable-recurrence-pre-save")
+    post_save.connect(_recurrence_written, sender=EventRecurrence, dispatch_uid="timetable-recurrence-save")
+    post_delete.connect(_recurrence_written, sender=EventRecurrence, dispatch_uid="timetable-recurrence-delete")
+    pre_save.connect(_student_moving, sender=StudentProfile, dispatch_uid="timetable-student-moving")
+    post_save.connect(_student_written, sender=StudentProfile, dispatch_uid="timetable-student-save")
+    post_delete.connect(_student_written, sender=StudentProfile, dispatch_uid="timetable-student-delete")
+    post_save.connect(_user_saved, sender=User, dispatch_uid="feed-user-save")
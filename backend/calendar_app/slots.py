@@ -0,0 +1,218 @@
+"""Free-slot search over minute bitmaps.
+
+`OccupancyGrid` holds per-day bitmaps (bit `m` set = busy during minute `m`,
+as in calendar_app.availability) for tutors, rooms and cohorts (the students
+of a major/year). Finding where a slot of `duration` minutes fits is then a
+few shifts and ANDs per day:
+
+    run_starts(free, duration)  bit m set <=> minutes m .. m+duration-1 all free
+
+`OccupancyGrid.load()` reads every active event in a range; `load_for()` only
+reads the given tutors' and cohorts' events and takes room bitmaps from the
+per-day occupancy cache, so searching a whole term for one course is a small
+indexed query plus integer arithmetic.
+"""
+import datetime
+import itertools
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .availability import occupancy_for_days, slot_mask
+from .conflicts import INACTIVE_STATUSES, to_minutes
+from .models import Course, Room, ScheduledEvent
+from .recurrence import occurrence_dates
+
+# scheduling hours offered by the event form (06:00 .. 18:55)
+DAY_START = datetime.time(6, 0)
+DAY_END = datetime.time(19, 0)
+
+
+def run_starts(free, length):
+    """Bits m of `free` such that bits m .. m+length-1 are all set."""
+    result, covered = free, 1
+    while covered < length and result:
+        shift = min(covered, length - covered)
+        result &= result >> shift
+        covered += shift
+    return result
+
+
+def cohort_of(course_id, major_id, year):
+    """Students who attend a course: its major/year, or just the course when it has no major."""
+    if major_id is None:
+        return ("course", course_id)
+    return ("major", major_id, year)
+
+
+def start_grid(day_start=DAY_START, day_end=DAY_END, step=15):
+    """(window, starts): the minutes of [day_start, day_end) and the allowed start minutes in it."""
+    first, last = to_minutes(day_start), to_minutes(day_end)
+    starts = 0
+    for m in range(first, last, step):
+        starts |= 1 << m
+    return slot_mask(day_start, day_end), starts
+
+
+def _minute(m):
+    return datetime.time(m // 60, m % 60)
+
+
+class OccupancyGrid:
+    """Per-day busy bitmaps for tutors, rooms and cohorts over a date range."""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.tutors = defaultdict(int)   # (day, tutor_id) -> mask
+        self.rooms = defaultdict(int)    # (day, room_id) -> mask
+        self.cohorts = defaultdict(int)  # (day, cohort) -> mask
+
+    @classmethod
+    def load(cls, start, end):
+        """Fold every active event in [start, end] into the grid (one query for singles, one for series)."""
+        grid = cls(start, end)
+        grid._fold(ScheduledEvent.objects.split_window(start, end), rooms=True)
+        return grid
+
+    @classmethod
+    def load_for(cls, start, end, tutor_ids, cohorts):
+        """A grid with complete room bitmaps but only the given tutors' and cohorts' bookings.
+
+        Rooms come from the per-day occupancy cache; the tutors and cohorts are
+        one query for singles and one for series.
+        """
+        grid = cls(start, end)
+        course_q = Q(pk__in=[c[1] for c in cohorts if c[0] == "course"])
+        for cohort in cohorts:
+            if cohort[0] == "major":
+                course_q |= Q(major_id=cohort[1], year=cohort[2])
+        # course ids as a subquery so both sides of the OR can use their FK index
+        course_ids = Course.objects.filter(course_q).values("id")
+        resource_q = Q(tutor_id__in=set(tutor_ids)) | Q(course_id__in=course_ids)
+        parts = (
+            ScheduledEvent.objects.filter(resource_q).singles_in_window(start, end),
+            ScheduledEvent.objects.series_using(start, end, tutor_id=set(tutor_ids), course_id=course_ids),
+        )
+        grid._fold(parts, rooms=False, tutor_ids=set(tutor_ids), cohorts=set(cohorts))
+        days = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+        for day, occupancy in occupancy_for_days(days).items():
+            for room_id, mask in occupancy.rooms.items():
+                grid.rooms[(day, room_id)] = mask
+        return grid
+
+    def _fold(self, parts, rooms, tutor_ids=None, cohorts=None):
+        rows = itertools.chain.from_iterable(
+            part.exclude(status__in=INACTIVE_STATUSES).values_list(
+                "date", "start_time", "end_time", "tutor_id", "room_id", "course_id", "course__major_id", "course__year",
+                "recurrence__frequency", "recurrence__interval", "recurrence__until", "recurrence__exceptions",
+            )
+            for part in parts
+        )
+        for (date, start_time, end_time, tutor_id, room_id, course_id, major_id, year,
+             frequency, interval, until, exceptions) in rows:
+            if tutor_ids is not None and tutor_id not in tutor_ids:
+                tutor_id = None
+            cohort = cohort_of(course_id, major_id, year)
+            if cohorts is not None and cohort not in cohorts:
+                cohort = None
+            if not rooms:
+                room_id = None
+            mask = slot_mask(start_time, end_time)
+            if frequency is None:
+                self.add(date, mask, tutor_id, room_id, cohort)
+                continue
+            for d in occurrence_dates(date, frequency, interval, until, exceptions, self.start, self.end):
+                self.add(d, mask, tutor_id, room_id, cohort)
+
+    def add(self, day, mask, tutor_id=None, room_id=None, cohort=None):
+        if tutor_id is not None:
+            self.tutors[(day, tutor_id)] |= mask
+        if room_id is not None:
+            self.rooms[(day, room_id)] |= mask
+        if cohort is not None:
+            self.cohorts[(day, cohort)] |= mask
+
+    def days(self, include_weekends=False):
+        day = self.start
+        while day <= self.end:
+            if include_weekends or day.weekday() < 5:
+                yield day
+            day += datetime.timedelta(days=1)
+
+    def free_starts(self, day, duration, room_ids, tutor_id=None, cohort=None, grid=None):
+        """Start minutes on `day` where the tutor and cohort are free for `duration` and some room is too.
+
+        `grid` is a start_grid() (window, allowed starts). Returns
+        (starts_mask, {room_id: starts_mask for that room}).
+        """
+        window, allowed = grid or start_grid()
+        blocked = self.tutors.get((day, tutor_id), 0) | self.cohorts.get((day, cohort), 0)
+        starts = run_starts(window & ~blocked, duration) & allowed
+        if not starts:
+            return 0, {}
+        any_room = 0
+        room_starts = {}
+        empty_room = None
+        for room_id in room_ids:
+            busy = self.rooms.get((day, room_id), 0)
+            if busy:
+                fits = run_starts(window & ~busy, duration) & starts
+            else:
+                if empty_room is None:
+                    empty_room = run_starts(window, duration) & starts
+                fits = empty_room
+            if fits:
+                room_starts[room_id] = fits
+                any_room |= fits
+        return starts & any_room, room_starts
+
+    def touching(self, day, starts, duration, tutor_id=None, cohort=None):
+        """Split `starts` by how many edges of the slot touch an existing tutor/cohort booking.
+
+        Returns {2: mask, 1: mask, 0: mask}; slots that touch leave fewer gaps in the day.
+        """
+        busy = self.tutors.get((day, tutor_id), 0) | self.cohorts.get((day, cohort), 0)
+        before = (busy << 1) & starts
+        after = (busy >> duration) & starts
+        both = before & after
+        return {2: both, 1: (before | after) & ~both, 0: starts & ~(before | after)}
+
+
+def find_free_slots(course, tutor_id, duration, start, end, limit=20, step=15,
+                    day_start=DAY_START, day_end=DAY_END, include_weekends=False):
+    """Ranked slots of `duration` minutes in [start, end] where the tutor, the course's cohort and a room are free.
+
+    Slots that sit next to the tutor's or cohort's existing bookings rank first
+    (they leave fewer gaps), then earlier slots. Each result lists its free rooms.
+    """
+    cohort = cohort_of(course.id, course.major_id, course.year)
+    grid = OccupancyGrid.load_for(start, end, tutor_ids=[tutor_id], cohorts=[cohort])
+    starts_grid = start_grid(day_start, day_end, step)
+    rooms = dict(Room.objects.order_by("name").values_list("id", "name"))
+
+    per_day = []
+    for day in grid.days(include_weekends):
+        starts, room_starts = grid.free_starts(day, duration, rooms, tutor_id, cohort, starts_grid)
+        if starts:
+            per_day.append((day, grid.touching(day, starts, duration, tutor_id, cohort), room_starts))
+
+    # best score first, then earliest: walk the score classes, days in order, bits low to high
+    slots = []
+    for score in (2, 1, 0):
+        for day, by_score, room_starts in per_day:
+            mask = by_score[score]
+            while mask and len(slots) < limit:
+                m = (mask & -mask).bit_length() - 1
+                mask &= mask - 1
+                slots.append({
+                    "date": day.isoformat(),
+                    "start_time": _minute(m).strftime("%H:%M"),
+                    "end_time": _minute(m + duration).strftime("%H:%M"),
+                    "score": score,
+                    "rooms": [
+                        {"id": room_id, "name": rooms[room_id]}
+                        for room_id, fits in room_starts.items() if fits >> m & 1
+                    ],
+                })
+    return slots
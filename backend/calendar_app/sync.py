@@ -0,0 +1,131 @@
+"""Delta sync for the calendar: what changed in ScheduledEvent since a cursor.
+
+Two streams are merged by time:
+  - events, keyed by (updated_at, id): inserts and updates, one row per event
+    (series come unexpanded, with their repeat rule, exactly like a row of the
+    events list before expansion);
+  - tombstones, keyed by (deleted_at, id): deletions.
+
+The cursor remembers the key of the last row consumed from each stream, so a
+page boundary between rows stamped in the same microsecond never drops or
+repeats a change. Without a cursor every live event is returned as created (a
+full sync) and the tombstone stream starts after the latest deletion.
+
+A student only walks their cohort's events. An event that leaves the cohort
+reaches them through the tombstone its move leaves for that cohort
+(calendar_app.signals); changes in other cohorts are never reported.
+
+Tombstones are kept TOMBSTONE_RETENTION_DAYS (`manage.py prune_tombstones`);
+a cursor older than that is rejected and the client has to resync.
+"""
+import datetime
+import heapq
+import itertools
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EventTombstone
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_q
+
+TOMBSTONE_RETENTION_DAYS = 30
+# When the tombstone stream is drained its position moves up to now minus this,
+# so an idle cursor does not age out; the lag covers deletes stamped just
+# before their transaction committed.
+TOMBSTONE_SETTLE = datetime.timedelta(minutes=1)
+
+CHANGE_CURSOR_FIELDS = ("updated_at", "id")
+TOMBSTONE_CURSOR_FIELDS = ("deleted_at", "id")
+
+
+def _parse_datetime(value):
+    return None if value is None else datetime.datetime.fromisoformat(value)
+
+
+def _parse_id(value):
+    return None if value is None else int(value)
+
+
+CURSOR_PARSERS = (_parse_datetime, _parse_id, _parse_datetime, int)
+
+
+class CursorExpired(InvalidCursor):
+    pass
+
+
+def decode_sync_cursor(cursor):
+    """Return ((updated_at, id) | None, (deleted_at, id)) from a cursor string."""
+    updated_at, event_id, deleted_at, tombstone_id = decode_cursor(cursor, CURSOR_PARSERS)
+    if deleted_at is None:
+        raise InvalidCursor("Invalid cursor: missing tombstone position")
+    if deleted_at < timezone.now() - datetime.timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise CursorExpired("Cursor is older than the tombstone retention window; resync from scratch.")
+    events_after = (updated_at, event_id) if updated_at is not None else None
+    return events_after, (deleted_at, tombstone_id)
+
+
+def changes(qs, limit, cursor=None, visible=None, cohort=None):
+    """One page of changes to the events in `qs` after `cursor` (a decode_sync_cursor() pair).
+
+    `visible` is an optional Q restricting what the caller may see; only those
+    events are walked. Deletions are reported to everyone; `cohort` (major_id,
+    year) adds the events that left that cohort, so an event moved out of a
+    student's cohort disappears from their calendar too.
+
+    Returns {"created": [rows], "updated": [rows], "deleted": [ids], "cursor", "has_more"}.
+    Clients should upsert both created and updated rows by id.
+    """
+    events_after, tombstones_after = cursor or (None, None)
+
+    events = qs.order_by(*CHANGE_CURSOR_FIELDS)
+    if events_after:
+        events = events.filter(keyset_q(CHANGE_CURSOR_FIELDS, events_after))
+    if visible is not None:
+        events = events.filter(visible)
+    rows = list(events.as_rows()[:limit + 1])
+
+    if cursor is None:
+        # a full sync already reflects every earlier deletion
+        latest = EventTombstone.objects.order_by("-deleted_at", "-id").values_list("deleted_at", "id").first()
+        tombstones_after = latest or (timezone.now(), 0)
+        tombstones = []
+    else:
+        # deletions, plus the events that left the caller's cohort; other cohorts' moves are not theirs
+        reported = Q(major_id__isnull=True)
+        if cohort:
+            reported |= Q(major_id=cohort[0], year=cohort[1])
+        tombstones = list(
+            EventTombstone.objects.order_by(*TOMBSTONE_CURSOR_FIELDS)
+            .filter(keyset_q(TOMBSTONE_CURSOR_FIELDS, tombstones_after))
+            .filter(reported)
+            .values("id", "event_id", "deleted_at")[:limit + 1]
+        )
+
+    merged = heapq.merge(
+        (((r["updated_at"], r["id"]), False, r) for r in rows),
+        (((t["deleted_at"], t["id"]), True, t) for t in tombstones),
+        key=lambda item: item[0],
+    )
+    page = list(itertools.islice(merged, limit + 1))
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    created, updated, deleted = [], [], []
+    since = events_after
+    consumed_tombstones = 0
+    for key, is_tombstone, item in page:
+        if is_tombstone:
+            tombstones_after = key
+            consumed_tombstones += 1
+            deleted.append(item["event_id"])
+        else:
+            events_after = key
+            # anything created after the previous position cannot have been sent before
+            (created if since is None or (item["created_at"], item["id"]) > since else updated).append(item)
+
+    if consumed_tombstones == len(tombstones) <= limit:
+        settled = (timezone.now() - TOMBSTONE_SETTLE, 0)
+        tombstones_after = max(tombstones_after, settled)
+
+    next_cursor = encode_cursor([*(events_after or (None, None)), *tombstones_after])
+    return {"created": created, "updated": updated, "deleted": deleted, "cursor": next_cursor, "has_more": has_more}
@@ -0,0 +1,106 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from calendar_app import audit
+from calendar_app.models import Course, Room, ScheduledEvent, AuditLog, Major
+import datetime
+
+User = get_user_model()
+
+
+def inserts(queries):
+    return [q["sql"] for q in queries if q["sql"].startswith('INSERT INTO "calendar_app_auditlog"')]
+
+
+class AuditBatchTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+
+    def test_a_batch_writes_once_at_the_end(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with audit.batch():
+                first = audit.record(self.admin, "createStudent", notes="one")
+                for i in range(20):
+                    audit.record(self.admin, "createStudent", notes=f"row {i}")
+                self.assertEqual(AuditLog.objects.count(), 0)
+        self.assertEqual(len(inserts(ctx.captured_queries)), 1)
+        self.assertEqual(AuditLog.objects.count(), 21)
+        # stamped when recorded, not when written
+        self.assertEqual(AuditLog.objects.get(notes="one").timestamp, first.timestamp)
+
+    def test_nested_batches_and_failures(self):
+        with audit.batch():
+            audit.record(self.admin, "createStudent", notes="outer")
+            with audit.batch():
+                audit.record(self.admin, "createStudent", notes="inner")
+            self.assertEqual(AuditLog.objects.count(), 0)
+            with self.assertRaises(ValueError):
+                with audit.batch():
+                    audit.record(self.admin, "createStudent", notes="rolled back")
+                    raise ValueError
+        self.assertEqual(set(AuditLog.objects.values_list("notes", flat=True)), {"outer", "inner"})
+
+    def test_outside_a_batch_entries_are_written_at_once(self):
+        audit.record(self.admin, "promoteStudent", notes="Promoted 3 students; skipped 0")
+        self.assertEqual(AuditLog.objects.get().action, "promoteStudent")
+
+    def test_a_request_writes_its_entries_together(self):
+        self.client.force_authenticate(user=self.admin)
+        rows = [
+            {
+                "title": "Lecture", "date": "2025-01-06", "start_time": f"{9 + i:02d}:00", "end_time": f"{10 + i:02d}:00",
+                "course": self.course.id, "tutor": self.tutor.id, "room": self.room.id, "event_type": "lecture",
+            }
+            for i in range(5)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post("/api/calendar/events/bulk/", {"events": rows}, format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(len(inserts(ctx.captured_queries)), 1)
+        self.assertEqual(
+            set(AuditLog.objects.values_list("event_id", flat=True)),
+            set(ScheduledEvent.objects.values_list("id", flat=True)),
+        )
+
+    def test_staff_creation_is_logged(self):
+        # used to pass a field the model no longer had, and the error was swallowed
+        self.client.force_authenticate(user=self.admin)
+        res = self.client.post("/api/users/create-staff/", {"name": "New", "email": "new@test.com", "role": "tutor"}, format="json")
+        self.assertEqual(res.status_code, 201)
+        entry = AuditLog.objects.get()
+        self.assertEqual((entry.user, entry.action, entry.notes), (self.admin, "createStaff", "Created staff user new@test.com"))
+
+
+@override_settings(AUDIT_LOG_ASYNC=True)
+class AsyncAuditWriterTests(TransactionTestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+
+    def test_entries_are_written_in_the_background(self):
+        with audit.batch():
+            for i in range(30):
+                audit.record(self.admin, "createStudent", notes=f"row {i}")
+        audit.writer().drain()
+        self.assertEqual(AuditLog.objects.count(), 30)
+
+    def test_a_bad_entry_does_not_sink_its_batch(self):
+        major = Major.objects.create(name="CS")
+        event = ScheduledEvent.objects.create(
+            date=datetime.date(2025, 1, 6), start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+            course=Course.objects.create(name="CS101", major=major, year=1), room=Room.objects.create(name="Room 1"),
+            event_type="lecture",
+        )
+        gone = AuditLog(user=self.admin, action="editEvent", event_id=event.id + 1000)
+        audit.writer().submit([
+            AuditLog(user=self.admin, action="editEvent", event=event), gone,
+            AuditLog(user=self.admin, action="createStudent", notes="kept"),
+        ])
+        with self.assertLogs("calendar_app.audit", "ERROR"):
+            audit.writer().drain()
+        self.assertEqual(AuditLog.objects.count(), 2)
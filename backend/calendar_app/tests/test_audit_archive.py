@@ -0,0 +1,132 @@
+import gzip
+import json
+import shutil
+import tempfile
+from unittest import mock
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from calendar_app import audit_archive
+from calendar_app.models import Course, Room, ScheduledEvent, AuditLog, Major
+import datetime
+import io
+
+User = get_user_model()
+
+UTC = datetime.timezone.utc
+
+
+class AuditArchiveTests(APITestCase):
+    url = "/api/calendar/audit/logs/"
+
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        settings = override_settings(AUDIT_ARCHIVE_DIR=self.archive_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        audit_archive._segment.cache_clear()
+
+        self.admin = User.objects.create_user(username="admin", email="admin@test.com", password="password", role="administrator")
+        self.assistant = User.objects.create_user(username="daa", email="daa@test.com", password="password", role="department_assistant")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        self.event = ScheduledEvent.objects.create(
+            date=datetime.date(2025, 1, 6), start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+            course=self.course, room=self.room, event_type="lecture",
+        )
+        self.client.force_authenticate(user=self.admin)
+
+        # three old months, a few entries a day, and some recent ones
+        self.ids = []
+        start = datetime.datetime(2025, 1, 20, 8, 0, tzinfo=UTC)
+        for i in range(60):
+            self.add(start + datetime.timedelta(hours=23 * i), action=("createEvent", "approveEvent", "editEvent")[i % 3],
+                     user=(self.admin, self.assistant)[i % 2])
+        now = timezone.now()
+        for i in range(5):
+            self.add(now - datetime.timedelta(hours=i), action="createEvent", user=self.assistant)
+
+    def add(self, timestamp, action, user):
+        entry = AuditLog.objects.create(user=user, action=action, event=self.event, timestamp=timestamp)
+        self.ids.append(entry.id)
+        return entry
+
+    def page_through(self, **params):
+        rows, cursor = [], None
+        while True:
+            res = self.client.get(self.url, {**params, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(res.status_code, 200, res.data)
+            rows += res.data["results"]
+            cursor = res.data["next_cursor"]
+            if cursor is None:
+                return rows
+
+    def test_archives_whole_old_months(self):
+        out = io.StringIO()
+        call_command("archive_audit_logs", "--retention-days", "30", stdout=out)
+        self.assertIn("Archived 60 entries from 3 month(s)", out.getvalue())
+        self.assertEqual(AuditLog.objects.count(), 5)
+        self.assertEqual(sorted(p.name for p in audit_archive.segments().values()), [
+            "auditlog-2025-01.jsonl.gz", "auditlog-2025-02.jsonl.gz", "auditlog-2025-03.jsonl.gz",
+        ])
+        with gzip.open(audit_archive.segment_path(datetime.datetime(2025, 1, 1, tzinfo=UTC)), "rt") as f:
+            first = json.loads(f.readline())
+        self.assertEqual(first["id"], self.ids[0])
+        self.assertEqual(first["event_details"], "Course: CS101, Time: 2025-01-06 09:00:00")
+        self.assertEqual(audit_archive.horizon(), datetime.datetime(2025, 4, 1, tzinfo=UTC))
+
+    def test_the_api_reads_across_the_archive(self):
+        queries = [
+            {"limit": 7}, {"limit": 50, "action": "approveEvent"}, {"limit": 4, "user": self.admin.id},
+            {"limit": 6, "start": "2025-02-10", "end": "2025-03-01"}, {"limit": 3, "end": "2025-02-14T05:00:00Z"},
+        ]
+        before = [self.page_through(**q) for q in queries]
+        legacy = self.client.get(self.url).data
+        audit_archive.archive(retention_days=30)
+        for query, rows in zip(queries, before):
+            self.assertEqual(self.page_through(**query), rows, query)
+        self.assertEqual(len(before[0]), 65)
+        self.assertEqual(self.client.get(self.url).data, legacy)
+
+    def test_recent_pages_do_not_open_the_archive(self):
+        audit_archive.archive(retention_days=30)
+        with mock.patch.object(audit_archive, "search", wraps=audit_archive.search) as search:
+            res = self.client.get(self.url, {"limit": 3})
+            self.assertEqual(len(res.data["results"]), 3)
+            search.assert_not_called()
+            res = self.client.get(self.url, {"limit": 3, "cursor": res.data["next_cursor"]})
+            self.assertEqual(len(res.data["results"]), 3)
+            search.assert_called_once()
+
+    def test_rearchiving_merges_and_never_duplicates(self):
+        with mock.patch.object(AuditLog.objects, "filter", side_effect=RuntimeError("interrupted")):
+            # the segment is written, but the rows could not be deleted
+            with self.assertRaises(RuntimeError):
+                audit_archive.archive_month(datetime.datetime(2025, 1, 1, tzinfo=UTC))
+        self.assertEqual(AuditLog.objects.count(), 65)
+        late = self.add(datetime.datetime(2025, 1, 31, 23, 0, tzinfo=UTC), action="rejectEvent", user=self.admin)
+        audit_archive.archive(retention_days=30)
+        ids = [row["id"] for row in self.page_through(limit=1000)]
+        self.assertEqual(sorted(ids), sorted(self.ids))
+        self.assertIn(late.id, ids)
+
+    def test_archived_entries_outlive_their_event(self):
+        audit_archive.archive(retention_days=30)
+        self.event.delete()
+        rows = self.page_through(limit=100)
+        self.assertEqual(len(rows), 60)
+        self.assertEqual(rows[0]["event_details"], "Course: CS101, Time: 2025-01-06 09:00:00")
+
+    def test_archived_rows_read_back_with_their_timestamps(self):
+        audit_archive.archive(retention_days=30)
+        kept = AuditLog.objects.order_by("timestamp").first()
+        path = audit_archive.segment_path(datetime.datetime(2025, 3, 1, tzinfo=UTC))
+        with gzip.open(path, "rt") as f:
+            self.assertTrue(json.loads(f.readline())["timestamp"].endswith("Z"))
+        [(key, row)] = audit_archive.search(limit=1, before=kept.timestamp)
+        self.assertEqual(key, (datetime.datetime(2025, 3, 17, 21, 0, tzinfo=UTC), self.ids[59]))
+        self.assertEqual(row["action"], "editEvent")
@@ -0,0 +1,96 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from calendar_app.models import Course, Room, ScheduledEvent, AuditLog, Major
+import datetime
+
+User = get_user_model()
+
+T0 = datetime.datetime(2025, 3, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+class AuditLogApiTests(APITestCase):
+    url = "/api/calendar/audit/logs/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", email="admin@test.com", password="password", role="administrator")
+        self.assistant = User.objects.create_user(username="daa", password="password", role="department_assistant")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.courses = [Course.objects.create(name=f"C{i}", major=self.major, year=1) for i in range(3)]
+        self.room = Room.objects.create(name="Room 1")
+        self.client.force_authenticate(user=self.admin)
+
+    def log(self, n, action="createEvent", user=None, start=T0, step=datetime.timedelta(hours=1)):
+        """n entries, each on its own event, `step` apart from `start`."""
+        logs = []
+        for i in range(n):
+            event = ScheduledEvent.objects.create(
+                date=datetime.date(2025, 3, 3), start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+                course=self.courses[i % 3], tutor=self.tutor, room=self.room, event_type="lecture",
+            )
+            entry = AuditLog.objects.create(user=user or self.assistant, action=action, event=event)
+            AuditLog.objects.filter(pk=entry.pk).update(timestamp=start + i * step)
+            logs.append(entry.pk)
+        return logs
+
+    def page_through(self, **params):
+        ids, cursor = [], None
+        while True:
+            res = self.client.get(self.url, {**params, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(res.status_code, 200, res.data)
+            ids += [row["id"] for row in res.data["results"]]
+            cursor = res.data["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_newest_first(self):
+        ids = self.log(7)
+        # ties on the timestamp are broken by id
+        AuditLog.objects.filter(pk__in=ids[2:5]).update(timestamp=T0)
+        seen = self.page_through(limit=2)
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(set(seen), set(ids))
+        self.assertEqual(seen[:4], [ids[6], ids[5], ids[1], ids[4]])
+
+        row = self.client.get(self.url, {"limit": 1}).data["results"][0]
+        # no email on the account: the username stands in
+        self.assertEqual(row, {
+            "id": ids[6], "user_email": "daa", "action": "createEvent",
+            "event_details": "Course: C0, Time: 2025-03-03 09:00:00", "notes": "", "timestamp": "2025-03-01T18:00:00Z",
+        })
+
+    def test_filters(self):
+        created = self.log(3)
+        approved = self.log(2, action="approveEvent", user=self.admin, start=T0 + datetime.timedelta(days=1))
+        rejected = self.log(1, action="rejectEvent", start=T0 + datetime.timedelta(days=2))
+
+        self.assertEqual(self.page_through(action="approveEvent"), approved[::-1])
+        self.assertEqual(self.page_through(action="approveEvent,rejectEvent"), (approved + rejected)[::-1])
+        self.assertEqual(self.page_through(user=self.admin.id), approved[::-1])
+        # a bare end date includes that whole day
+        self.assertEqual(self.page_through(start="2025-03-02", end="2025-03-02"), approved[::-1])
+        self.assertEqual(self.page_through(end="2025-03-01T13:00:00Z"), created[:2][::-1])
+        self.assertEqual(self.page_through(start="2025-03-03T00:00:00"), rejected)
+
+        for bad in ({"start": "March"}, {"end": "2025-03-01 noon"}, {"user": "me"}, {"cursor": "x"}, {"limit": 0}):
+            self.assertEqual(self.client.get(self.url, bad).status_code, 400, bad)
+
+    def test_one_query_per_page(self):
+        self.log(5)
+        with self.assertNumQueries(1):
+            small = self.client.get(self.url, {"limit": 5})
+        self.log(40, action="editEvent", user=self.tutor)
+        with self.assertNumQueries(1):
+            large = self.client.get(self.url, {"limit": 45})
+        self.assertEqual(len(small.data["results"]), 5)
+        self.assertEqual(len(large.data["results"]), 45)
+
+    def test_legacy_list_is_capped(self):
+        self.log(3)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 3)
+
+    def test_administrators_only(self):
+        self.client.force_authenticate(user=self.assistant)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
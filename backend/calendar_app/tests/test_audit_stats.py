@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+from collections import Counter
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from calendar_app import audit, audit_archive
+from calendar_app.models import AuditDailyCount, AuditLog
+import datetime
+
+User = get_user_model()
+
+UTC = datetime.timezone.utc
+
+
+def at(day, hour=12):
+    return datetime.datetime.combine(day, datetime.time(hour), UTC)
+
+
+class AuditStatsTests(APITestCase):
+    url = "/api/calendar/audit/stats/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", email="admin@test.com", password="password", role="administrator")
+        self.assistant = User.objects.create_user(username="daa", password="password", role="department_assistant")
+        self.client.force_authenticate(user=self.admin)
+        self.day = datetime.date(2025, 3, 3)
+
+    def record(self, day, action, user, n=1, hour=12):
+        entries = []
+        with audit.batch():
+            for _ in range(n):
+                entry = audit.record(user, action)
+                entry.timestamp = at(day, hour)
+                entries.append(entry)
+        return entries
+
+    def test_the_rollup_follows_every_write(self):
+        self.record(self.day, "approveEvent", self.admin, n=3)
+        self.record(self.day, "approveEvent", self.admin, n=2, hour=23)
+        self.record(self.day, "rejectEvent", self.assistant)
+        self.record(self.day + datetime.timedelta(days=1), "approveEvent", self.admin, hour=0)
+        # outside a batch too
+        audit.record(self.assistant, "createStaff", notes="x")
+
+        expected = Counter(
+            (log.timestamp.date(), log.action, log.user_id) for log in AuditLog.objects.all()
+        )
+        self.assertEqual(
+            {(r.day, r.action, r.user_id): r.count for r in AuditDailyCount.objects.all()}, dict(expected),
+        )
+        self.assertEqual(AuditDailyCount.objects.get(day=self.day, action="approveEvent").count, 5)
+
+    def test_histograms(self):
+        self.record(self.day, "approveEvent", self.admin, n=3)
+        self.record(self.day, "rejectEvent", self.assistant, n=2)
+        self.record(self.day, "approveEvent", self.assistant)
+        self.record(self.day + datetime.timedelta(days=2), "createEvent", self.assistant, n=4)
+        self.record(self.day + datetime.timedelta(days=40), "createEvent", self.assistant)
+
+        res = self.client.get(self.url, {"start": "2025-03-01", "end": "2025-03-31"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data, {
+            "start": "2025-03-01", "end": "2025-03-31", "group_by": [], "total": 10,
+            "results": [{"day": "2025-03-03", "count": 6}, {"day": "2025-03-05", "count": 4}],
+        })
+
+        res = self.client.get(self.url, {"start": "2025-03-03", "end": "2025-03-03", "group_by": "user,action"})
+        self.assertEqual(res.data["group_by"], ["action", "user"])
+        self.assertEqual(res.data["results"], [
+            {"day": "2025-03-03", "action": "approveEvent", "user": self.admin.id, "user_email": "admin@test.com", "count": 3},
+            {"day": "2025-03-03", "action": "approveEvent", "user": self.assistant.id, "user_email": "daa", "count": 1},
+            {"day": "2025-03-03", "action": "rejectEvent", "user": self.assistant.id, "user_email": "daa", "count": 2},
+        ])
+
+        res = self.client.get(self.url, {"start": "2025-03-01", "end": "2025-03-31", "action": "approveEvent,rejectEvent", "group_by": "action"})
+        self.assertEqual([(r["action"], r["count"]) for r in res.data["results"]], [("approveEvent", 4), ("rejectEvent", 2)])
+        res = self.client.get(self.url, {"start": "2025-03-01", "end": "2025-03-31", "user": self.admin.id})
+        self.assertEqual(res.data["total"], 3)
+
+    def test_cost_follows_days_not_entries(self):
+        self.record(self.day, "createEvent", self.assistant, n=5)
+        with self.assertNumQueries(1):
+            few = self.client.get(self.url, {"start": "2025-03-01", "end": "2025-03-31", "group_by": "action"})
+        self.record(self.day, "createEvent", self.assistant, n=500)
+        with self.assertNumQueries(1):
+            many = self.client.get(self.url, {"start": "2025-03-01", "end": "2025-03-31", "group_by": "action"})
+        self.assertEqual(few.data["total"], 5)
+        self.assertEqual(many.data["total"], 505)
+        self.assertEqual(len(many.data["results"]), 1)
+
+    def test_archived_entries_still_count(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+        self.record(self.day, "approveEvent", self.admin, n=3)
+        with override_settings(AUDIT_ARCHIVE_DIR=archive_dir):
+            audit_archive.archive(retention_days=30)
+        self.assertEqual(AuditLog.objects.count(), 0)
+        res = self.client.get(self.url, {"start": "2025-03-01", "end": "2025-03-31"})
+        self.assertEqual(res.data["total"], 3)
+
+    def test_defaults_and_validation(self):
+        audit.record(self.admin, "approveEvent")
+        res = self.client.get(self.url)
+        self.assertEqual(res.data["total"], 1)
+        self.assertEqual(
+            datetime.date.fromisoformat(res.data["end"]) - datetime.date.fromisoformat(res.data["start"]),
+            datetime.timedelta(days=29),
+        )
+        for bad in (
+            {"start": "March"}, {"start": "2025-03-02", "end": "2025-03-01"}, {"start": "2020-01-01", "end": "2025-01-01"},
+            {"group_by": "course"}, {"user": "me"},
+        ):
+            self.assertEqual(self.client.get(self.url, bad).status_code, 400, bad)
+        self.client.force_authenticate(user=self.assistant)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
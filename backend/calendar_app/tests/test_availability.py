@@ -0,0 +1,129 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from calendar_app.models import Course, Room, ScheduledEvent, EventRecurrence, Major
+from calendar_app.availability import slot_mask
+import datetime
+
+User = get_user_model()
+
+DAY = datetime.date(2025, 1, 6)
+
+
+class RoomAvailabilityTests(APITestCase):
+    url = "/api/calendar/rooms/available/"
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.rooms = [Room.objects.create(name=f"Room {i}") for i in range(3)]
+        self.client.force_authenticate(user=self.admin)
+
+    def book(self, room, start, end, date=DAY, **kwargs):
+        return ScheduledEvent.objects.create(
+            date=date, start_time=start, end_time=end, course=self.course, room=room, event_type="lecture", **kwargs,
+        )
+
+    def available(self, start="09:00", end="10:00", date=DAY, **params):
+        res = self.client.get(self.url, {"date": date.isoformat(), "start": start, "end": end, **params})
+        self.assertEqual(res.status_code, 200)
+        return sorted(r["name"] for r in res.data)
+
+    def test_slot_mask(self):
+        self.assertEqual(slot_mask(datetime.time(0, 0), datetime.time(0, 3)), 0b111)
+        self.assertFalse(slot_mask(datetime.time(9, 0), datetime.time(10, 0)) & slot_mask(datetime.time(10, 0), datetime.time(11, 0)))
+        self.assertTrue(slot_mask(datetime.time(9, 0), datetime.time(10, 1)) & slot_mask(datetime.time(10, 0), datetime.time(11, 0)))
+
+    def test_overlap_and_touching_slots(self):
+        self.book(self.rooms[0], datetime.time(9, 30), datetime.time(10, 30))
+        self.book(self.rooms[1], datetime.time(8, 0), datetime.time(9, 0))
+        self.book(self.rooms[2], datetime.time(9, 0), datetime.time(10, 0), status="cancelled")
+        self.assertEqual(self.available("09:00", "10:00"), ["Room 1", "Room 2"])
+        self.assertEqual(self.available("10:30", "11:00"), ["Room 0", "Room 1", "Room 2"])
+        self.assertEqual(self.available("08:30", "09:31"), ["Room 2"])
+
+    def test_cached_day_does_not_touch_events_table(self):
+        self.book(self.rooms[0], datetime.time(9, 0), datetime.time(10, 0))
+        self.available()
+        for start, end in (("07:00", "08:00"), ("09:15", "09:45"), ("12:00", "18:00")):
+            with CaptureQueriesContext(connection) as ctx:
+                self.available(start, end)
+            self.assertFalse([q for q in ctx.captured_queries if "calendar_app_scheduledevent" in q["sql"]])
+
+    def test_exclude_event_being_edited(self):
+        event = self.book(self.rooms[0], datetime.time(9, 0), datetime.time(10, 0))
+        other = self.book(self.rooms[1], datetime.time(9, 0), datetime.time(10, 0))
+        self.book(self.rooms[1], datetime.time(9, 30), datetime.time(11, 0))
+        self.assertEqual(self.available(), ["Room 2"])
+        self.assertEqual(self.available(exclude=event.id), ["Room 0", "Room 2"])
+        # another event still holding the same room keeps it busy
+        self.assertEqual(self.available(exclude=other.id), ["Room 2"])
+
+    def test_series_occurrences(self):
+        event = self.book(self.rooms[0], datetime.time(9, 0), datetime.time(10, 0))
+        EventRecurrence.objects.create(event=event, frequency="weekly", until=DAY + datetime.timedelta(weeks=4))
+        self.assertEqual(self.available(date=DAY + datetime.timedelta(weeks=2)), ["Room 1", "Room 2"])
+        self.assertEqual(self.available(date=DAY + datetime.timedelta(days=1)), ["Room 0", "Room 1", "Room 2"])
+
+        week_3 = DAY + datetime.timedelta(weeks=3)
+        self.assertEqual(self.available(date=week_3), ["Room 1", "Room 2"])
+        res = self.client.put(f"/api/calendar/edit_event/{event.id}/", {"action": "cancel", "occurrence": week_3.isoformat()}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.available(date=week_3), ["Room 0", "Room 1", "Room 2"])
+
+    def test_writes_invalidate_cached_days(self):
+        self.assertEqual(self.available(), ["Room 0", "Room 1", "Room 2"])
+        res = self.client.post("/api/calendar/create_event/", {
+            "title": "Lecture", "date": DAY.isoformat(), "start_time": "09:00", "end_time": "10:00",
+            "course": self.course.id, "tutor": self.tutor.id, "room": self.rooms[0].id, "event_type": "lecture",
+        }, format="json")
+        self.assertEqual(res.status_code, 201)
+        event_id = res.data["id"]
+        self.assertEqual(self.available(), ["Room 1", "Room 2"])
+
+        # moving the event frees the old day and books the new one
+        next_day = DAY + datetime.timedelta(days=1)
+        self.assertEqual(self.available(date=next_day), ["Room 0", "Room 1", "Room 2"])
+        res = self.client.put(f"/api/calendar/edit_event/{event_id}/", {"date": next_day.isoformat()}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.available(), ["Room 0", "Room 1", "Room 2"])
+        self.assertEqual(self.available(date=next_day), ["Room 1", "Room 2"])
+
+        res = self.client.put(f"/api/calendar/edit_event/{event_id}/", {"action": "cancel"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.available(date=next_day), ["Room 0", "Room 1", "Room 2"])
+
+    def test_bulk_create_invalidates(self):
+        self.assertEqual(self.available(), ["Room 0", "Room 1", "Room 2"])
+        res = self.client.post("/api/calendar/events/bulk/", {"events": [{
+            "title": "Lecture", "date": DAY.isoformat(), "start_time": "09:00", "end_time": "10:00",
+            "course": self.course.id, "tutor": self.tutor.id, "room": self.rooms[2].id, "event_type": "lecture",
+        }]}, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(self.available(), ["Room 0", "Room 1"])
+
+    def test_writes_outside_the_views_invalidate(self):
+        # admin and shell edits go through the model signals too
+        self.assertEqual(self.available(), ["Room 0", "Room 1", "Room 2"])
+        event = self.book(self.rooms[1], datetime.time(9, 0), datetime.time(10, 0))
+        self.assertEqual(self.available(), ["Room 0", "Room 2"])
+
+        week_2 = DAY + datetime.timedelta(weeks=2)
+        self.assertEqual(self.available(date=week_2), ["Room 0", "Room 1", "Room 2"])
+        rule = EventRecurrence.objects.create(event=event, frequency="weekly", until=DAY + datetime.timedelta(weeks=4))
+        self.assertEqual(self.available(date=week_2), ["Room 0", "Room 2"])
+        rule.exceptions = [week_2.isoformat()]
+        rule.save()
+        self.assertEqual(self.available(date=week_2), ["Room 0", "Room 1", "Room 2"])
+
+        week_3 = DAY + datetime.timedelta(weeks=3)
+        self.assertEqual(self.available(date=week_3), ["Room 0", "Room 2"])
+        rule.delete()
+        self.assertEqual(self.available(date=week_3), ["Room 0", "Room 1", "Room 2"])
+        event.delete()
+        self.assertEqual(self.available(), ["Room 0", "Room 1", "Room 2"])
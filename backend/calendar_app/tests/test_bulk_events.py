@@ -0,0 +1,107 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from calendar_app import jobs, notifications
+from calendar_app.models import Course, Room, ScheduledEvent, AuditLog, Major
+from users.models import StudentProfile
+import datetime
+
+User = get_user_model()
+
+class BulkCreateEventsTests(APITestCase):
+    url = "/api/calendar/events/bulk/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.tutor2 = User.objects.create_user(username="tutor2", password="password", role="tutor")
+        self.student_user = User.objects.create_user(username="student", password="password", role="student")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        self.room2 = Room.objects.create(name="Room 2")
+        StudentProfile.objects.create(
+            user=self.student_user,
+            name="Test Student",
+            email="student@test.com",
+            dob=datetime.date(2000, 1, 1),
+            student_id="S1",
+            major=self.major,
+            year=1,
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def row(self, **kwargs):
+        data = {
+            "title": "Lecture", "date": "2025-01-06", "start_time": "09:00", "end_time": "10:00",
+            "course": self.course.id, "tutor": self.tutor.id, "room": self.room.id, "event_type": "lecture",
+        }
+        data.update(kwargs)
+        return data
+
+    def test_per_row_results(self):
+        ScheduledEvent.objects.create(
+            date=datetime.date(2025, 1, 7), start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+            course=self.course, tutor=self.tutor2, room=self.room2, event_type="lecture",
+        )
+        rows = [
+            self.row(),
+            self.row(room="Room 2", tutor=self.tutor2.id),               # different tutor/room, by room name: ok
+            self.row(start_time="09:30", end_time="10:30", room=self.room2.id, tutor=self.tutor.id),  # clashes with rows 0 and 1
+            self.row(date="2025-01-07", tutor=self.tutor.id, room=self.room2.id),  # clashes with DB event (room)
+            self.row(event_type="party"),
+            self.row(tutor=self.student_user.id, date="2025-01-08"),
+        ]
+        res = self.client.post(self.url, {"events": rows}, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data["created"], 2)
+        statuses = [r["status"] for r in res.data["results"]]
+        self.assertEqual(statuses, ["created", "created", "error", "error", "error", "error"])
+        self.assertEqual(res.data["results"][2]["errors"]["conflicting_rows"], [0, 1])
+        self.assertIn("tutor", res.data["results"][2]["errors"])
+        self.assertIn("room", res.data["results"][3]["errors"])
+        self.assertIn("event_type", res.data["results"][4]["errors"])
+        self.assertIn("tutor role", res.data["results"][5]["errors"]["tutor"])
+
+        created_ids = [r["id"] for r in res.data["results"] if r["status"] == "created"]
+        self.assertEqual(ScheduledEvent.objects.filter(id__in=created_ids).count(), 2)
+        self.assertEqual(AuditLog.objects.filter(action="createEvent", event_id__in=created_ids).count(), 2)
+        jobs.drain()
+        self.assertEqual(notifications.for_user(self.student_user).count(), 2)
+
+    def test_all_or_nothing(self):
+        rows = [self.row(), self.row(start_time="09:30", end_time="10:30")]
+        res = self.client.post(self.url, {"events": rows, "all_or_nothing": True}, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data["created"], 0)
+        self.assertEqual([r["status"] for r in res.data["results"]], ["skipped", "error"])
+        self.assertFalse(ScheduledEvent.objects.exists())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def post(n, day):
+            rows = []
+            for i in range(n):
+                hour = 7 + i % 12
+                d = day + datetime.timedelta(days=i // 12)
+                rows.append(self.row(date=d.isoformat(), start_time=f"{hour:02d}:00", end_time=f"{hour:02d}:30"))
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(self.url, {"events": rows}, format="json")
+            self.assertEqual(res.data["created"], n)
+            sql = [q["sql"] for q in ctx.captured_queries]
+            inserts = [q for q in sql if q.startswith("INSERT")]
+            return len(sql) - len(inserts), len(inserts)
+
+        small_reads, small_inserts = post(5, datetime.date(2025, 3, 1))
+        large_reads, large_inserts = post(300, datetime.date(2025, 6, 1))
+        # lookups and conflict detection are a fixed number of queries...
+        self.assertEqual(small_reads, large_reads)
+        # ...and writes are batched (SQLite caps parameters per statement), never one per row:
+        # events, notification job, audit entries and their daily rollup
+        self.assertEqual(small_inserts, 4)
+        self.assertLess(large_inserts, 300 // 10)
+
+    def test_requires_creator_role(self):
+        self.client.force_authenticate(user=self.tutor)
+        res = self.client.post(self.url, {"events": [self.row()]}, format="json")
+        self.assertEqual(res.status_code, 404)
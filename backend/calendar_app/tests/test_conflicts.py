@@ -0,0 +1,124 @@
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from calendar_app.models import Course, Room, ScheduledEvent, Major
+from calendar_app.conflicts import IntervalIndex, find_conflicts
+import datetime
+import random
+
+User = get_user_model()
+
+class IntervalIndexTests(SimpleTestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        day = datetime.date(2025, 1, 1)
+        intervals = []
+        index = IntervalIndex()
+        for event_id in range(300):
+            start = rng.randrange(0, 1400)
+            end = start + rng.randrange(1, 240)
+            intervals.append((start, end, event_id))
+            index.add("room", 1, day, start, end, event_id)
+
+        for _ in range(500):
+            start = rng.randrange(0, 1440)
+            end = start + rng.randrange(1, 180)
+            expected = sorted(i for s, e, i in intervals if s < end and e > start)
+            self.assertEqual(sorted(index.overlapping("room", 1, day, start, end)), expected)
+
+    def test_touching_intervals_do_not_overlap(self):
+        day = datetime.date(2025, 1, 1)
+        index = IntervalIndex()
+        index.add("tutor", 1, day, 600, 660, 1)
+        self.assertEqual(index.overlapping("tutor", 1, day, 660, 720), [])
+        self.assertEqual(index.overlapping("tutor", 1, day, 540, 600), [])
+        self.assertEqual(index.overlapping("tutor", 1, day, 659, 720), [1])
+        # other resources and days are separate buckets
+        self.assertEqual(index.overlapping("tutor", 2, day, 600, 660), [])
+        self.assertEqual(index.overlapping("room", 1, day, 600, 660), [])
+
+
+class ConflictViewTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.other_tutor = User.objects.create_user(username="tutor2", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major)
+        self.room = Room.objects.create(name="Room 1")
+        self.other_room = Room.objects.create(name="Room 2")
+        self.client.force_authenticate(user=self.admin)
+
+    def make_event(self, start_hour, end_hour, **kwargs):
+        fields = dict(
+            title="Event",
+            date=datetime.date(2025, 1, 1),
+            start_time=datetime.time(start_hour, 0),
+            end_time=datetime.time(end_hour, 0),
+            course=self.course,
+            tutor=self.tutor,
+            room=self.room,
+            event_type="lecture",
+            status="approved",
+        )
+        fields.update(kwargs)
+        return ScheduledEvent.objects.create(**fields)
+
+    def test_find_conflicts_reports_tutor_and_room(self):
+        a = self.make_event(10, 11)
+        b = self.make_event(10, 12, tutor=self.other_tutor, room=self.other_room)
+        self.make_event(11, 12)
+        c = find_conflicts(datetime.date(2025, 1, 1), datetime.time(10, 30), datetime.time(11, 0),
+                           tutor_id=self.tutor.id, room_id=self.other_room.id)
+        self.assertEqual(c.tutor, [a.id])
+        self.assertEqual(c.room, [b.id])
+
+    def test_create_event_rejects_overlap(self):
+        self.make_event(10, 11)
+        data = {
+            "title": "Clash", "date": "2025-01-01", "start_time": "10:30", "end_time": "11:30",
+            "course": self.course.id, "tutor": self.tutor.id, "room": self.other_room.id, "event_type": "lecture",
+        }
+        res = self.client.post("/api/calendar/create_event/", data)
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data["detail"], "Tutor has a conflicting schedule.")
+
+        data["tutor"] = self.other_tutor.id
+        data["room"] = self.room.id
+        res = self.client.post("/api/calendar/create_event/", data)
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data["detail"], "Room is already booked for that timeframe.")
+
+    def test_cancelled_events_do_not_block(self):
+        self.make_event(10, 11, status="cancelled")
+        data = {
+            "title": "Reuse", "date": "2025-01-01", "start_time": "10:00", "end_time": "11:00",
+            "course": self.course.id, "tutor": self.tutor.id, "room": self.room.id, "event_type": "lecture",
+        }
+        res = self.client.post("/api/calendar/create_event/", data)
+        self.assertEqual(res.status_code, 201)
+
+    def test_edit_event_rejects_moving_into_conflict(self):
+        self.make_event(10, 11)
+        event = self.make_event(12, 13, status="pending")
+        res = self.client.put(f"/api/calendar/edit_event/{event.id}/", {"start_time": "10:30"}, format="json")
+        self.assertEqual(res.status_code, 400)
+        # editing a field that does not move the slot is still fine
+        res = self.client.put(f"/api/calendar/edit_event/{event.id}/", {"title": "Renamed"}, format="json")
+        self.assertEqual(res.status_code, 200)
+
+    def test_approve_change_request_ignores_its_parent(self):
+        parent = self.make_event(10, 11)
+        child = self.make_event(10, 12, status="request_change", related_event=parent)
+        res = self.client.post(f"/api/calendar/approve/{child.id}/")
+        self.assertEqual(res.status_code, 200)
+        parent.refresh_from_db()
+        self.assertEqual(parent.end_time, datetime.time(12, 0))
+
+    def test_approve_rejects_slot_taken_since_request(self):
+        self.make_event(10, 11, room=self.other_room)
+        pending = self.make_event(10, 11, status="pending", room=self.other_room, tutor=self.other_tutor)
+        res = self.client.post(f"/api/calendar/approve/{pending.id}/")
+        self.assertEqual(res.status_code, 400)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, "pending")
@@ -0,0 +1,141 @@
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.http import http_date, parse_http_date
+from calendar_app import versioning
+from calendar_app.checks import check_shared_cache
+from calendar_app.models import Course, Room, ScheduledEvent, Major
+from users.models import StudentProfile, TutorProfile
+import datetime
+import tempfile
+import time
+from unittest import mock
+
+User = get_user_model()
+
+DAY = datetime.date(2025, 1, 6)
+
+
+class ConditionalGetTests(APITestCase):
+    url = "/api/calendar/scheduledevents/"
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        self.event = ScheduledEvent.objects.create(
+            date=DAY, start_time=datetime.time(9, 0), end_time=datetime.time(10, 0), course=self.course,
+            room=self.room, event_type="lecture", status="approved",
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def revalidate(self, url, etag, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_list_is_304_without_queries(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        etag = res["ETag"]
+        self.assertEqual(res["Cache-Control"], "private, no-cache")
+
+        with self.assertNumQueries(0):
+            res = self.revalidate(self.url, etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], etag)
+
+        # a different window is a different representation
+        res = self.revalidate(self.url, etag, start=DAY.isoformat())
+        self.assertEqual(res.status_code, 200)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.event.status = "cancelled"
+        self.event.save()
+        res = self.revalidate(self.url, etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+
+        etag = res["ETag"]
+        self.room.name = "Room 1A"
+        self.room.save()
+        self.assertEqual(self.revalidate(self.url, etag).status_code, 200)
+
+    def test_bulk_create_changes_the_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        etag = self.revalidate(self.url, etag)["ETag"]
+        res = self.client.post("/api/calendar/events/bulk/", {"events": [{
+            "title": "Lecture", "date": DAY.isoformat(), "start_time": "11:00", "end_time": "12:00",
+            "course": self.course.id, "tutor": tutor.id, "room": self.room.id, "event_type": "lecture",
+        }]}, format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(self.revalidate(self.url, etag).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get(self.url)["ETag"]
+        student = User.objects.create_user(username="student", password="password", role="student")
+        StudentProfile.objects.create(
+            user=student, name="Student", email="student@test.com", dob=datetime.date(2000, 1, 1), student_id="S1",
+            major=self.major, year=1,
+        )
+        self.client.force_authenticate(user=student)
+        res = self.revalidate(self.url, etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_if_modified_since(self):
+        url = "/api/calendar/courses/"
+        key = versioning._cache_key(versioning.COURSES)
+        stamp = (time.time_ns() // 10**9 - 10) * 10**9 + 250_000_000
+        cache.set(key, stamp, None)
+        last_modified = self.client.get(url)["Last-Modified"]
+        self.assertEqual(parse_http_date(last_modified) * 10**9, stamp + 750_000_000)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        # the stamp's truncated second is before the write
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(stamp // 10**9)).status_code, 200)
+        # the ETag decides when both are sent
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(res.status_code, 200)
+
+        # a write in the second being served: no Last-Modified a later write could match
+        Course.objects.create(name="CS102", major=self.major)
+        now = cache.get(key)
+        with mock.patch.object(versioning.time, "time_ns", return_value=now + 1000):
+            res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("Last-Modified", res)
+
+    def test_reference_lists(self):
+        for url in ("/api/calendar/courses/", "/api/calendar/tutors/", "/api/users/majors/"):
+            etag = self.client.get(url)["ETag"]
+            self.assertEqual(self.revalidate(url, etag).status_code, 304, url)
+
+        etag = self.client.get("/api/calendar/tutors/")["ETag"]
+        user = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.assertEqual(self.revalidate("/api/calendar/tutors/", etag).status_code, 200)
+
+        url = f"/api/calendar/courses/{self.course.id}/tutors/"
+        etag = self.client.get(url)["ETag"]
+        profile = TutorProfile.objects.create(user=user, email="t@test.com", name="T", dob=datetime.date(1980, 1, 1), tutor_id="T1")
+        etag = self.revalidate(url, etag)["ETag"]
+        profile.courses.add(self.course)
+        res = self.revalidate(url, etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 1)
+
+        etag = self.client.get("/api/users/majors/")["ETag"]
+        Major.objects.create(name="Maths")
+        self.assertEqual(self.revalidate("/api/users/majors/", etag).status_code, 200)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_warns_about_a_per_process_cache(self):
+        [warning] = check_shared_cache(None)
+        self.assertEqual(warning.id, "calendar_app.W001")
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir},
+        }):
+            self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,66 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from calendar_app.models import Course, Room, ScheduledEvent, Major
+import datetime
+
+User = get_user_model()
+
+class ScheduledEventListTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        self.client.force_authenticate(user=self.admin)
+
+        # two events per day for 10 days starting 2025-01-01
+        for day in range(10):
+            for hour in (9, 13):
+                ScheduledEvent.objects.create(
+                    title=f"Day {day} {hour}h",
+                    date=datetime.date(2025, 1, 1) + datetime.timedelta(days=day),
+                    start_time=datetime.time(hour, 0),
+                    end_time=datetime.time(hour + 1, 0),
+                    course=self.course,
+                    tutor=self.tutor,
+                    room=self.room,
+                    event_type="lecture",
+                )
+
+    def test_without_params_returns_full_list(self):
+        res = self.client.get("/api/calendar/scheduledevents/")
+        self.assertEqual(res.status_code, 200)
+        self.assertIsInstance(res.data, list)
+        self.assertEqual(len(res.data), 20)
+
+    def test_date_window(self):
+        res = self.client.get("/api/calendar/scheduledevents/", {"start": "2025-01-03", "end": "2025-01-04"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data["results"]), 4)
+        self.assertIsNone(res.data["next_cursor"])
+        dates = {e["date"] for e in res.data["results"]}
+        self.assertEqual(dates, {"2025-01-03", "2025-01-04"})
+
+    def test_cursor_pagination_walks_window_in_order(self):
+        seen = []
+        params = {"start": "2025-01-01", "end": "2025-01-10", "limit": 3}
+        while True:
+            res = self.client.get("/api/calendar/scheduledevents/", params)
+            self.assertEqual(res.status_code, 200)
+            self.assertLessEqual(len(res.data["results"]), 3)
+            seen.extend(res.data["results"])
+            if not res.data["next_cursor"]:
+                break
+            params["cursor"] = res.data["next_cursor"]
+
+        self.assertEqual(len(seen), 20)
+        self.assertEqual(len({e["id"] for e in seen}), 20)
+        keys = [(e["date"], e["start_time"], e["id"]) for e in seen]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_invalid_cursor_and_dates_are_rejected(self):
+        res = self.client.get("/api/calendar/scheduledevents/", {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, 400)
+        res = self.client.get("/api/calendar/scheduledevents/", {"start": "01/01/2025"})
+        self.assertEqual(res.status_code, 400)
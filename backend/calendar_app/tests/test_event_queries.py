@@ -0,0 +1,86 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from calendar_app.models import Course, Room, ScheduledEvent, Major
+from calendar_app.serializers import ScheduledEventSerializer, ScheduledEventRowSerializer
+from users.models import StudentProfile
+import datetime
+
+User = get_user_model()
+
+class ScheduledEventQueryCountTests(APITestCase):
+    """scheduledevents_list must cost the same number of queries whatever the table size."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.student_user = User.objects.create_user(username="student", password="password", role="student")
+        self.major = Major.objects.create(name="CS")
+        self.courses = [Course.objects.create(name=f"CS{i}", major=self.major, year=1) for i in range(3)]
+        self.rooms = [Room.objects.create(name=f"Room {i}") for i in range(3)]
+        StudentProfile.objects.create(
+            user=self.student_user,
+            name="Test Student",
+            email="student@test.com",
+            dob=datetime.date(2000, 1, 1),
+            student_id="S1",
+            major=self.major,
+            year=1,
+        )
+        self.created = 0
+
+    def _grow_to(self, n):
+        """Bulk insert events until the table holds `n` rows."""
+        batch = []
+        start = datetime.date(2020, 1, 1)
+        for i in range(self.created, n):
+            batch.append(ScheduledEvent(
+                title=f"Event {i}",
+                date=start + datetime.timedelta(days=i // 8),
+                start_time=datetime.time(8 + i % 8, 0),
+                end_time=datetime.time(9 + i % 8, 0),
+                course=self.courses[i % 3],
+                tutor=self.tutor,
+                room=self.rooms[i % 3],
+                event_type="lecture",
+            ))
+        ScheduledEvent.objects.bulk_create(batch, batch_size=2000)
+        self.created = n
+
+    def _count_queries(self, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/calendar/scheduledevents/", params or {})
+        self.assertEqual(res.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_constant_query_count(self):
+        counts = {}
+        for n in (10, 1_000, 100_000):
+            self._grow_to(n)
+            self.client.force_authenticate(user=self.admin)
+            admin_page = self._count_queries({"limit": 200})
+            self.client.force_authenticate(user=self.student_user)
+            cache.clear()  # count the student's cohort lookup cold every time
+            student_page = self._count_queries({"limit": 200})
+            counts[n] = (admin_page, student_page)
+            if n <= 1_000:
+                # the legacy unpaginated list is also a single query, not 3N+1
+                self.client.force_authenticate(user=self.admin)
+                self.assertEqual(self._count_queries(), 1)
+
+        # one query for the page of single events, one for recurring series in the window;
+        # a student's page is cut from the cohort timetable (StudentProfile lookup + one build query)
+        self.assertEqual(counts[10], (2, 2))
+        self.assertEqual(counts[10], counts[1_000])
+        self.assertEqual(counts[10], counts[100_000])
+
+    def test_row_serializer_matches_model_serializer(self):
+        self._grow_to(5)
+        ScheduledEvent.objects.filter(id=ScheduledEvent.objects.first().id).update(tutor=None)
+        qs = ScheduledEvent.objects.order_by("id")
+        expected = ScheduledEventSerializer(qs.with_related(), many=True).data
+        actual = ScheduledEventRowSerializer(qs.as_rows(), many=True).data
+        self.assertEqual([dict(r) for r in actual], [dict(r) for r in expected])
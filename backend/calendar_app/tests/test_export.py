@@ -0,0 +1,90 @@
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth import get_user_model
+from calendar_app.models import Course, Room, ScheduledEvent, EventRecurrence, Major
+import datetime
+import warnings
+
+User = get_user_model()
+
+START = datetime.date(2025, 1, 6)
+
+
+class StreamingExportTests(APITestCase):
+    url = "/api/calendar/export/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        self.client.force_authenticate(user=self.admin)
+
+    def book(self, date, hour, status="approved", **kwargs):
+        return ScheduledEvent.objects.create(
+            title=f"E{date.day}-{hour}", date=date, start_time=datetime.time(hour, 0), end_time=datetime.time(hour + 1, 0),
+            course=self.course, room=self.room, event_type="lecture", status=status, **kwargs,
+        )
+
+    def export(self, start, end):
+        res = self.client.get(self.url, {"start": start.isoformat(), "end": end.isoformat()})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.streaming)
+        return res
+
+    def test_singles_and_series_merge_in_order(self):
+        series = self.book(START, 10, tutor=self.tutor)
+        EventRecurrence.objects.create(event=series, frequency="weekly", until=START + datetime.timedelta(weeks=3))
+        self.book(START + datetime.timedelta(days=7), 9)
+        self.book(START + datetime.timedelta(days=7), 11)
+        self.book(START + datetime.timedelta(days=8), 8, status="pending")
+
+        lines = b"".join(self.export(START, START + datetime.timedelta(days=20)).streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "Subject,Start Date,Start Time,End Date,End Time,All Day Event,Description,Location")
+        self.assertEqual([line.split(",")[1:3] for line in lines[1:]], [
+            ["06/01/2025", "10:00"], ["13/01/2025", "09:00"], ["13/01/2025", "10:00"], ["13/01/2025", "11:00"],
+            ["20/01/2025", "10:00"],
+        ])
+        self.assertEqual(lines[1].split(",")[6], "Tutor: tutor")
+        self.assertEqual(lines[2].split(",")[6:], ["Tutor: TBD", "Room 1"])
+
+    def test_header_before_any_query_and_constant_queries(self):
+        ScheduledEvent.objects.bulk_create([
+            ScheduledEvent(
+                date=START + datetime.timedelta(days=i // 8), start_time=datetime.time(8 + i % 8, 0),
+                end_time=datetime.time(9 + i % 8, 0), course=self.course, tutor=self.tutor, room=self.room,
+                event_type="lecture", status="approved",
+            )
+            for i in range(5000)
+        ])
+        content = iter(self.export(START, START + datetime.timedelta(days=3 * 365)).streaming_content)
+        with self.assertNumQueries(0):
+            self.assertTrue(next(content).startswith(b"Subject,"))
+        # one query for the series, then the singles in chunks: nothing per row
+        with self.assertNumQueries(2):
+            rows = sum(1 for _ in content)
+        self.assertEqual(rows, 5000)
+
+    async def test_streamed_without_buffering_under_asgi(self):
+        await ScheduledEvent.objects.abulk_create([
+            ScheduledEvent(
+                date=START + datetime.timedelta(days=i // 8), start_time=datetime.time(8 + i % 8, 0),
+                end_time=datetime.time(9 + i % 8, 0), course=self.course, tutor=self.tutor, room=self.room,
+                event_type="lecture", status="approved",
+            )
+            for i in range(5000)
+        ])
+        res = await self.async_client.get(
+            self.url, {"start": START.isoformat(), "end": (START + datetime.timedelta(days=3 * 365)).isoformat()},
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.admin)}"},
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.is_async)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            blocks = [block async for block in res.streaming_content]
+        self.assertEqual([str(w.message) for w in caught], [])
+        self.assertGreater(len(blocks), 2)
+        self.assertTrue(blocks[0].startswith(b"Subject,"))
+        self.assertEqual(len(b"".join(blocks).decode().splitlines()), 5001)
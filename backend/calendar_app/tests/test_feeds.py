@@ -0,0 +1,141 @@
+import shutil
+import tempfile
+from unittest import mock
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from calendar_app import feeds
+from calendar_app.models import Course, Room, ScheduledEvent, EventRecurrence, Major
+from users.models import StudentProfile
+import datetime
+
+User = get_user_model()
+
+DAY = datetime.date(2025, 1, 6)
+
+
+class CalendarFeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.feed_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.feed_dir)
+        settings = override_settings(CALENDAR_FEED_DIR=self.feed_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutors = [User.objects.create_user(username=f"tutor{i}", password="password", role="tutor") for i in range(2)]
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.other_course = Course.objects.create(name="CS201", major=self.major, year=2)
+        self.room = Room.objects.create(name="Room 1")
+        self.student = User.objects.create_user(username="student", password="password", role="student")
+        StudentProfile.objects.create(
+            user=self.student, name="Student", email="student@test.com", dob=datetime.date(2000, 1, 1),
+            student_id="S1", major=self.major, year=1,
+        )
+        self.lecture = self.book(datetime.time(9, 0), self.course, self.tutors[0])
+        EventRecurrence.objects.create(
+            event=self.lecture, frequency="weekly", until=DAY + datetime.timedelta(weeks=4), exceptions=["2025-01-13"],
+        )
+        self.lab = self.book(datetime.time(14, 0), self.other_course, self.tutors[1])
+        self.book(datetime.time(16, 0), self.course, self.tutors[1], status="pending")
+
+    def book(self, start, course, tutor, status="approved", **kwargs):
+        return ScheduledEvent.objects.create(
+            title="Session", date=DAY, start_time=start, end_time=start.replace(hour=start.hour + 1),
+            course=course, tutor=tutor, room=self.room, event_type="lecture", status=status, **kwargs,
+        )
+
+    def feed_url(self, user):
+        self.client.force_authenticate(user=user)
+        res = self.client.get("/api/calendar/feeds/token/")
+        self.assertEqual(res.status_code, 200)
+        self.client.force_authenticate(user=None)
+        return res.data["url"]
+
+    def fetch(self, url, **headers):
+        res = self.client.get(url, **headers)
+        if res.status_code == 200:
+            self.assertEqual(res["Content-Type"], "text/calendar; charset=utf-8")
+            res.ics = b"".join(res.streaming_content).decode()
+        return res
+
+    def uids(self, text):
+        return sorted(int(line[len("UID:event-"):].split("@")[0]) for line in text.splitlines() if line.startswith("UID:"))
+
+    def test_feeds_follow_the_owners_role(self):
+        text = self.fetch(self.feed_url(self.student)).ics
+        self.assertTrue(text.startswith("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"))
+        self.assertTrue(text.endswith("END:VCALENDAR\r\n"))
+        self.assertEqual(self.uids(text), [self.lecture.id])
+        self.assertIn("DTSTART:20250106T090000\r\n", text)
+        self.assertIn("RRULE:FREQ=WEEKLY;INTERVAL=1;UNTIL=20250203T235959\r\n", text)
+        self.assertIn("EXDATE:20250113T090000\r\n", text)
+        self.assertIn("SUMMARY:CS101 - Session (lecture)\r\n", text)
+
+        self.assertEqual(self.uids(self.fetch(self.feed_url(self.tutors[1])).ics), [self.lab.id])
+        self.assertEqual(self.uids(self.fetch(self.feed_url(self.admin)).ics), [self.lecture.id, self.lab.id])
+
+    def test_polling_an_unchanged_feed_never_queries(self):
+        url = self.feed_url(self.student)
+        first = self.fetch(url)
+        with self.assertNumQueries(0):
+            again = self.fetch(url)
+        self.assertEqual(again.ics, first.ics)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.fetch(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+    def test_changes_rerender_only_what_moved(self):
+        url = self.feed_url(self.student)
+        etag = self.fetch(url)["ETag"]
+        added = self.book(datetime.time(11, 0), self.course, self.tutors[1])
+        with mock.patch("calendar_app.feeds.render_event", wraps=feeds.render_event) as render_event:
+            res = self.fetch(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.uids(res.ics), [self.lecture.id, added.id])
+        self.assertEqual(render_event.call_count, 1)
+
+        # cancelling drops it; renaming the course re-renders every event that shows the name
+        added.status = "cancelled"
+        added.save()
+        self.assertEqual(self.uids(self.fetch(url).ics), [self.lecture.id])
+        self.course.name = "CS101 Intro"
+        self.course.save()
+        self.assertIn("SUMMARY:CS101 Intro - Session (lecture)", self.fetch(url).ics)
+
+        # the tutor's feed followed as well
+        self.assertEqual(self.uids(self.fetch(self.feed_url(self.tutors[1])).ics), [self.lab.id])
+
+    def test_bulk_creation_marks_affected_feeds(self):
+        audiences = [feeds.tutor_audience(self.tutors[1].id), feeds.cohort_audience(self.major.id, 1), feeds.ALL]
+        untouched = feeds.tutor_audience(self.tutors[0].id)
+        before = {a: feeds.version(a) for a in audiences + [untouched]}
+        self.client.force_authenticate(user=self.admin)
+        res = self.client.post("/api/calendar/events/bulk/", {"events": [{
+            "title": "Lab", "date": DAY.isoformat(), "start_time": "17:00", "end_time": "18:00",
+            "course": self.course.id, "tutor": self.tutors[1].id, "room": self.room.id, "event_type": "labwork",
+        }]}, format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertTrue(all(feeds.version(a) != before[a] for a in audiences))
+        self.assertEqual(feeds.version(untouched), before[untouched])
+
+    def test_rotated_and_unknown_tokens_are_rejected(self):
+        url = self.feed_url(self.student)
+        self.assertEqual(self.fetch(url).status_code, 200)
+        self.client.force_authenticate(user=self.student)
+        new_url = self.client.post("/api/calendar/feeds/token/").data["url"]
+        self.client.force_authenticate(user=None)
+        self.assertNotEqual(new_url, url)
+        self.assertEqual(self.fetch(url).status_code, 404)
+        self.assertEqual(self.fetch(new_url).status_code, 200)
+        self.assertEqual(self.fetch("/api/calendar/feeds/nope.ics").status_code, 404)
+
+    def test_long_lines_are_folded(self):
+        self.lecture.title = "Ünïcödé " * 20
+        self.lecture.save()
+        text = self.fetch(self.feed_url(self.student)).ics
+        self.assertTrue(all(len(line.encode()) <= 75 for line in text.split("\r\n")))
+        unfolded = text.replace("\r\n ", "")
+        self.assertIn("SUMMARY:CS101 - " + "Ünïcödé " * 20 + " (lecture)", unfolded)
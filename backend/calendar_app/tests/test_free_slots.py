@@ -0,0 +1,129 @@
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from calendar_app.models import Course, Room, ScheduledEvent, EventRecurrence, Major
+from calendar_app.slots import run_starts
+import datetime
+
+User = get_user_model()
+
+MONDAY = datetime.date(2025, 1, 6)
+
+
+class RunStartsTests(SimpleTestCase):
+    def test_run_starts(self):
+        free = 0b0111101110
+        self.assertEqual(run_starts(free, 1), free)
+        self.assertEqual(run_starts(free, 3), 0b0001100010)
+        self.assertEqual(run_starts(free, 4), 0b0000100000)
+        self.assertEqual(run_starts(free, 5), 0)
+
+
+class FreeSlotsTests(APITestCase):
+    url = "/api/calendar/free_slots/"
+
+    def setUp(self):
+        cache.clear()
+        self.assistant = User.objects.create_user(username="aa", password="password", role="academic_assistant")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.other_tutor = User.objects.create_user(username="tutor2", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.cohort_course = Course.objects.create(name="CS102", major=self.major, year=1)
+        self.other_course = Course.objects.create(name="CS201", major=self.major, year=2)
+        self.room_a = Room.objects.create(name="A")
+        self.room_b = Room.objects.create(name="B")
+        self.client.force_authenticate(user=self.assistant)
+
+    def book(self, course, start, end, tutor=None, room=None, date=MONDAY, **kwargs):
+        return ScheduledEvent.objects.create(
+            date=date, start_time=datetime.time(*start), end_time=datetime.time(*end), course=course,
+            tutor=tutor, room=room or self.room_a, event_type="lecture", **kwargs,
+        )
+
+    def find(self, **params):
+        query = {
+            "course": self.course.id, "tutor": self.tutor.id, "duration": 60,
+            "start": MONDAY.isoformat(), "end": MONDAY.isoformat(),
+            "day_start": "09:00", "day_end": "12:00", "step": 30,
+        }
+        query.update(params)
+        res = self.client.get(self.url, query)
+        self.assertEqual(res.status_code, 200, res.data)
+        return res.data
+
+    def test_tutor_and_cohort_must_be_free(self):
+        self.book(self.course, (9, 0), (10, 0), tutor=self.tutor)
+        self.book(self.cohort_course, (10, 30), (11, 0), tutor=self.other_tutor, room=self.room_b)
+        # another year's class does not block this cohort
+        self.book(self.other_course, (11, 0), (12, 0), tutor=self.other_tutor, room=self.room_b, date=MONDAY)
+        slots = self.find()
+        self.assertEqual([(s["date"], s["start_time"], s["end_time"]) for s in slots], [("2025-01-06", "11:00", "12:00")])
+        self.assertEqual(slots[0]["rooms"], [{"id": self.room_a.id, "name": "A"}])
+        self.assertEqual(slots[0]["score"], 1)
+
+    def test_needs_a_free_room(self):
+        tuesday = MONDAY + datetime.timedelta(days=1)
+        self.book(self.other_course, (9, 0), (12, 0), room=self.room_a)
+        self.book(self.other_course, (9, 0), (11, 0), room=self.room_b, status="approved")
+        self.book(self.other_course, (9, 0), (12, 0), room=self.room_a, date=tuesday)
+        self.book(self.other_course, (9, 0), (12, 0), room=self.room_b, date=tuesday)
+        self.assertEqual([s["start_time"] for s in self.find()], ["11:00"])
+        self.assertEqual(self.find(start=tuesday.isoformat(), end=tuesday.isoformat()), [])
+
+    def test_ignores_cancelled_and_expands_series(self):
+        self.book(self.course, (9, 0), (12, 0), tutor=self.tutor, status="cancelled")
+        series = self.book(self.cohort_course, (9, 0), (11, 0), tutor=self.other_tutor, date=MONDAY - datetime.timedelta(weeks=2))
+        EventRecurrence.objects.create(event=series, until=MONDAY + datetime.timedelta(weeks=4))
+        self.assertEqual([s["start_time"] for s in self.find()], ["11:00"])
+        tuesday = MONDAY + datetime.timedelta(days=1)
+        self.assertEqual(
+            [s["start_time"] for s in self.find(start=tuesday.isoformat(), end=tuesday.isoformat())],
+            ["09:00", "09:30", "10:00", "10:30", "11:00"],
+        )
+
+    def test_ranking_prefers_slots_next_to_existing_bookings(self):
+        self.book(self.course, (13, 0), (14, 0), tutor=self.tutor, date=MONDAY + datetime.timedelta(days=2))
+        slots = self.find(end=(MONDAY + datetime.timedelta(days=4)).isoformat(), day_end="16:00", limit=3)
+        self.assertEqual(
+            [(s["date"], s["start_time"], s["score"]) for s in slots],
+            [("2025-01-08", "12:00", 1), ("2025-01-08", "14:00", 1), ("2025-01-06", "09:00", 0)],
+        )
+
+    def test_weekends_are_skipped_by_default(self):
+        saturday = MONDAY + datetime.timedelta(days=5)
+        self.assertEqual(self.find(start=saturday.isoformat(), end=saturday.isoformat()), [])
+        self.assertTrue(self.find(start=saturday.isoformat(), end=saturday.isoformat(), weekends="true"))
+
+    def test_whole_term_in_constant_queries(self):
+        events = []
+        for day in range(120):
+            for hour in range(8, 17, 2):
+                events.append(ScheduledEvent(
+                    date=MONDAY + datetime.timedelta(days=day), start_time=datetime.time(hour, 0),
+                    end_time=datetime.time(hour + 1, 0), course=self.other_course, tutor=self.other_tutor,
+                    room=self.room_a if hour % 4 else self.room_b, event_type="lecture",
+                ))
+        ScheduledEvent.objects.bulk_create(events)
+        params = {"end": (MONDAY + datetime.timedelta(days=119)).isoformat(), "day_end": "18:00", "limit": 50}
+        # course, tutor check, tutor/cohort singles and series, room occupancy singles and series, rooms
+        with self.assertNumQueries(7):
+            slots = self.find(**params)
+        self.assertEqual(len(slots), 50)
+        # room occupancy now comes from the per-day cache
+        with self.assertNumQueries(5):
+            self.assertEqual(self.find(**params), slots)
+
+    def test_validation(self):
+        res = self.client.get(self.url, {"course": self.course.id})
+        self.assertEqual(res.status_code, 400)
+        res = self.client.get(self.url, {
+            "course": self.course.id, "tutor": self.tutor.id, "duration": 60, "start": "2025-01-01", "end": "2025-12-31",
+        })
+        self.assertEqual(res.status_code, 400)
+        self.client.force_authenticate(user=self.tutor)
+        res = self.client.get(self.url, {
+            "course": self.course.id, "tutor": self.tutor.id, "duration": 60, "start": "2025-01-01", "end": "2025-01-02",
+        })
+        self.assertEqual(res.status_code, 404)
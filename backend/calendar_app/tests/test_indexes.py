@@ -0,0 +1,130 @@
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.db import connection
+from calendar_app.availability import DayOccupancy
+from calendar_app.conflicts import ConflictIndex
+from calendar_app.slots import OccupancyGrid
+from calendar_app.models import Course, Room, ScheduledEvent, EventRecurrence, Major
+import datetime
+import re
+
+User = get_user_model()
+
+EVENT_TABLE = ScheduledEvent._meta.db_table
+
+
+class ScheduledEventIndexTests(TestCase):
+    """EXPLAIN the queries the event code actually runs and check the planner keeps an index range."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # as many tutors and rooms as a department has, so each one's history is a small slice
+        cls.tutors = User.objects.bulk_create([User(username=f"tutor{i}", role="tutor") for i in range(40)])
+        cls.major = Major.objects.create(name="CS")
+        cls.courses = [Course.objects.create(name=f"C{i}", major=cls.major, year=1 + i % 4) for i in range(8)]
+        cls.rooms = [Room.objects.create(name=f"Room {i}") for i in range(40)]
+        events = []
+        # two years of one-off history
+        for i in range(4000):
+            events.append(ScheduledEvent(
+                date=datetime.date(2023, 1, 1) + datetime.timedelta(days=i // 5),
+                start_time=datetime.time(8 + i % 10, 0),
+                end_time=datetime.time(9 + i % 10, 0),
+                course=cls.courses[i % 8],
+                tutor=cls.tutors[i % 37],
+                room=cls.rooms[i % 39],
+                event_type="lecture",
+                status="approved" if i % 2 else "pending",
+            ))
+        # weekly series of past terms, most long finished
+        series = []
+        for i in range(400):
+            series.append(ScheduledEvent(
+                date=datetime.date(2023, 1, 2) + datetime.timedelta(days=2 * i),
+                start_time=datetime.time(18, 0),
+                end_time=datetime.time(19, 0),
+                course=cls.courses[i % 8],
+                tutor=cls.tutors[i % 37],
+                room=cls.rooms[i % 39],
+                event_type="lecture",
+                status="approved",
+            ))
+        ScheduledEvent.objects.bulk_create(events + series)
+        EventRecurrence.objects.bulk_create([
+            EventRecurrence(event=e, frequency="weekly", until=e.date + datetime.timedelta(weeks=14)) for e in series
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        cls.day = datetime.date(2024, 6, 3)
+        cls.week_end = cls.day + datetime.timedelta(days=6)
+
+    def plans(self, run):
+        """EXPLAIN QUERY PLAN of every query `run()` executes."""
+        with CaptureQueriesContext(connection) as ctx:
+            run()
+        plans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plans.append("\n".join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def assertDateRange(self, plan, *index_names):
+        """Every lookup of the events table is a date range on one of `index_names`; never a scan."""
+        self.assertNotIn(f"SCAN {EVENT_TABLE}", plan, msg=f"full scan of the events in plan:\n{plan}")
+        searches = re.findall(rf"SEARCH {EVENT_TABLE} USING (?:COVERING )?INDEX (\w+) \(([^)]*)\)", plan)
+        self.assertTrue(searches, msg=f"no index search of the events in plan:\n{plan}")
+        for index_name, constraint in searches:
+            self.assertIn(index_name, index_names, msg=plan)
+            self.assertIn("date", constraint, msg=plan)
+
+    def assertUntilRange(self, plan):
+        """Series are picked through the EventRecurrence until index and their events fetched by id.
+
+        Reaching the events through a (resource, date) or date index instead
+        walks the whole history before the until filter applies.
+        """
+        self.assertIn("USING INDEX recurrence_until_idx (until>?)", plan, msg=plan)
+        accesses = re.findall(rf"(?:SEARCH|SCAN) {EVENT_TABLE}\b.*", plan)
+        self.assertTrue(accesses, msg=plan)
+        for access in accesses:
+            self.assertIn("PRIMARY KEY", access, msg=plan)
+
+    def test_conflict_index_load(self):
+        singles, series = self.plans(lambda: ConflictIndex.load([self.day], [self.tutors[0].id], [self.rooms[0].id]))
+        self.assertDateRange(singles, "event_tutor_date_time_idx", "event_room_date_time_idx", "event_date_time_idx")
+        self.assertUntilRange(series)
+
+    def test_day_occupancy_build(self):
+        singles, series = self.plans(lambda: DayOccupancy.build_many([self.day, self.week_end]))
+        self.assertDateRange(singles, "event_date_time_idx", "event_room_date_time_idx")
+        self.assertUntilRange(series)
+
+    def test_occupancy_grid_for_tutors_and_cohorts(self):
+        singles, series = self.plans(lambda: OccupancyGrid.load_for(
+            self.day, self.week_end, [self.tutors[0].id], [("major", self.major.id, 2)],
+        ))[:2]
+        self.assertNotIn(f"SCAN {EVENT_TABLE}", singles, msg=singles)
+        self.assertUntilRange(series)
+
+    def test_windowed_list(self):
+        singles, series = ScheduledEvent.objects.split_window(self.day, self.week_end)
+        plan = singles.order_by("date", "start_time", "id").as_rows()[:51].explain()
+        self.assertDateRange(plan, "event_date_time_idx", "event_room_date_time_idx", "event_status_date_idx")
+        self.assertUntilRange(series.as_rows().explain())
+
+    def test_room_list(self):
+        singles, _ = ScheduledEvent.objects.filter(room=self.rooms[0]).split_window(self.day, self.week_end)
+        self.assertDateRange(singles.explain(), "event_room_date_time_idx")
+
+    def test_export_by_status_and_date(self):
+        singles = ScheduledEvent.objects.filter(status="approved").singles_in_window(
+            self.day, self.day + datetime.timedelta(days=30),
+        ).order_by("date", "start_time", "id")
+        self.assertDateRange(singles.as_rows().explain(), "event_status_date_idx")
+
+    def test_student_cohort_filter(self):
+        qs = ScheduledEvent.objects.filter(course__major=self.major, course__year=2)
+        self.assertIn("course_major_year_idx", qs.explain())
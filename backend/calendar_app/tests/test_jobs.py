@@ -0,0 +1,119 @@
+from io import StringIO
+from unittest import mock
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from calendar_app import jobs
+from calendar_app.models import Course, Room, ScheduledEvent, Major, Notification, Job
+from users.models import StudentProfile
+import datetime
+
+User = get_user_model()
+
+
+class NotificationQueueTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        students = User.objects.bulk_create([User(username=f"s{i}", role="student") for i in range(30)])
+        StudentProfile.objects.bulk_create([
+            StudentProfile(
+                user=user, name=user.username, email=f"{user.username}@test.com", dob=datetime.date(2000, 1, 1),
+                student_id=user.username, major=self.major, year=1,
+            )
+            for user in students
+        ])
+        self.client.force_authenticate(user=self.admin)
+
+    def pending(self, title="Lecture", hour=9):
+        return ScheduledEvent.objects.create(
+            title=title, date=datetime.date(2025, 1, 6), start_time=datetime.time(hour, 0), end_time=datetime.time(hour + 1, 0),
+            course=self.course, tutor=self.tutor, room=self.room, event_type="lecture", status="pending",
+        )
+
+    def approve(self, event):
+        res = self.client.post(f"/api/calendar/approve/{event.id}/")
+        self.assertEqual(res.status_code, 200)
+
+    def test_approval_only_queues_the_fan_out(self):
+        event = self.pending()
+        with mock.patch("calendar_app.notifications.deliver") as deliver:
+            self.approve(event)
+        deliver.assert_not_called()
+        self.assertFalse(Notification.objects.exists())
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.payload), (jobs.NOTIFY, {"event_ids": [event.id], "action_description": "approved"}))
+
+        out = StringIO()
+        call_command("run_jobs", "--once", stdout=out)
+        self.assertIn("1 succeeded", out.getvalue())
+        self.assertFalse(Job.objects.exists())
+        # one row each for the cohort, the tutor and the staff
+        self.assertEqual(Notification.objects.filter(event=event).count(), 3)
+
+    def test_failures_back_off_then_give_up(self):
+        self.approve(self.pending())
+        with mock.patch("calendar_app.notifications.deliver", side_effect=RuntimeError("db gone")):
+            self.assertEqual(jobs.run_pending(), (0, 1))
+            job = Job.objects.get()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertIn("db gone", job.last_error)
+            self.assertGreater(job.run_after, timezone.now() + jobs.RETRY_BASE_DELAY - datetime.timedelta(seconds=5))
+            # not due yet
+            self.assertEqual(jobs.run_pending(), (0, 0))
+
+            for attempt in range(2, jobs.MAX_ATTEMPTS + 1):
+                Job.objects.update(run_after=timezone.now())
+                self.assertEqual(jobs.run_pending(), (0, 1))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, jobs.MAX_ATTEMPTS))
+        Job.objects.update(run_after=timezone.now())
+        self.assertEqual(jobs.drain(), (0, 0))
+        self.assertFalse(Notification.objects.exists())
+
+    def test_failed_handler_leaves_no_partial_notifications(self):
+        self.approve(self.pending())
+        original = Notification.objects.bulk_create
+
+        def flaky(objs, **kwargs):
+            original(objs[:1], **kwargs)
+            raise RuntimeError("connection reset")
+
+        with mock.patch.object(Notification.objects, "bulk_create", side_effect=flaky):
+            self.assertEqual(jobs.run_pending(), (0, 1))
+        self.assertFalse(Notification.objects.exists())
+        Job.objects.update(run_after=timezone.now())
+        self.assertEqual(jobs.drain(), (1, 0))
+        self.assertEqual(Notification.objects.count(), 3)
+
+    def test_claims_are_batched_and_exclusive(self):
+        events = [self.pending(f"E{i}", hour=9 + i) for i in range(5)]
+        for event in events:
+            self.approve(event)
+        first = jobs.claim("worker-a", batch_size=3)
+        second = jobs.claim("worker-b", batch_size=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({j.id for j in first} & {j.id for j in second})
+        self.assertEqual(jobs.claim("worker-c"), [])
+        self.assertTrue(all(jobs.run(j) for j in first + second))
+        self.assertEqual(Notification.objects.count(), 5 * 3)
+
+    def test_jobs_of_a_dead_worker_are_reclaimed(self):
+        self.approve(self.pending())
+        [job] = jobs.claim("worker-a")
+        self.assertEqual(jobs.claim("worker-b"), [])
+        Job.objects.update(locked_at=timezone.now() - jobs.LOCK_TIMEOUT - datetime.timedelta(seconds=1))
+        [again] = jobs.claim("worker-b")
+        self.assertEqual((again.id, again.attempts, again.locked_by), (job.id, 2, "worker-b"))
+
+    def test_deleted_events_are_skipped(self):
+        event = self.pending()
+        self.approve(event)
+        event.delete()
+        self.assertEqual(jobs.drain(), (1, 0))
+        self.assertFalse(Notification.objects.exists())
@@ -1,6 +1,9 @@
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
-from calendar_app.models import Course, Room, ScheduledEvent, AuditLog, Major, Notification
+from django.core.cache import cache
+from django.test import override_settings
+from calendar_app import jobs, notifications
+from calendar_app.models import Course, Room, ScheduledEvent, AuditLog, Major, Notification, NotificationReceipt
 from users.models import StudentProfile
 import datetime
 
@@ -55,7 +58,8 @@ class NotificationAuditTests(APITestCase):
         self.assertEqual(log.user, self.admin)
         
         # Check Notification (Student)
-        notif = Notification.objects.filter(user=self.student_user).first()
+        jobs.drain()
+        notif = notifications.for_user(self.student_user).first()
         self.assertIsNotNone(notif)
         self.assertIn("Intro to CS", notif.message)
         self.assertIn("created", notif.message)
@@ -84,7 +88,8 @@ class NotificationAuditTests(APITestCase):
         self.assertIsNotNone(log)
         
         # Check Notification
-        notif = Notification.objects.filter(user=self.student_user).first()
+        jobs.drain()
+        notif = notifications.for_user(self.student_user).first()
         self.assertIsNotNone(notif)
         self.assertIn("New Title", notif.message)
         self.assertIn("updated", notif.message)
@@ -114,7 +119,8 @@ class NotificationAuditTests(APITestCase):
         log = AuditLog.objects.filter(action="cancelEvent", event=event).first()
         self.assertIsNotNone(log)
         
-        notif = Notification.objects.filter(user=self.student_user).first()
+        jobs.drain()
+        notif = notifications.for_user(self.student_user).first()
         self.assertIsNotNone(notif)
         self.assertIn("cancelled", notif.message)
 
@@ -138,6 +144,210 @@ class NotificationAuditTests(APITestCase):
         log = AuditLog.objects.filter(action="rejectEvent", event=event).first()
         self.assertIsNotNone(log)
         
-        notif = Notification.objects.filter(user=self.student_user).first()
+        jobs.drain()
+        notif = notifications.for_user(self.student_user).first()
         self.assertIsNotNone(notif)
         self.assertIn("rejected", notif.message)
+
+
+class FanOutOnReadTests(APITestCase):
+    url = "/api/calendar/notifications/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.assistant = User.objects.create_user(username="aa", password="password", role="academic_assistant")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        self.students = [self.student(f"s{i}", year=1) for i in range(3)]
+        self.senior = self.student("senior", year=2)
+        self.event = ScheduledEvent.objects.create(
+            title="Lecture", date=datetime.date(2025, 1, 6), start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+            course=self.course, tutor=self.tutor, room=self.room, event_type="lecture", status="approved",
+        )
+
+    def student(self, username, year):
+        user = User.objects.create_user(username=username, password="password", role="student")
+        StudentProfile.objects.create(
+            user=user, name=username, email=f"{username}@test.com", dob=datetime.date(2000, 1, 1),
+            student_id=username, major=self.major, year=year,
+        )
+        return user
+
+    def inbox(self, user):
+        self.client.force_authenticate(user=user)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        return [n["message"] for n in res.data]
+
+    def test_one_row_per_audience_resolved_on_read(self):
+        notifications.deliver([self.event.id], "approved")
+        # however many students and staff: cohort, tutor and staff rows
+        self.assertEqual(Notification.objects.count(), 3)
+
+        for user in self.students:
+            self.assertEqual(self.inbox(user), ["Event 'Lecture' for course 'CS101' was approved."])
+        self.assertEqual(self.inbox(self.tutor), ["Your event 'Lecture' for 'CS101' was approved."])
+        self.assertEqual(self.inbox(self.admin), ["Event 'Lecture' (CS101) was approved."])
+        self.assertEqual(self.inbox(self.assistant), ["Event 'Lecture' (CS101) was approved."])
+        self.assertEqual(self.inbox(self.senior), [])
+
+    def test_delivery_cost_does_not_depend_on_the_audience(self):
+        for i in range(20):
+            self.student(f"extra{i}", year=1)
+        events = [self.event] + [
+            ScheduledEvent.objects.create(
+                title=f"L{i}", date=datetime.date(2025, 1, 7), start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+                course=self.course, tutor=self.tutor, room=self.room, event_type="lecture", status="approved",
+            )
+            for i in range(19)
+        ]
+        # one read of the events' ids and names, one insert
+        with self.assertNumQueries(2):
+            notifications.deliver([e.id for e in events], "approved")
+        self.assertEqual(Notification.objects.count(), 60)
+
+    def test_read_receipts_are_per_user(self):
+        notifications.deliver([self.event.id], "approved")
+        notification = Notification.objects.get(audience=Notification.COHORT)
+        NotificationReceipt.objects.create(notification=notification, user=self.students[0])
+        self.assertEqual([n.is_read for n in notifications.for_user(self.students[0])], [True])
+        self.assertEqual([n.is_read for n in notifications.for_user(self.students[1])], [False])
+
+    def test_only_notifications_since_joining(self):
+        notifications.deliver([self.event.id], "approved")
+        newcomer = self.student("newcomer", year=1)
+        self.assertEqual(self.inbox(newcomer), [])
+
+    def test_staff_tutor_gets_only_the_tutor_message(self):
+        self.event.tutor = self.assistant
+        self.event.save()
+        notifications.deliver([self.event.id], "approved")
+        self.assertEqual(self.inbox(self.assistant), ["Your event 'Lecture' for 'CS101' was approved."])
+        self.assertEqual(self.inbox(self.admin), ["Event 'Lecture' (CS101) was approved."])
+
+
+class NotificationInboxTests(APITestCase):
+    url = "/api/calendar/notifications/"
+
+    def setUp(self):
+        cache.clear()
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.other = User.objects.create_user(username="other", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        self.student = User.objects.create_user(username="student", password="password", role="student")
+        StudentProfile.objects.create(
+            user=self.student, name="Student", email="student@test.com", dob=datetime.date(2000, 1, 1),
+            student_id="S1", major=self.major, year=1,
+        )
+        self.client.force_authenticate(user=self.tutor)
+
+    def send(self, n, user=None):
+        created = [
+            Notification.objects.create(audience=Notification.USER, user=user or self.tutor, message=f"m{i}")
+            for i in range(n)
+        ]
+        return [c.id for c in created]
+
+    def deliver(self, tutor=None):
+        event = ScheduledEvent.objects.create(
+            title="Lab", date=datetime.date(2025, 1, 6), start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+            course=self.course, tutor=tutor, room=self.room, event_type="labwork",
+        )
+        notifications.deliver([event.id], "approved")
+        return event
+
+    def unread(self):
+        res = self.client.get(f"{self.url}unread-count/")
+        self.assertEqual(res.status_code, 200)
+        return res.data["unread"]
+
+    def mark(self, body):
+        return self.client.post(f"{self.url}mark-read/", body, format="json")
+
+    def test_pages_newest_first_without_gaps(self):
+        ids = self.send(7)
+        # two rows stamped in the same instant straddle a page boundary
+        Notification.objects.filter(id__in=ids[3:5]).update(created_at=Notification.objects.get(id=ids[3]).created_at)
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            res = self.client.get(self.url, params)
+            self.assertEqual(res.status_code, 200)
+            seen += [n["id"] for n in res.data["results"]]
+            cursor = res.data["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(sorted(seen), sorted(ids))
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(seen[:3], ids[:-4:-1])
+
+        # no params: the latest as a plain list
+        self.assertEqual([n["id"] for n in self.client.get(self.url).data], ids[::-1])
+        self.assertEqual(self.client.get(self.url, {"cursor": "bogus"}).status_code, 400)
+
+    def test_unread_counter_is_cached_and_maintained(self):
+        ids = self.send(3)
+        self.assertEqual(self.unread(), 3)
+        # the newest notification of each audience, not the count
+        with self.assertNumQueries(1):
+            self.assertEqual(self.unread(), 3)
+
+        res = self.mark({"ids": ids[:2] + self.send(1, user=self.other)})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.data["marked"], res.data["unread"]), (2, 1))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.unread(), 1)
+        self.assertEqual([n["is_read"] for n in self.client.get(self.url).data], [False, True, True])
+
+        # new notifications reach the counter through their audience's newest row
+        self.deliver(tutor=self.tutor)
+        self.assertEqual(self.unread(), 2)
+
+    def test_worker_deliveries_reach_the_web_process_counter(self):
+        self.send(1)
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(self.unread(), 0)
+        self.client.force_authenticate(user=self.tutor)
+        self.assertEqual(self.unread(), 1)
+
+        # run_jobs is another process: nothing it writes to its cache reaches this one
+        with override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "run-jobs-worker",
+        }}):
+            self.deliver(tutor=self.tutor)
+        self.assertEqual(self.unread(), 2)
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(self.unread(), 1)
+
+    def test_mark_all_moves_the_read_mark(self):
+        ids = self.send(3)
+        self.mark({"ids": ids[:1]})
+        res = self.mark({"all": True})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["unread"], 0)
+        self.assertEqual(self.unread(), 0)
+        self.assertFalse(NotificationReceipt.objects.exists())
+        self.assertTrue(all(n["is_read"] for n in self.client.get(self.url).data))
+
+        self.deliver(tutor=self.tutor)
+        self.assertEqual(self.unread(), 1)
+        self.assertEqual([n["message"] for n in self.client.get(self.url).data if not n["is_read"]], [
+            "Your event 'Lab' for 'CS101' was approved.",
+        ])
+
+    def test_cohort_notifications_are_read_per_student(self):
+        self.deliver()
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(self.unread(), 1)
+        [notification] = self.client.get(self.url).data
+        self.assertEqual(self.mark({"ids": [notification["id"]]}).data, {"marked": 1, "unread": 0})
+        self.assertEqual(self.mark({"ids": [notification["id"]]}).data, {"marked": 0, "unread": 0})
+
+    def test_rejects_bad_bodies(self):
+        for body in ({}, {"ids": []}, {"ids": ["1"]}, {"all": "yes"}):
+            self.assertEqual(self.mark(body).status_code, 400, body)
@@ -0,0 +1,139 @@
+import asyncio
+import json
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt.tokens import AccessToken
+from calendar_app import notifications, push
+from calendar_app.models import Course, Room, ScheduledEvent, Major, Notification
+from users.models import StudentProfile
+import datetime
+
+User = get_user_model()
+
+TIMEOUT = 5
+
+
+def events(chunk):
+    """SSE events of a chunk as (event type, data) pairs; comments are skipped."""
+    parsed = []
+    for block in chunk.decode().strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if line and not line.startswith(":"))
+        if "data" in fields:
+            parsed.append((fields.get("event"), json.loads(fields["data"])))
+    return parsed
+
+
+@mock.patch.object(push, "POLL_INTERVAL", 0.05)
+class NotificationStreamTests(TestCase):
+    url = "/api/calendar/notifications/stream/"
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        self.student = User.objects.create_user(username="student", password="password", role="student")
+        StudentProfile.objects.create(
+            user=self.student, name="Student", email="student@test.com", dob=datetime.date(2000, 1, 1),
+            student_id="S1", major=self.major, year=1,
+        )
+        self.event = ScheduledEvent.objects.create(
+            title="Lecture", date=datetime.date(2025, 1, 6), start_time=datetime.time(9, 0), end_time=datetime.time(10, 0),
+            course=self.course, tutor=self.tutor, room=self.room, event_type="lecture", status="approved",
+        )
+
+    async def open(self, user, headers=None):
+        res = await self.async_client.get(self.url, {"token": str(AccessToken.for_user(user))}, headers=headers)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        chunks = aiter(res.streaming_content)
+        self.assertTrue((await self.next(chunks)).startswith(b"retry: "))
+        return chunks
+
+    async def next(self, chunks):
+        return await asyncio.wait_for(anext(chunks), TIMEOUT)
+
+    async def test_new_rows_reach_their_audiences(self):
+        student = await self.open(self.student)
+        tutor = await self.open(self.tutor)
+        admin = await self.open(self.admin)
+        try:
+            await sync_to_async(notifications.deliver)([self.event.id], "approved")
+            push.wake()
+            [(kind, item)] = events(await self.next(student))
+            self.assertEqual(kind, "notification")
+            self.assertEqual(item["message"], "Event 'Lecture' for course 'CS101' was approved.")
+            self.assertFalse(item["is_read"])
+            self.assertEqual(events(await self.next(tutor))[0][1]["message"], "Your event 'Lecture' for 'CS101' was approved.")
+            self.assertEqual(events(await self.next(admin))[0][1]["message"], "Event 'Lecture' (CS101) was approved.")
+        finally:
+            for chunks in (student, tutor, admin):
+                await chunks.aclose()
+
+    async def test_closing_a_stream_unsubscribes(self):
+        stream = push.stream(self.student)
+        self.assertTrue((await asyncio.wait_for(anext(stream), TIMEOUT)).startswith("retry: "))
+        hub = push.hub()
+        self.assertEqual(set(hub.subscribers), {f"notifications:cohort-{self.major.id}-1", f"notifications:user-{self.student.id}"})
+        await stream.aclose()
+        self.assertEqual(hub.subscribers, {})
+        self.assertIsNone(hub.task)
+
+    async def test_other_audiences_only_get_keepalives(self):
+        other = await sync_to_async(User.objects.create_user)(username="other", password="password", role="tutor")
+        with mock.patch.object(push, "HEARTBEAT_INTERVAL", 0.3):
+            chunks = await self.open(other)
+            try:
+                await sync_to_async(notifications.deliver)([self.event.id], "approved")
+                self.assertEqual(await self.next(chunks), b": keepalive\n\n")
+            finally:
+                await chunks.aclose()
+
+    async def test_last_event_id_replays_what_was_missed(self):
+        await sync_to_async(notifications.deliver)([self.event.id], "created")
+        first = await Notification.objects.aget(audience=Notification.USER)
+        await sync_to_async(notifications.deliver)([self.event.id], "approved")
+        chunks = await self.open(self.tutor, headers={"Last-Event-ID": str(first.id)})
+        try:
+            [(_, item)] = events(await self.next(chunks))
+            self.assertEqual(item["message"], "Your event 'Lecture' for 'CS101' was approved.")
+        finally:
+            await chunks.aclose()
+
+    async def test_one_poll_serves_every_connection(self):
+        streams = [await self.open(self.student) for _ in range(20)]
+        try:
+            with mock.patch.object(push.Hub, "_fetch", autospec=True, side_effect=push.Hub._fetch) as fetch:
+                await sync_to_async(notifications.deliver)([self.event.id], "approved")
+                push.wake()
+                for chunks in streams:
+                    self.assertEqual(len(events(await self.next(chunks))), 1)
+            # polls run on a timer, not per connection
+            self.assertLess(fetch.call_count, len(streams))
+        finally:
+            for chunks in streams:
+                await chunks.aclose()
+
+    async def test_requires_a_valid_token(self):
+        res = await self.async_client.get(self.url)
+        self.assertEqual(res.status_code, 401)
+        res = await self.async_client.get(self.url, {"token": "nope"})
+        self.assertEqual(res.status_code, 401)
+
+    def test_needs_asgi(self):
+        res = self.client.get(self.url, {"token": str(AccessToken.for_user(self.student))})
+        self.assertEqual(res.status_code, 501)
+
+    def test_slow_clients_are_told_to_resync(self):
+        sub = push.Subscription(self.student.id, ["s"])
+        for i in range(push.QUEUE_SIZE + 10):
+            sub.put({"id": i})
+        self.assertTrue(sub.overflowed)
+        items = [sub.queue.get_nowait() for _ in range(sub.queue.qsize())]
+        self.assertIs(items[-1], push.RESYNC)
+        self.assertEqual(len(items), push.QUEUE_SIZE)
@@ -0,0 +1,193 @@
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from calendar_app.models import Course, Room, ScheduledEvent, EventRecurrence, Major
+from calendar_app.recurrence import occurrence_dates, occurs_on
+from calendar_app.serializers import ScheduledEventSerializer, ScheduledEventRowSerializer
+import datetime
+
+User = get_user_model()
+
+MONDAY = datetime.date(2025, 1, 6)
+
+
+class OccurrenceDatesTests(SimpleTestCase):
+    def test_weekly_with_window_and_exceptions(self):
+        until = MONDAY + datetime.timedelta(weeks=14)
+        all_dates = list(occurrence_dates(MONDAY, "weekly", 1, until))
+        self.assertEqual(len(all_dates), 15)
+
+        window = list(occurrence_dates(
+            MONDAY, "weekly", 1, until, ["2025-02-03"],
+            start=datetime.date(2025, 1, 28), end=datetime.date(2025, 2, 20),
+        ))
+        self.assertEqual(window, [datetime.date(2025, 2, 10), datetime.date(2025, 2, 17)])
+
+    def test_interval_and_occurs_on(self):
+        until = datetime.date(2025, 3, 31)
+        dates = list(occurrence_dates(MONDAY, "weekly", 2, until, start=datetime.date(2025, 1, 7)))
+        self.assertEqual(dates[0], datetime.date(2025, 1, 20))
+        self.assertTrue(all((d - MONDAY).days % 14 == 0 for d in dates))
+        self.assertTrue(occurs_on(MONDAY, "weekly", 2, until, [], datetime.date(2025, 2, 3)))
+        self.assertFalse(occurs_on(MONDAY, "weekly", 2, until, [], datetime.date(2025, 1, 13)))
+        self.assertFalse(occurs_on(MONDAY, "weekly", 2, until, ["2025-02-03"], datetime.date(2025, 2, 3)))
+        self.assertFalse(occurs_on(MONDAY, "weekly", 2, until, [], datetime.date(2025, 4, 14)))
+
+
+class RecurringEventTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.room = Room.objects.create(name="Room 1")
+        self.room2 = Room.objects.create(name="Room 2")
+        self.client.force_authenticate(user=self.admin)
+
+    def create_series(self, weeks=15, **kwargs):
+        data = {
+            "title": "Weekly lecture", "date": MONDAY.isoformat(), "start_time": "09:00", "end_time": "11:00",
+            "course": self.course.id, "tutor": self.tutor.id, "room": self.room.id, "event_type": "lecture",
+            "recurrence": {"frequency": "weekly", "until": (MONDAY + datetime.timedelta(weeks=weeks - 1)).isoformat()},
+        }
+        data.update(kwargs)
+        return self.client.post("/api/calendar/create_event/", data, format="json")
+
+    def test_series_is_one_row_expanded_per_window(self):
+        res = self.create_series()
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data["recurrence"]["frequency"], "weekly")
+        self.assertEqual(ScheduledEvent.objects.count(), 1)
+
+        res = self.client.get("/api/calendar/scheduledevents/", {"start": "2025-02-01", "end": "2025-02-28"})
+        self.assertEqual(res.status_code, 200)
+        dates = [e["date"] for e in res.data["results"]]
+        self.assertEqual(dates, ["2025-02-03", "2025-02-10", "2025-02-17", "2025-02-24"])
+
+        res = self.client.get("/api/calendar/scheduledevents/")
+        self.assertEqual(len(res.data), 15)
+
+    def test_split_window_keeps_only_series_reaching_the_window(self):
+        self.assertEqual(self.create_series(weeks=4).status_code, 201)
+        ended = ScheduledEvent.objects.get()
+        self.assertEqual(self.create_series(weeks=15, room=self.room2.id, start_time="13:00", end_time="14:00").status_code, 201)
+        running = ScheduledEvent.objects.exclude(pk=ended.pk).get()
+        single = ScheduledEvent.objects.create(
+            date=datetime.date(2025, 3, 4), start_time="09:00", end_time="10:00",
+            course=self.course, room=self.room, event_type="lecture",
+        )
+
+        singles, series = ScheduledEvent.objects.split_window(datetime.date(2025, 3, 1), datetime.date(2025, 3, 7))
+        self.assertEqual(list(singles), [single])
+        self.assertEqual(list(series), [running])
+        _, series = ScheduledEvent.objects.split_window(None, datetime.date(2025, 1, 1))
+        self.assertEqual(list(series), [])
+
+    def test_pagination_merges_series_and_single_events(self):
+        self.create_series(weeks=6)
+        for day in range(0, 42, 3):
+            ScheduledEvent.objects.create(
+                date=MONDAY + datetime.timedelta(days=day), start_time=datetime.time(14, 0), end_time=datetime.time(15, 0),
+                course=self.course, tutor=self.tutor, room=self.room2, event_type="labwork",
+            )
+        seen = []
+        params = {"start": MONDAY.isoformat(), "end": "2025-03-31", "limit": 4}
+        while True:
+            res = self.client.get("/api/calendar/scheduledevents/", params)
+            seen.extend(res.data["results"])
+            if not res.data["next_cursor"]:
+                break
+            params["cursor"] = res.data["next_cursor"]
+        keys = [(e["date"], e["start_time"], e["id"]) for e in seen]
+        self.assertEqual(len(keys), 6 + 14)
+        self.assertEqual(keys, sorted(set(keys)))
+
+    def test_single_event_cannot_clash_with_series_occurrence(self):
+        self.create_series()
+        week_5 = MONDAY + datetime.timedelta(weeks=4)
+        res = self.client.post("/api/calendar/create_event/", {
+            "title": "Clash", "date": week_5.isoformat(), "start_time": "10:00", "end_time": "12:00",
+            "course": self.course.id, "tutor": self.tutor.id, "room": self.room2.id, "event_type": "lecture",
+        }, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data["detail"], "Tutor has a conflicting schedule.")
+
+        # the day after is free
+        res = self.client.post("/api/calendar/create_event/", {
+            "title": "Fine", "date": (week_5 + datetime.timedelta(days=1)).isoformat(), "start_time": "10:00", "end_time": "12:00",
+            "course": self.course.id, "tutor": self.tutor.id, "room": self.room.id, "event_type": "lecture",
+        }, format="json")
+        self.assertEqual(res.status_code, 201)
+
+    def test_series_cannot_clash_with_existing_event(self):
+        ScheduledEvent.objects.create(
+            date=MONDAY + datetime.timedelta(weeks=3), start_time=datetime.time(10, 0), end_time=datetime.time(10, 30),
+            course=self.course, room=self.room, event_type="exam",
+        )
+        res = self.create_series()
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data["detail"], "Room is already booked for that timeframe.")
+
+    def test_until_before_date_is_rejected(self):
+        res = self.create_series(recurrence={"frequency": "weekly", "until": "2024-12-01"})
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("recurrence", res.data)
+
+    def test_cancel_single_occurrence(self):
+        event_id = self.create_series().data["id"]
+        res = self.client.put(f"/api/calendar/edit_event/{event_id}/", {"action": "cancel", "occurrence": "2025-01-13"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(EventRecurrence.objects.get(event_id=event_id).exceptions, ["2025-01-13"])
+        res = self.client.get("/api/calendar/scheduledevents/", {"start": "2025-01-06", "end": "2025-01-20"})
+        self.assertEqual([e["date"] for e in res.data["results"]], ["2025-01-06", "2025-01-20"])
+
+        res = self.client.put(f"/api/calendar/edit_event/{event_id}/", {"action": "cancel", "occurrence": "2025-01-14"}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+    def test_edit_and_cancel_one_occurrence_keeps_the_rest(self):
+        event_id = self.create_series().data["id"]
+        week_5 = MONDAY + datetime.timedelta(weeks=4)
+        res = self.client.put(f"/api/calendar/edit_event/{event_id}/", {"title": "Moved"}, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("scope", res.data)
+
+        res = self.client.put(f"/api/calendar/edit_event/{event_id}/", {
+            "scope": "occurrence", "occurrence": week_5.isoformat(), "room": self.room2.id, "start_time": "10:00",
+        }, format="json")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual((res.data["date"], res.data["room"], res.data["start_time"]), (week_5.isoformat(), self.room2.id, "10:00:00"))
+        self.assertIsNone(res.data["recurrence"])
+        res = self.client.put(f"/api/calendar/edit_event/{event_id}/", {
+            "action": "cancel", "scope": "occurrence", "occurrence": "2025-01-13",
+        }, format="json")
+        self.assertEqual(res.status_code, 200)
+
+        series = ScheduledEvent.objects.get(pk=event_id)
+        self.assertEqual((series.date, series.status, series.room), (MONDAY, "pending", self.room))
+        res = self.client.get("/api/calendar/scheduledevents/", {"start": MONDAY.isoformat(), "end": "2025-04-30"})
+        dates = [e["date"] for e in res.data["results"] if e["id"] == event_id]
+        expected = [MONDAY + datetime.timedelta(weeks=w) for w in range(15) if w not in (1, 4)]
+        self.assertEqual(dates, [d.isoformat() for d in expected])
+        self.assertEqual(len(res.data["results"]), 14)
+
+    def test_edit_removes_repeat_rule(self):
+        event_id = self.create_series().data["id"]
+        res = self.client.put(f"/api/calendar/edit_event/{event_id}/", {"scope": "series", "recurrence": None}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(res.data["recurrence"])
+        self.assertFalse(EventRecurrence.objects.exists())
+
+    def test_export_expands_occurrences(self):
+        event_id = self.create_series(weeks=4).data["id"]
+        ScheduledEvent.objects.filter(id=event_id).update(status="approved")
+        res = self.client.get("/api/calendar/export/", {"start": "2025-01-01", "end": "2025-01-31"})
+        self.assertEqual(res.status_code, 200)
+        lines = b"".join(res.streaming_content).decode().strip().splitlines()
+        self.assertEqual([line.split(",")[1] for line in lines[1:]], ["06/01/2025", "13/01/2025", "20/01/2025", "27/01/2025"])
+
+    def test_row_serializer_matches_model_serializer(self):
+        self.create_series(weeks=3)
+        qs = ScheduledEvent.objects.order_by("id")
+        expected = ScheduledEventSerializer(qs.with_related(), many=True).data
+        actual = ScheduledEventRowSerializer(qs.as_rows(), many=True).data
+        self.assertEqual([dict(r) for r in actual], [dict(r) for r in expected])
@@ -0,0 +1,178 @@
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from calendar_app.models import Course, Room, ScheduledEvent, EventRecurrence, Major, AuditLog
+from calendar_app.conflicts import find_conflicts
+from calendar_app.recurrence import rule_dates
+from calendar_app.scheduler import build_problem, commit, describe, search, solve, split_hours
+from users.models import TutorProfile
+import datetime
+
+User = get_user_model()
+
+TERM_START = datetime.date(2025, 9, 1)  # a Monday
+TERM_END = datetime.date(2025, 12, 12)
+
+
+class SplitHoursTests(SimpleTestCase):
+    def test_split_hours(self):
+        self.assertEqual(split_hours(0), [])
+        self.assertEqual(split_hours(1), [60])
+        self.assertEqual(split_hours(4), [120, 120])
+        self.assertEqual(split_hours(5), [120, 120, 60])
+
+
+class TermSchedulerTests(APITestCase):
+    url = "/api/calendar/schedule_term/"
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.major = Major.objects.create(name="CS")
+        self.rooms = [Room.objects.create(name=f"Room {i}") for i in range(2)]
+        self.tutors = []
+        for i in range(2):
+            user = User.objects.create_user(username=f"tutor{i}", password="password", role="tutor")
+            self.tutors.append(TutorProfile.objects.create(
+                user=user, email=f"tutor{i}@test.com", name=f"Tutor {i}", dob=datetime.date(1980, 1, 1), tutor_id=f"T{i}",
+            ))
+        self.courses = []
+        for i, (lecture, lab) in enumerate(((4, 2), (3, 0), (2, 1))):
+            course = Course.objects.create(name=f"CS10{i}", major=self.major, year=1, lecture_hours=lecture, lab_hours=lab)
+            self.tutors[i % 2].courses.add(course)
+            self.courses.append(course)
+        self.client.force_authenticate(user=self.admin)
+
+    def assert_conflict_free(self, events):
+        for event in events:
+            rule = getattr(event, "recurrence", None)
+            dates = rule_dates(event.date, rule)
+            conflicts = find_conflicts(dates, event.start_time, event.end_time, event.tutor_id, event.room_id, [event.id])
+            self.assertFalse(conflicts, f"{event.title} on {dates[0]} clashes with {conflicts}")
+
+    def test_places_every_weekly_block_as_pending_series(self):
+        blocker = ScheduledEvent.objects.create(
+            date=TERM_START + datetime.timedelta(weeks=3), start_time=datetime.time(6, 0), end_time=datetime.time(19, 0),
+            course=self.courses[0], tutor=self.tutors[0].user, room=self.rooms[0], event_type="exam",
+            status="approved",
+        )
+        res = self.client.post(self.url, {"term_start": TERM_START.isoformat(), "term_end": TERM_END.isoformat()}, format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        # 4+2 -> 3 blocks, 3 -> 2 blocks, 2+1 -> 2 blocks
+        self.assertEqual(res.data["sessions"], 7)
+        self.assertEqual(res.data["placed"], 7)
+        self.assertEqual(res.data["created"], 7)
+
+        events = list(ScheduledEvent.objects.filter(id__in=res.data["events"]).select_related("recurrence"))
+        self.assertTrue(all(e.status == "pending" for e in events))
+        self.assertTrue(all(e.recurrence.until == TERM_END and e.recurrence.frequency == "weekly" for e in events))
+        self.assertTrue(all(e.tutor_id == self.tutors[self.courses.index(e.course) % 2].user_id for e in events))
+        self.assertEqual(AuditLog.objects.filter(action="createEvent", event__in=events).count(), 7)
+        # the whole Monday the blocker sits on is unavailable to tutor 0, so nothing of theirs lands on a Monday
+        self.assertFalse([e for e in events if e.tutor_id == blocker.tutor_id and e.date.weekday() == blocker.date.weekday()])
+        self.assert_conflict_free(events)
+
+        # the same cohort never sits two classes at once
+        slots = sorted((e.date.weekday(), e.start_time, e.end_time) for e in events)
+        for (d1, s1, e1), (d2, s2, e2) in zip(slots, slots[1:]):
+            self.assertFalse(d1 == d2 and s2 < e1)
+
+        # running it again leaves already timetabled courses alone
+        res = self.client.post(self.url, {"term_start": TERM_START.isoformat(), "term_end": TERM_END.isoformat()}, format="json")
+        self.assertEqual(res.data["created"], 0)
+        self.assertEqual(len(res.data["skipped"]), 3)
+
+    def test_dry_run_exams_and_unassigned_courses(self):
+        Course.objects.create(name="Orphan", major=self.major, year=2, lecture_hours=2)
+        exam_start, exam_end = datetime.date(2026, 1, 5), datetime.date(2026, 1, 6)
+        res = self.client.post(self.url, {
+            "term_start": TERM_START.isoformat(), "term_end": TERM_END.isoformat(),
+            "exam_start": exam_start.isoformat(), "exam_end": exam_end.isoformat(), "dry_run": True,
+        }, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(ScheduledEvent.objects.exists())
+        self.assertEqual(res.data["skipped"], [{"course": Course.objects.get(name="Orphan").id, "reason": "no tutor assigned"}])
+        exams = [p for p in res.data["plan"] if p["event_type"] == "exam"]
+        self.assertEqual(len(exams), 3)
+        self.assertTrue(all(exam_start.isoformat() <= p["date"] <= exam_end.isoformat() and p["weekly_until"] is None for p in exams))
+        # one cohort: its exams never overlap
+        exam_slots = sorted((p["date"], p["start_time"], p["end_time"]) for p in exams)
+        for (d1, s1, e1), (d2, s2, e2) in zip(exam_slots, exam_slots[1:]):
+            self.assertFalse(d1 == d2 and s2 < e1)
+
+    def test_dry_run_is_a_boolean(self):
+        body = {"term_start": TERM_START.isoformat(), "term_end": TERM_END.isoformat(), "restarts": 1}
+        for bad in ("maybe", "no", 2):
+            res = self.client.post(self.url, {**body, "dry_run": bad}, format="json")
+            self.assertEqual(res.status_code, 400, bad)
+        self.assertEqual(self.client.post(self.url, {**body, "dry_run": "true"}).data["created"], 0)
+        self.assertFalse(ScheduledEvent.objects.exists())
+
+        # a form-encoded "false" commits
+        res = self.client.post(self.url, {**body, "dry_run": "false"})
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(ScheduledEvent.objects.count(), res.data["created"])
+
+    def test_workers_are_capped_by_the_server(self):
+        body = {"term_start": TERM_START.isoformat(), "term_end": TERM_END.isoformat(), "restarts": 2, "dry_run": True}
+        with mock.patch("calendar_app.scheduler.search", wraps=search) as searched:
+            self.client.post(self.url, {**body, "workers": 64}, format="json")
+            with override_settings(SCHEDULE_TERM_MAX_WORKERS=2):
+                self.client.post(self.url, {**body, "workers": 64}, format="json")
+        self.assertEqual([c.kwargs["workers"] for c in searched.call_args_list], [1, 2])
+
+    def test_reports_what_cannot_be_placed(self):
+        # a one-hour teaching day cannot take CS100's three two-hour blocks, but CS102's lab fits
+        problem, _ = build_problem(TERM_START, TERM_END, course_ids=[self.courses[0].id, self.courses[2].id],
+                                   day_start=datetime.time(9, 0), day_end=datetime.time(10, 0))
+        best = search(problem, restarts=3)
+        self.assertEqual([problem.sessions[p.session].title for p in best.placements], ["CS102 Labwork"])
+        self.assertEqual(len(best.unplaced), 4)
+
+    def test_parallel_search_matches_serial(self):
+        problem, _ = build_problem(TERM_START, TERM_END)
+        serial = search(problem, restarts=4, workers=1)
+        parallel = search(problem, restarts=4, workers=2)
+        self.assertEqual(serial.rank(), parallel.rank())
+        self.assertEqual(solve(problem, 3).placements, solve(problem, 3).placements)
+
+    def test_commit_skips_placements_booked_during_the_search(self):
+        problem, _ = build_problem(TERM_START, TERM_END)
+        best = search(problem, restarts=2)
+        taken = describe(problem, best.placements[0])
+        # approved in another request while the plan was being searched
+        ScheduledEvent.objects.create(
+            date=datetime.date.fromisoformat(taken["date"]) + datetime.timedelta(weeks=5),
+            start_time=datetime.time.fromisoformat(taken["start_time"]), end_time=datetime.time.fromisoformat(taken["end_time"]),
+            course=self.courses[0], room_id=taken["room"], event_type="exam", status="approved",
+        )
+        events, clashed = commit(problem, best)
+        self.assertEqual(clashed, [taken])
+        self.assertEqual(len(events), len(best.placements) - 1)
+        self.assert_conflict_free(ScheduledEvent.objects.filter(status="pending").select_related("recurrence"))
+
+    def test_management_command(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": cache_dir},
+        }):
+            call_command("schedule_term", start=TERM_START, end=TERM_END, restarts=2, workers=1, stdout=out)
+        self.assertIn("[2/2] best so far: 7/7 sessions placed", out.getvalue())
+        self.assertEqual(EventRecurrence.objects.count(), 7)
+
+    def test_management_command_needs_a_shared_cache_to_commit(self):
+        # its invalidations would never reach the web workers' LocMemCache
+        with self.assertRaisesMessage(CommandError, "shared CACHES backend"):
+            call_command("schedule_term", start=TERM_START, end=TERM_END, restarts=1, workers=1, stdout=StringIO())
+        self.assertFalse(ScheduledEvent.objects.exists())
+        call_command("schedule_term", start=TERM_START, end=TERM_END, restarts=1, workers=1, dry_run=True, stdout=StringIO())
+
+    def test_requires_creator_role(self):
+        self.client.force_authenticate(user=self.tutors[0].user)
+        res = self.client.post(self.url, {"term_start": TERM_START.isoformat(), "term_end": TERM_END.isoformat()}, format="json")
+        self.assertEqual(res.status_code, 404)
@@ -0,0 +1,240 @@
+from io import StringIO
+from unittest import mock
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from calendar_app.models import Course, Room, ScheduledEvent, EventRecurrence, EventTombstone, Major
+from calendar_app.pagination import encode_cursor
+from users.models import StudentProfile
+import datetime
+
+User = get_user_model()
+
+DAY = datetime.date(2025, 1, 6)
+
+
+class DeltaSyncTests(APITestCase):
+    url = "/api/calendar/scheduledevents/changes/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.other_course = Course.objects.create(name="CS201", major=self.major, year=2)
+        self.room = Room.objects.create(name="Room 1")
+        self.events = [self.book(datetime.time(9 + i, 0)) for i in range(3)]
+        self.client.force_authenticate(user=self.admin)
+
+    def book(self, start, course=None, **kwargs):
+        return ScheduledEvent.objects.create(
+            date=DAY, start_time=start, end_time=start.replace(minute=45), course=course or self.course,
+            tutor=self.tutor, room=self.room, event_type="lecture", status="approved", **kwargs,
+        )
+
+    def changes(self, since=None, **params):
+        if since:
+            params["since"] = since
+        res = self.client.get(self.url, params)
+        self.assertEqual(res.status_code, 200, res.data)
+        return res.data
+
+    def sync_all(self, since=None, **params):
+        created, updated, deleted = [], [], []
+        while True:
+            data = self.changes(since, **params)
+            created += [r["id"] for r in data["created"]]
+            updated += [r["id"] for r in data["updated"]]
+            deleted += data["deleted"]
+            since = data["cursor"]
+            if not data["has_more"]:
+                return created, updated, deleted, since
+
+    def test_full_sync_then_nothing_new(self):
+        data = self.changes()
+        self.assertEqual(sorted(r["id"] for r in data["created"]), sorted(e.id for e in self.events))
+        self.assertEqual(data["created"][0]["course_name"], "CS101")
+        self.assertEqual((data["updated"], data["deleted"], data["has_more"]), ([], [], False))
+
+        data = self.changes(data["cursor"])
+        self.assertEqual((data["created"], data["updated"], data["deleted"]), ([], [], []))
+
+    def test_reports_inserts_updates_and_deletes(self):
+        ScheduledEvent.objects.get(pk=self.events[2].id).delete()  # before the sync: no tombstone reported
+        cursor = self.changes()["cursor"]
+
+        new = self.book(datetime.time(14, 0))
+        self.events[0].title = "Moved"
+        self.events[0].save()
+        EventRecurrence.objects.create(event=self.events[1], frequency="weekly", until=DAY + datetime.timedelta(weeks=4))
+        removed = self.events[0].id
+        self.events[0].delete()
+
+        data = self.changes(cursor)
+        self.assertEqual([r["id"] for r in data["created"]], [new.id])
+        self.assertEqual([r["id"] for r in data["updated"]], [self.events[1].id])
+        self.assertEqual(data["updated"][0]["recurrence"]["frequency"], "weekly")
+        self.assertEqual(data["deleted"], [removed])
+
+    def test_merged_change_request_is_deleted(self):
+        cursor = self.changes()["cursor"]
+        child = self.book(datetime.time(16, 0), title="Changed", related_event=self.events[0])
+        child.status = "request_change"
+        child.save()
+        res = self.client.post(f"/api/calendar/approve/{child.id}/")
+        self.assertEqual(res.status_code, 200)
+
+        created, updated, deleted, _ = self.sync_all(cursor)
+        self.assertEqual(updated, [self.events[0].id])
+        self.assertEqual(created, [])
+        self.assertEqual(deleted, [child.id])
+
+    def test_small_pages_cover_every_change_once(self):
+        cursor = self.changes()["cursor"]
+        now = timezone.now()
+        removed = [e.id for e in self.events]
+        # several changes stamped in the same instant straddle page boundaries
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            added = [self.book(datetime.time(14, i)) for i in range(4)]
+            for event in self.events:
+                event.delete()
+        created, updated, deleted, cursor = self.sync_all(cursor, limit=2)
+        self.assertEqual(created, [e.id for e in added])
+        self.assertEqual(updated, [])
+        self.assertEqual(sorted(deleted), removed)
+
+        self.assertEqual(self.sync_all(cursor, limit=2)[:3], ([], [], []))
+
+    def test_student_sees_events_leaving_their_cohort_as_deleted(self):
+        student = User.objects.create_user(username="student", password="password", role="student")
+        StudentProfile.objects.create(
+            user=student, name="Student", email="student@test.com", dob=datetime.date(2000, 1, 1), student_id="S1",
+            major=self.major, year=1,
+        )
+        self.client.force_authenticate(user=student)
+        hidden = self.book(datetime.time(14, 0), course=self.other_course)
+        data = self.changes()
+        self.assertNotIn(hidden.id, [r["id"] for r in data["created"]])
+
+        self.events[0].course = self.other_course
+        self.events[0].save()
+        data = self.changes(data["cursor"])
+        self.assertEqual(data["deleted"], [self.events[0].id])
+        self.assertEqual(data["updated"], [])
+
+        # changes and moves in other cohorts are none of this student's business
+        third_year = Course.objects.create(name="CS301", major=self.major, year=3)
+        hidden.title = "Renamed"
+        hidden.save()
+        self.events[0].course = third_year
+        self.events[0].save()
+        self.book(datetime.time(16, 0), course=third_year).delete()
+        data = self.changes(data["cursor"])
+        self.assertEqual((data["created"], data["updated"]), ([], []))
+        # only the genuine deletion
+        self.assertEqual(len(data["deleted"]), 1)
+        self.assertNotIn(hidden.id, data["deleted"])
+        self.assertNotIn(self.events[0].id, data["deleted"])
+
+    def test_course_moving_cohort_drops_its_events_for_that_cohort_only(self):
+        student = User.objects.create_user(username="student", password="password", role="student")
+        StudentProfile.objects.create(
+            user=student, name="Student", email="student@test.com", dob=datetime.date(2000, 1, 1), student_id="S1",
+            major=self.major, year=1,
+        )
+        admin_cursor = self.changes()["cursor"]
+        self.client.force_authenticate(user=student)
+        cursor = self.changes()["cursor"]
+
+        self.course.year = 2
+        self.course.save()
+        data = self.changes(cursor)
+        self.assertEqual(sorted(data["deleted"]), sorted(e.id for e in self.events))
+        self.assertEqual(data["updated"], [])
+
+        # everyone else still sees the events, updated
+        self.client.force_authenticate(user=self.admin)
+        data = self.changes(admin_cursor)
+        self.assertEqual(data["deleted"], [])
+        self.assertEqual(sorted(r["id"] for r in data["updated"]), sorted(e.id for e in self.events))
+
+    def test_student_full_sync_walks_only_their_cohort(self):
+        student = User.objects.create_user(username="student", password="password", role="student")
+        StudentProfile.objects.create(
+            user=student, name="Student", email="student@test.com", dob=datetime.date(2000, 1, 1), student_id="S1",
+            major=self.major, year=1,
+        )
+        with mock.patch("django.utils.timezone.now", return_value=timezone.now() - datetime.timedelta(hours=1)):
+            others = [self.book(datetime.time(10, i), course=self.other_course) for i in range(10)]
+        self.client.force_authenticate(user=student)
+
+        pages = 0
+        since = None
+        created, deleted = [], []
+        while True:
+            data = self.changes(since, limit=2)
+            pages += 1
+            if pages == 1:
+                # an event already sent leaves the cohort while the full sync is still paging
+                moved = ScheduledEvent.objects.get(pk=data["created"][0]["id"])
+                moved.course = self.other_course
+                moved.save()
+            created += [r["id"] for r in data["created"]]
+            deleted += data["deleted"]
+            since = data["cursor"]
+            if not data["has_more"]:
+                break
+        # other cohorts' events are neither walked nor reported
+        self.assertEqual(pages, 2)
+        self.assertEqual(sorted(created), sorted(e.id for e in self.events))
+        self.assertEqual(deleted, [moved.id])
+        self.assertFalse(set(deleted) & {e.id for e in others})
+
+        # the completed sync's cursor is incremental again
+        other = self.book(datetime.time(15, 0), course=self.other_course)
+        other.course = self.course
+        other.save()
+        self.assertEqual([r["id"] for r in self.changes(since)["created"]], [other.id])
+
+    def test_cursor_without_an_event_position(self):
+        now = timezone.now()
+        data = self.changes(encode_cursor([None, None, now, 0]))
+        self.assertEqual(sorted(r["id"] for r in data["created"]), sorted(e.id for e in self.events))
+        res = self.client.get(self.url, {"since": encode_cursor([None, None, now, 0, now])})
+        self.assertEqual(res.status_code, 400)
+
+    def test_course_rename_touches_its_events(self):
+        cursor = self.changes()["cursor"]
+        self.course.name = "CS101 Intro"
+        self.course.save()
+        data = self.changes(cursor)
+        self.assertEqual(sorted(r["id"] for r in data["updated"]), sorted(e.id for e in self.events))
+        self.assertEqual(data["updated"][0]["course_name"], "CS101 Intro")
+
+    def test_bad_and_expired_cursors(self):
+        res = self.client.get(self.url, {"since": "garbage"})
+        self.assertEqual(res.status_code, 400)
+        old = timezone.now() - datetime.timedelta(days=60)
+        res = self.client.get(self.url, {"since": encode_cursor([old, 1, old, 1])})
+        self.assertEqual(res.status_code, 410)
+
+    def test_idle_cursor_does_not_expire(self):
+        now = timezone.now()
+        with mock.patch("django.utils.timezone.now", return_value=now - datetime.timedelta(days=40)):
+            EventTombstone.objects.create(event_id=999)
+        cursor = self.changes()["cursor"]
+        # nothing deleted for 40 days, but a client polling daily keeps a fresh tombstone position
+        for day in range(1, 41):
+            with mock.patch("django.utils.timezone.now", return_value=now + datetime.timedelta(days=day)):
+                cursor = self.changes(cursor)["cursor"]
+
+    def test_prune_tombstones(self):
+        EventTombstone.objects.create(event_id=1)
+        EventTombstone.objects.filter(event_id=1).update(deleted_at=timezone.now() - datetime.timedelta(days=31))
+        removed = self.events[0].id
+        self.events[0].delete()
+        out = StringIO()
+        call_command("prune_tombstones", stdout=out)
+        self.assertIn("Pruned 1 tombstones", out.getvalue())
+        self.assertEqual(list(EventTombstone.objects.values_list("event_id", flat=True)), [removed])
@@ -0,0 +1,163 @@
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from calendar_app.models import Course, Room, ScheduledEvent, EventRecurrence, Major
+from users.models import StudentProfile
+import datetime
+
+User = get_user_model()
+
+DAY = datetime.date(2025, 1, 6)
+
+
+class CohortTimetableTests(APITestCase):
+    url = "/api/calendar/scheduledevents/"
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username="admin", password="password", role="administrator")
+        self.tutor = User.objects.create_user(username="tutor", password="password", role="tutor")
+        self.major = Major.objects.create(name="CS")
+        self.course = Course.objects.create(name="CS101", major=self.major, year=1)
+        self.other_course = Course.objects.create(name="CS201", major=self.major, year=2)
+        self.room = Room.objects.create(name="Room 1")
+        self.students = [self.student(f"s{i}", year=1) for i in range(2)]
+        self.senior = self.student("senior", year=2)
+        self.event = self.book(datetime.time(9, 0))
+        self.book(datetime.time(9, 0), course=self.other_course)
+
+    def student(self, username, year):
+        user = User.objects.create_user(username=username, password="password", role="student")
+        StudentProfile.objects.create(
+            user=user, name=username, email=f"{username}@test.com", dob=datetime.date(2000, 1, 1),
+            student_id=username, major=self.major, year=year,
+        )
+        return user
+
+    def book(self, start, course=None, **kwargs):
+        return ScheduledEvent.objects.create(
+            date=DAY, start_time=start, end_time=start.replace(minute=45), course=course or self.course,
+            tutor=self.tutor, room=self.room, event_type="lecture", status="approved", **kwargs,
+        )
+
+    def timetable(self, user):
+        self.client.force_authenticate(user=user)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def titles(self, user):
+        return [(r["id"], r["course_name"]) for r in self.timetable(user)]
+
+    def test_cohort_shares_one_cached_timetable(self):
+        first = self.timetable(self.students[0])
+        self.assertEqual([r["id"] for r in first], [self.event.id])
+
+        # second student of the cohort: only their cohort lookup misses
+        with self.assertNumQueries(1):
+            self.assertEqual(self.timetable(self.students[1]), first)
+        with self.assertNumQueries(0):
+            self.timetable(self.students[1])
+
+        # same payload as the uncached list
+        self.client.force_authenticate(user=self.admin)
+        uncached = [r for r in self.client.get(self.url).data if r["id"] == self.event.id]
+        self.assertEqual([dict(r) for r in first], [dict(r) for r in uncached])
+
+    def test_calendar_windows_are_cut_from_the_cached_timetable(self):
+        series = self.book(datetime.time(11, 0))
+        EventRecurrence.objects.create(event=series, frequency="weekly", until=DAY + datetime.timedelta(weeks=5))
+        self.book(datetime.time(8, 0))
+        later = self.book(datetime.time(10, 0))
+        later.date = DAY + datetime.timedelta(days=15)
+        later.save()
+        window = {"start": (DAY + datetime.timedelta(days=1)).isoformat(), "end": (DAY + datetime.timedelta(days=28)).isoformat()}
+
+        self.client.force_authenticate(user=self.admin)
+        expected = [
+            (r["id"], r["date"], r["start_time"]) for r in self.client.get(self.url, window).data["results"]
+            if r["course"] == self.course.id
+        ]
+        self.assertEqual(len(expected), 5)
+
+        # the student calendar asks for the visible weeks, as the Calendar page does
+        self.timetable(self.students[0])
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url, window)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([(r["id"], r["date"], r["start_time"]) for r in res.data["results"]], expected)
+        self.assertIsNone(res.data["next_cursor"])
+
+        # paged through, also without touching the events table
+        pages, cursor = [], None
+        with self.assertNumQueries(0):
+            while True:
+                res = self.client.get(self.url, {**window, "limit": 2, **({"cursor": cursor} if cursor else {})})
+                pages += [(r["id"], r["date"], r["start_time"]) for r in res.data["results"]]
+                cursor = res.data["next_cursor"]
+                if not cursor:
+                    break
+        self.assertEqual(pages, expected)
+
+    def test_event_writes_invalidate_the_cohort(self):
+        self.timetable(self.students[0])
+        self.timetable(self.senior)
+
+        added = self.book(datetime.time(11, 0))
+        self.assertEqual(len(self.timetable(self.students[0])), 2)
+
+        added.status = "cancelled"
+        added.save()
+        self.assertEqual([r["status"] for r in self.timetable(self.students[0]) if r["id"] == added.id], ["cancelled"])
+
+        EventRecurrence.objects.create(event=added, frequency="weekly", until=DAY + datetime.timedelta(weeks=2))
+        self.assertEqual(len(self.timetable(self.students[0])), 4)
+
+        # moving an event to another cohort updates both
+        added.course = self.other_course
+        added.save()
+        self.assertEqual(len(self.timetable(self.students[0])), 1)
+        self.assertEqual(len(self.timetable(self.senior)), 4)
+
+        added.delete()
+        self.assertEqual(len(self.timetable(self.senior)), 1)
+
+    def test_bulk_create_and_renames_invalidate(self):
+        self.timetable(self.students[0])
+        self.client.force_authenticate(user=self.admin)
+        res = self.client.post("/api/calendar/events/bulk/", {"events": [{
+            "title": "Lab", "date": DAY.isoformat(), "start_time": "14:00", "end_time": "15:00",
+            "course": self.course.id, "tutor": self.tutor.id, "room": self.room.id, "event_type": "labwork",
+        }]}, format="json")
+        self.assertEqual(res.status_code, 201, res.data)
+        self.assertEqual(len(self.timetable(self.students[0])), 2)
+
+        self.course.name = "CS101 Intro"
+        self.course.save()
+        self.assertEqual({r["course_name"] for r in self.timetable(self.students[0])}, {"CS101 Intro"})
+
+    def test_promotion_moves_student_to_next_cohort(self):
+        self.assertEqual(self.titles(self.students[0]), [(self.event.id, "CS101")])
+        self.client.force_authenticate(user=self.admin)
+        profile = StudentProfile.objects.get(user=self.students[0])
+        res = self.client.post("/api/users/students/bulk-promote/", {"student_ids": [profile.id]}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([name for _, name in self.titles(self.students[0])], ["CS201"])
+
+    def test_student_without_profile_sees_nothing(self):
+        loner = User.objects.create_user(username="loner", password="password", role="student")
+        self.assertEqual(self.timetable(loner), [])
+        StudentProfile.objects.create(
+            user=loner, name="loner", email="loner@test.com", dob=datetime.date(2000, 1, 1), student_id="L1",
+            major=self.major, year=1,
+        )
+        self.assertEqual(len(self.timetable(loner)), 1)
+
+    def test_reassigned_profile_forgets_the_previous_user(self):
+        self.assertEqual(len(self.timetable(self.students[0])), 1)
+        profile = StudentProfile.objects.get(user=self.students[0])
+        successor = User.objects.create_user(username="successor", password="password", role="student")
+        profile.user = successor
+        profile.save()
+        self.assertEqual(self.timetable(self.students[0]), [])
+        self.assertEqual(len(self.timetable(successor)), 1)
@@ -0,0 +1,99 @@
+"""Per-cohort student timetables, serialized once and served from the cache.
+
+Every student in a (major, year) cohort sees the same calendar, so the
+unpaginated events list for a student is built once per cohort and stored,
+already serialized, under `timetable:{major}:{year}:{names}`. `names` is a
+digest of the course/room/tutor version stamps (calendar_app.versioning): the
+rows render those names, and a rename retires every cohort's entry at once.
+
+Event writes delete the affected cohorts explicitly: save()/delete() through
+the handlers in calendar_app.signals (including the cohort an event is moved
+out of), bulk_create() through `invalidate_courses()` at the call site.
+
+The student -> cohort lookup is cached as well (`student-cohort:{user_id}`),
+so a warm student calendar load reads the cache only.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+
+from users.models import StudentProfile
+from . import versioning
+from .models import Course, ScheduledEvent
+from .recurrence import event_key, expand_rows
+from .serializers import ScheduledEventRowSerializer
+
+TIMETABLE_CACHE_TIMEOUT = 24 * 3600
+
+# student_cohort() result for a student without a StudentProfile
+NO_PROFILE = "no-profile"
+
+NAME_SCOPES = (versioning.COURSES, versioning.ROOMS, versioning.TUTORS)
+
+
+def _keys(cohorts):
+    stamps = versioning.versions(NAME_SCOPES)
+    names = hashlib.md5(",".join(str(stamps[s]) for s in NAME_SCOPES).encode()).hexdigest()[:12]
+    return [f"timetable:{major_id}:{year}:{names}" for major_id, year in cohorts]
+
+
+def _student_key(user_id):
+    return f"student-cohort:{user_id}"
+
+
+def student_cohort(user_id):
+    """(major_id, year) of a student, None if their profile has no cohort, or NO_PROFILE."""
+    key = _student_key(user_id)
+    cohort = cache.get(key)
+    if cohort is None:
+        profile = StudentProfile.objects.filter(user_id=user_id).values_list("major_id", "year").first()
+        if profile is None:
+            cohort = NO_PROFILE
+        else:
+            cohort = tuple(profile) if all(profile) else ()
+        cache.set(key, cohort, TIMETABLE_CACHE_TIMEOUT)
+    return cohort or None
+
+
+def build(major_id, year):
+    """Serialized, expanded and sorted event rows of one cohort, as the events list returns them."""
+    qs = ScheduledEvent.objects.filter(course__major_id=major_id, course__year=year)
+    rows = sorted(expand_rows(qs.as_rows()), key=event_key)
+    return ScheduledEventRowSerializer(rows, many=True).data
+
+
+def cohort_timetable(major_id, year):
+    """The cohort's timetable, built and cached on a miss."""
+    [key] = _keys([(major_id, year)])
+    data = cache.get(key)
+    if data is None:
+        data = build(major_id, year)
+        cache.set(key, data, TIMETABLE_CACHE_TIMEOUT)
+    return data
+
+
+def _delete(cohorts):
+    cache.delete_many(_keys(cohorts))
+
+
+def invalidate(cohorts):
+    """Drop the cached timetables of `cohorts` ((major_id, year) pairs; pairs without a major are ignored).
+
+    Dropped now and again once the surrounding transaction commits, so a
+    reader that rebuilt from pre-commit data does not keep it.
+    """
+    cohorts = {c for c in cohorts if c[0] is not None}
+    if cohorts:
+        _delete(cohorts)
+        transaction.on_commit(lambda: _delete(cohorts))
+
+
+def invalidate_courses(course_ids):
+    """invalidate() the cohorts of `course_ids`, for writes that bypass the model signals."""
+    invalidate(Course.objects.filter(id__in=set(course_ids)).values_list("major_id", "year"))
+
+
+def forget_students(user_ids):
+    """Drop cached student -> cohort lookups after their profiles change."""
+    cache.delete_many([_student_key(u) for u in user_ids])
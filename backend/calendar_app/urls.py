@@ -10,13 +10,24 @@ urlpatterns = [
     path("tutors/", views.all_tutors),
     path("tutors/<int:tutor_id>/schedules/", views.tutor_schedules),
     path("rooms/available/", views.rooms_available),
+    path("free_slots/", views.free_slots),
     path("scheduledevents/", views.scheduledevents_list),
+    path("scheduledevents/changes/", views.scheduledevents_changes),
     path("events/", views.events_fallback),
+    path("events/bulk/", views.bulk_create_events),
+    path("schedule_term/", views.schedule_term),
     path("create_event/", views.create_event),
     path("edit_event/<int:event_id>/", views.edit_event),
     path("export/", views.export_calendar),
+    # iCalendar subscription feeds
+    path("feeds/token/", views.calendar_feed_token),
+    path("feeds/<str:token>.ics", views.calendar_feed),
     # Audit logs
     path("audit/logs/", views.get_audit_logs),
+    path("audit/stats/", views.get_audit_stats),
     # Notifications
     path("notifications/", views.get_notifications),
+    path("notifications/unread-count/", views.notifications_unread_count),
+    path("notifications/mark-read/", views.notifications_mark_read),
+    path("notifications/stream/", views.notifications_stream),
 ]
@@ -0,0 +1,114 @@
+"""Version tokens and conditional GET for read-mostly endpoints.
+
+Each scope ("events", "courses", ...) has a version stamp in the Django cache:
+the time, in nanoseconds, of the last write to the models behind it. Writes
+bump it through the signal handlers in calendar_app.signals, or explicitly
+after bulk_create()/update(), which send no signals.
+
+`conditional_get(*scopes)` wraps a GET view. It builds an ETag and a
+Last-Modified value from the scopes' stamps and the request, and answers
+If-None-Match / If-Modified-Since with 304 before the view runs, so an
+unchanged calendar costs one cache round trip instead of the main query.
+
+The ETag is exact and takes precedence. HTTP dates only have whole seconds,
+so Last-Modified is the end of the stamp's second, sent only once that second
+is over; a write made after the response is then always later than it.
+"""
+import functools
+import hashlib
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+
+EVENTS = "events"
+COURSES = "courses"
+ROOMS = "rooms"
+MAJORS = "majors"
+TUTORS = "tutors"
+STUDENTS = "students"
+
+
+def cache_is_shared():
+    """Whether the default cache is one store for every process.
+
+    The stamps (and the derived data cached next to them) are bumped by the
+    process that writes; with a per-process LocMemCache other workers and
+    management commands never see the bump and keep validating stale ETags.
+    """
+    return not isinstance(caches["default"], LocMemCache)
+
+
+def _cache_key(scope):
+    return f"version:{scope}"
+
+
+def _bump_now(scopes):
+    now = time.time_ns()
+    cache.set_many({_cache_key(s): now for s in scopes}, None)
+
+
+def bump(*scopes):
+    """Record a write to `scopes`.
+
+    Bumped immediately and again once the surrounding transaction commits, so
+    a reader that cached the pre-commit data under the first stamp is
+    invalidated as well.
+    """
+    _bump_now(scopes)
+    transaction.on_commit(lambda: _bump_now(scopes))
+
+
+def versions(scopes):
+    """{scope: stamp}; scopes never written (or evicted) start at the current time."""
+    keys = {_cache_key(s): s for s in scopes}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        # add() so concurrent readers agree on a single starting stamp
+        for key, stamp in missing.items():
+            cache.add(key, stamp, None)
+        found.update(cache.get_many(missing))
+    return {keys[key]: stamp for key, stamp in found.items()}
+
+
+def conditional_get(*scopes, per_user=False):
+    """Decorate a GET view whose output only changes when `scopes` are written.
+
+    The ETag covers the scope stamps and the full request path (query string
+    included); `per_user=True` adds the user, for views whose output depends
+    on who asks.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            stamps = versions(scopes)
+            parts = [f"{s}:{stamps[s]}" for s in scopes] + [request.get_full_path()]
+            if per_user:
+                parts.append(f"user:{getattr(request.user, 'pk', None)}")
+            etag = quote_etag(hashlib.md5("|".join(parts).encode()).hexdigest())
+            stamp = max(stamps.values())
+            # rounded up: the stamp is at or before it
+            last_modified = -(-stamp // 1_000_000_000)
+
+            if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+            if if_none_match:
+                not_modified = etag in parse_etags(if_none_match) or "*" in parse_etags(if_none_match)
+            else:
+                since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+                not_modified = since is not None and stamp <= since * 1_000_000_000
+
+            response = Response(status=304) if not_modified else view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response["ETag"] = etag
+                # within the stamp's second a later write could still round to the same date
+                if last_modified * 1_000_000_000 <= time.time_ns():
+                    response["Last-Modified"] = http_date(last_modified)
+                # always revalidate; never share per-user payloads
+                response["Cache-Control"] = "private, no-cache" if per_user else "no-cache"
+            return response
+        return wrapper
+    return decorator
@@ -1,13 +1,31 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q
 from django.contrib.auth import get_user_model
-from .models import ScheduledEvent, Course, Room, AuditLog, Notification
-from .serializers import ScheduledEventSerializer, AuditLogSerializer
-from users.models import StudentProfile
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import ScheduledEvent, EventRecurrence, Course, Room, AuditLog
+from .serializers import ScheduledEventSerializer, ScheduledEventRowSerializer, EventRecurrenceSerializer, AuditLogSerializer
+from .conflicts import INACTIVE_STATUSES, ConflictIndex, find_conflicts
+from .availability import day_occupancy
+from .slots import DAY_END, DAY_START, find_free_slots
+from . import audit, audit_archive, feeds, notifications, push, scheduler, sync, timetables, versioning
+from .versioning import conditional_get
+from .recurrence import event_key, expand_rows, occurs_on, rule_dates
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_q, parse_limit
+from .signals import invalidate_after_bulk_write
 import datetime
+import heapq
+import itertools
 import logging
 
 User = get_user_model()
@@ -15,62 +33,12 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-def _notify_related_users(event, action_description):
-    """
-    Creates notifications for users related to an event operation.
-    Related users:
-    - Students taking the course (match by major + year)
-    - The tutor assigned to the event
-    - Admin/DAA/AA staff
-    """
-    notifications = []
-    
-    # 1. Students
-    if event.course and event.course.major:
-        students = StudentProfile.objects.filter(major=event.course.major, year=event.course.year).select_related('user')
-        for sp in students:
-            if sp.user:
-                notif = Notification(
-                    user=sp.user,
-                    message=f"Event '{event.title}' for course '{event.course.name}' was {action_description}.",
-                    event=event
-                )
-                notifications.append(notif)
-                
-    # 2. Tutor
-    if event.tutor:
-        notif = Notification(
-            user=event.tutor,
-            message=f"Your event '{event.title}' for '{event.course.name}' was {action_description}.",
-            event=event
-        )
-        notifications.append(notif)
-        
-    # 3. Staff (Admins, DAA, AA)
-    staff_users = User.objects.filter(role__in=["administrator", "department_assistant", "academic_assistant"])
-    
-    # Store IDs to avoid duplicates if user falls into multiple categories (e.g. staff who is also a tutor)
-    notified_ids = {n.user.id for n in notifications}
+STAFF_ROLES = ["administrator", "department_assistant", "academic_assistant"]
 
-    for staff in staff_users:
-        if staff.id in notified_ids:
-            continue
-            
-        Actor = "System"
-        if event.tutor:
-             Actor = event.tutor.username
-        
-        notif = Notification(
-            user=staff,
-            message=f"Event '{event.title}' ({event.course.name}) was {action_description}.", 
-            event=event
-        )
-        notifications.append(notif)
-        notified_ids.add(staff.id)
-        
-    if notifications:
-        Notification.objects.bulk_create(notifications)
-        logger.info(f"Created {len(notifications)} notifications for action '{action_description}' on event {event.id}")
+
+def _notify_related_users(event, action_description):
+    """Queue notifications to the users related to an event operation (see calendar_app.notifications)."""
+    notifications.notify([event], action_description)
 
 
 def _parse_time(t: str):
@@ -91,6 +59,31 @@ def _require_role_or_404(request, allowed_roles):
     return None
 
 
+def _slot_conflict_response(dates, start_time, end_time, tutor_id, room_id, exclude_ids):
+    """Return a 400 Response if the slot double-books the tutor or room on any of `dates`, else None."""
+    conflicts = find_conflicts(dates, start_time, end_time, tutor_id=tutor_id, room_id=room_id, exclude_ids=exclude_ids)
+    if conflicts.tutor:
+        logger.info(f"Tutor conflict detected for tutor={tutor_id} dates={dates}: events {conflicts.tutor}")
+        return Response({"detail": "Tutor has a conflicting schedule."}, status=400)
+    if conflicts.room:
+        logger.info(f"Room conflict detected for room={room_id} dates={dates}: events {conflicts.room}")
+        return Response({"detail": "Room is already booked for that timeframe."}, status=400)
+    return None
+
+
+def _recurrence_of(event):
+    """The event's EventRecurrence, or None for a single event."""
+    return getattr(event, "recurrence", None)
+
+
+def _change_request_family(event):
+    """Ids of an event, its parent and every change request of that parent: they describe one slot."""
+    root_id = event.related_event_id or event.id
+    ids = set(ScheduledEvent.objects.filter(related_event_id=root_id).values_list("id", flat=True))
+    ids.update((root_id, event.id))
+    return ids
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def create_event(request):
@@ -180,24 +173,20 @@ def create_event(request):
                 logger.exception(f"Failed to resolve or create Room from value={room_val}: {e}")
                 return Response({"room": "Invalid room value."}, status=400)
 
-    # Check tutor overlap
-    tutor_conflicts = ScheduledEvent.objects.filter(
-        tutor=tutor,
-        date=date_obj,
-    ).filter(~Q(end_time__lte=start_time) & ~Q(start_time__gte=end_time))
-    if tutor_conflicts.exists():
-        logger.info(f"Tutor conflict detected for tutor={tutor.id} date={date_obj}: {tutor_conflicts.count()} conflicting events")
-        return Response({"detail": "Tutor has a conflicting schedule."}, status=400)
-
-    # Check room overlap
-    if room:
-        room_conflicts = ScheduledEvent.objects.filter(
-            room=room,
-            date=date_obj,
-        ).filter(~Q(end_time__lte=start_time) & ~Q(start_time__gte=end_time))
-        if room_conflicts.exists():
-            logger.info(f"Room conflict detected for room={room.id} date={date_obj}: {room_conflicts.count()} conflicting events")
-            return Response({"detail": "Room is already booked for that timeframe."}, status=400)
+    # optional repeat rule: the event becomes a series, expanded lazily on read
+    rule = None
+    recurrence_data = data.get("recurrence")
+    if recurrence_data:
+        rec_serializer = EventRecurrenceSerializer(data=recurrence_data, context={"anchor_date": date_obj})
+        if not rec_serializer.is_valid():
+            logger.warning(f"Invalid recurrence received: {rec_serializer.errors}")
+            return Response({"recurrence": rec_serializer.errors}, status=400)
+        rule = rec_serializer.validated_data
+
+    # Check tutor and room overlap in one pass (every occurrence, for a series)
+    res = _slot_conflict_response(rule_dates(date_obj, rule), start_time, end_time, tutor.id, room.id if room else None, ())
+    if res:
+        return res
 
     # All good: prepare serializer payload
     payload = data
@@ -208,11 +197,14 @@ def create_event(request):
 
     serializer = ScheduledEventSerializer(data=payload)
     if serializer.is_valid():
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            if rule:
+                EventRecurrence.objects.create(event=serializer.instance, **rule)
         logger.info(f"ScheduledEvent created: id={serializer.instance.id}, title={serializer.instance.title}, course={course.id}, tutor={tutor.id}, date={date_obj}, start={start_time}, end={end_time}, room={room.id if room else None}")
         # Create audit log for event creation
         try:
-            AuditLog.objects.create(user=request.user, action='createEvent', event=serializer.instance)
+            audit.record(request.user, 'createEvent', event=serializer.instance)
             _notify_related_users(serializer.instance, "created")
             logger.info(f"Audit log created for event creation: event_id={serializer.instance.id}, user={request.user.id}")
         except Exception as e:
@@ -222,6 +214,256 @@ def create_event(request):
         logger.warning(f"ScheduledEvent serializer errors: {serializer.errors}")
         return Response(serializer.errors, status=400)
 
+BULK_EVENTS_MAX_ROWS = 5000
+
+
+def _lookup_by_id_or_name(model, values):
+    """Resolve a mixed list of ids / names to instances with at most two queries."""
+    ids, names = set(), set()
+    for v in values:
+        if v in (None, ""):
+            continue
+        try:
+            ids.add(int(v))
+        except (TypeError, ValueError):
+            names.add(str(v))
+    by_id, by_name = {}, {}
+    if ids:
+        by_id = {str(o.id): o for o in model.objects.filter(id__in=ids)}
+    if names:
+        for o in model.objects.filter(name__in=names).order_by("id"):
+            by_name.setdefault(o.name, o)
+    return lambda v: by_id.get(str(v)) or by_name.get(str(v))
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def bulk_create_events(request):
+    """
+    Create many events in one request.
+
+    POST body: {"events": [<create_event payload>, ...], "all_or_nothing": false}
+    Courses and rooms may be given by id or exact name (unknown names are errors
+    here, not created). Every row is validated against the database and against
+    the rows before it in one sweep; valid rows are inserted with bulk_create in
+    a single transaction, followed by batched audit and notification records.
+    With all_or_nothing, any invalid row aborts the whole batch.
+
+    Response: {"created": <count>, "results": [{"row": i, "status": "created", "id": ...}
+                                               | {"row": i, "status": "error", "errors": {...}}]}
+    """
+    res = _require_role_or_404(request, ("academic_assistant", "administrator"))
+    if res:
+        return res
+
+    body = request.data
+    rows = body.get("events") if isinstance(body, dict) else body
+    all_or_nothing = bool(body.get("all_or_nothing")) if isinstance(body, dict) else False
+    if not isinstance(rows, list) or not rows:
+        return Response({"events": "Expected a non-empty list of events."}, status=400)
+    if len(rows) > BULK_EVENTS_MAX_ROWS:
+        return Response({"events": f"At most {BULK_EVENTS_MAX_ROWS} events per request."}, status=400)
+    logger.info(f"bulk_create_events called by {request.user} with {len(rows)} rows")
+
+    rows = [r if isinstance(r, dict) else {} for r in rows]
+    course_of = _lookup_by_id_or_name(Course, [r.get("course") for r in rows])
+    room_of = _lookup_by_id_or_name(Room, [r.get("room") for r in rows])
+    tutor_ids = set()
+    for r in rows:
+        try:
+            tutor_ids.add(int(r.get("tutor")))
+        except (TypeError, ValueError):
+            pass
+    tutors = {u.id: u for u in User.objects.filter(id__in=tutor_ids)}
+    valid_types = {c[0] for c in ScheduledEvent.EVENT_TYPES}
+
+    # 1. validate each row on its own
+    results = [None] * len(rows)
+    candidates = []
+    for i, r in enumerate(rows):
+        errors = {}
+        course = course_of(r.get("course")) if r.get("course") not in (None, "") else None
+        if course is None:
+            errors["course"] = "This field is required." if r.get("course") in (None, "") else "Course not found."
+        tutor = None
+        try:
+            tutor = tutors.get(int(r.get("tutor")))
+        except (TypeError, ValueError):
+            pass
+        if tutor is None:
+            errors["tutor"] = "This field is required." if not r.get("tutor") else "Tutor not found."
+        elif tutor.role != "tutor":
+            errors["tutor"] = f"User must have tutor role, but has {tutor.role} role."
+        room = room_of(r.get("room")) if r.get("room") not in (None, "") else None
+        if room is None:
+            errors["room"] = "This field is required." if r.get("room") in (None, "") else "Room not found."
+        date_obj = None
+        try:
+            date_obj = datetime.date.fromisoformat(r.get("date") or "")
+        except (TypeError, ValueError):
+            errors["date"] = "Invalid date format, expected YYYY-MM-DD."
+        start_time = _parse_time(r.get("start_time") or "")
+        end_time = _parse_time(r.get("end_time") or "")
+        if not start_time or not end_time:
+            errors["detail"] = "start_time and end_time are required in HH:MM format."
+        elif start_time >= end_time:
+            errors["detail"] = "start_time must be before end_time."
+        if r.get("event_type") not in valid_types:
+            errors["event_type"] = "This field is required." if not r.get("event_type") else "Invalid event_type."
+
+        if errors:
+            results[i] = {"row": i, "status": "error", "errors": errors}
+            continue
+        candidates.append((i, ScheduledEvent(
+            title=r.get("title") or "New Event",
+            date=date_obj,
+            start_time=start_time,
+            end_time=end_time,
+            course=course,
+            tutor=tutor,
+            room=room,
+            event_type=r["event_type"],
+            notes=r.get("notes"),
+        )))
+
+    # 2. conflicts: against the database and the earlier accepted rows, in one sweep
+    index = ConflictIndex.load(
+        {e.date for _, e in candidates}, {e.tutor_id for _, e in candidates}, {e.room_id for _, e in candidates},
+    )
+    accepted = []
+    accepted_rows = {}
+    for i, event in candidates:
+        conflicts = index.check(event.date, event.start_time, event.end_time, event.tutor_id, event.room_id)
+        if conflicts:
+            errors = {}
+            if conflicts.tutor:
+                errors["tutor"] = "Tutor has a conflicting schedule."
+            if conflicts.room:
+                errors["room"] = "Room is already booked for that timeframe."
+            in_batch = [accepted_rows[c] for c in conflicts.tutor + conflicts.room if c in accepted_rows]
+            if in_batch:
+                errors["conflicting_rows"] = sorted(set(in_batch))
+            results[i] = {"row": i, "status": "error", "errors": errors}
+            continue
+        # negative placeholder ids keep batch rows apart from real event ids
+        placeholder = -(i + 1)
+        accepted_rows[placeholder] = i
+        index.add(event.date, event.start_time, event.end_time, event.tutor_id, event.room_id, placeholder)
+        accepted.append((i, event))
+
+    failed = sum(1 for r in results if r is not None)
+    if all_or_nothing and failed:
+        for i, _ in accepted:
+            results[i] = {"row": i, "status": "skipped"}
+        logger.info(f"bulk_create_events aborted: {failed} invalid rows")
+        return Response({"created": 0, "results": results}, status=400)
+
+    # 3. write everything in one transaction
+    events = [e for _, e in accepted]
+    if events:
+        # a failed transaction also drops its audit entries
+        with transaction.atomic(), audit.batch():
+            ScheduledEvent.objects.bulk_create(events, batch_size=1000)
+            for e in events:
+                audit.record(request.user, "createEvent", event=e)
+        # bulk_create bypasses save() and its signals
+        invalidate_after_bulk_write(events)
+        try:
+            notifications.notify(events, "created")
+        except Exception as e:
+            logger.exception(f"Failed to create notifications for bulk event creation: {e}")
+    for i, event in accepted:
+        results[i] = {"row": i, "status": "created", "id": event.id}
+
+    logger.info(f"bulk_create_events created {len(events)} events, {failed} rows rejected")
+    return Response({"created": len(events), "results": results}, status=201 if events else 400)
+
+
+SCHEDULER_MAX_RESTARTS = 64
+
+
+def _parse_flag(value):
+    """A boolean body field: JSON true/false, or "true"/"false"/"1"/"0" from a form; absent is False."""
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, str) and value.lower() in ("true", "1", "false", "0"):
+        return value.lower() in ("true", "1")
+    raise ValueError(value)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def schedule_term(request):
+    """Place the term's weekly lecture/lab hours (and optional exams) as conflict-free pending events.
+
+    Body: term_start, term_end (YYYY-MM-DD); optional exam_start, exam_end,
+    exam_minutes, courses (ids), restarts, workers (at most
+    settings.SCHEDULE_TERM_MAX_WORKERS), seed and dry_run (a boolean).
+    """
+    res = _require_role_or_404(request, ("academic_assistant", "administrator"))
+    if res:
+        return res
+
+    data = request.data
+    try:
+        term_start = datetime.date.fromisoformat(str(data.get("term_start")))
+        term_end = datetime.date.fromisoformat(str(data.get("term_end")))
+        exam_start = datetime.date.fromisoformat(str(data["exam_start"])) if data.get("exam_start") else None
+        exam_end = datetime.date.fromisoformat(str(data["exam_end"])) if data.get("exam_end") else None
+    except ValueError:
+        return Response({"detail": "term_start/term_end (and exam_start/exam_end) must be YYYY-MM-DD dates"}, status=400)
+    if term_end < term_start or (exam_start and exam_end and exam_end < exam_start):
+        return Response({"detail": "end dates must not be before start dates"}, status=400)
+    if bool(exam_start) != bool(exam_end):
+        return Response({"detail": "exam_start and exam_end go together"}, status=400)
+    try:
+        restarts = min(int(data.get("restarts", 8)), SCHEDULER_MAX_RESTARTS)
+        # each worker is a process started by this request: the deployment decides how many it may take
+        workers = min(int(data.get("workers", 1)), settings.SCHEDULE_TERM_MAX_WORKERS)
+        seed = int(data.get("seed", 0))
+        exam_minutes = int(data.get("exam_minutes", 120))
+        course_ids = [int(c) for c in data.get("courses") or []]
+    except (TypeError, ValueError):
+        return Response({"detail": "restarts, workers, seed, exam_minutes and courses must be integers"}, status=400)
+    if restarts < 1 or workers < 1 or exam_minutes < 5:
+        return Response({"detail": "restarts and workers must be positive, exam_minutes at least 5"}, status=400)
+    try:
+        dry_run = _parse_flag(data.get("dry_run"))
+    except ValueError:
+        return Response({"detail": "dry_run must be true or false"}, status=400)
+
+    def progress(done, total, best):
+        logger.info(f"schedule_term: {done}/{total} restarts, best places {len(best.placements)} sessions")
+
+    problem, skipped, best, seconds = scheduler.schedule_term(
+        term_start, term_end, restarts=restarts, workers=workers, seed=seed, progress=progress,
+        exam_start=exam_start, exam_end=exam_end, exam_minutes=exam_minutes, course_ids=course_ids,
+    )
+    plan = [scheduler.describe(problem, p) for p in best.placements]
+    unplaced = [
+        {"course": problem.sessions[i].course_id, "title": problem.sessions[i].title, "minutes": problem.sessions[i].minutes}
+        for i in best.unplaced
+    ]
+    payload = {
+        "sessions": len(problem.sessions), "placed": len(plan), "unplaced": unplaced, "skipped": skipped,
+        "restarts": restarts, "search_seconds": round(seconds, 3), "plan": plan, "created": 0,
+    }
+    if dry_run:
+        return Response(payload)
+
+    events, clashed = scheduler.commit(problem, best, request.user)
+    try:
+        notifications.notify(events, "created")
+    except Exception as e:
+        logger.exception(f"Failed to create notifications for term scheduling: {e}")
+    logger.info(f"schedule_term by {request.user} created {len(events)} events, {len(unplaced)} sessions unplaced")
+    payload["created"] = len(events)
+    payload["events"] = [e.id for e in events]
+    # placements taken by events written while the search ran
+    payload["clashed"] = clashed
+    return Response(payload, status=201 if events else 200)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def approve_event(request, event_id):
@@ -236,6 +478,16 @@ def approve_event(request, event_id):
         return res
 
     
+    # The slot must still be free (other events may have been approved since this one was requested)
+    # a change request is merged into its parent, so it takes the parent's repeat rule
+    series = event.related_event if (event.status == "request_change" and event.related_event) else event
+    res = _slot_conflict_response(
+        rule_dates(event.date, _recurrence_of(series)), event.start_time, event.end_time,
+        event.tutor_id, event.room_id, _change_request_family(event),
+    )
+    if res:
+        return res
+
     # Check if this is a Change Request approval (indicated by status='request_change' and having a related_event)
     if event.status == "request_change" and event.related_event:
         # Merge changes to parent
@@ -254,7 +506,7 @@ def approve_event(request, event_id):
         
         # Notify about the approval/merge
         try:
-            AuditLog.objects.create(user=request.user, action='approveEvent', event=parent)
+            audit.record(request.user, 'approveEvent', event=parent)
             _notify_related_users(parent, "updated (Change Request Approved)")
             logger.info(f"Change Request merged: child={event.id} -> parent={parent.id}")
         except Exception as e:
@@ -271,7 +523,7 @@ def approve_event(request, event_id):
 
     # Create audit log for event approval
     try:
-        AuditLog.objects.create(user=request.user, action='approveEvent', event=event)
+        audit.record(request.user, 'approveEvent', event=event)
         _notify_related_users(event, "approved")
         logger.info(f"Audit log created for event approval: event_id={event.id}, user={request.user.id}")
     except Exception as e:
@@ -297,7 +549,7 @@ def reject_event(request, event_id):
     event.save()
 
     try:
-        AuditLog.objects.create(user=request.user, action='rejectEvent', event=event)
+        audit.record(request.user, 'rejectEvent', event=event)
         _notify_related_users(event, "rejected")
     except Exception as e:
         logger.exception(f"Failed to create audit log/notification for rejection: {e}")
@@ -305,6 +557,59 @@ def reject_event(request, event_id):
     return Response({"message": "Event rejected"})
 
 
+def _edit_occurrence(request, series, occurrence_date, data, reset_status):
+    """Detach one occurrence of `series` as a single event carrying the edit.
+
+    The occurrence becomes an exception of the rule and the edited copy a new
+    event (dated `occurrence_date` unless the edit moves it); the series
+    anchor and its other occurrences are left alone.
+    """
+    if "recurrence" in data:
+        return Response({"recurrence": "The repeat rule belongs to the series: edit it with scope=series."}, status=400)
+    if series.status == "approved" and request.user.role not in ("administrator", "department_assistant"):
+        return Response({"scope": "Only DAA or administrators can change one occurrence of an approved series."}, status=400)
+    serializer = ScheduledEventSerializer(series, data=data, partial=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    changes = serializer.validated_data
+    tutor = changes.get("tutor", series.tutor)
+    room = changes.get("room", series.room)
+    detached = ScheduledEvent(
+        title=changes.get("title", series.title),
+        date=changes.get("date", occurrence_date),
+        start_time=changes.get("start_time", series.start_time),
+        end_time=changes.get("end_time", series.end_time),
+        course=changes.get("course", series.course),
+        tutor=tutor,
+        room=room,
+        event_type=changes.get("event_type", series.event_type),
+        notes=changes.get("notes", series.notes),
+        status="pending" if reset_status else series.status,
+    )
+    if detached.start_time >= detached.end_time:
+        return Response({"detail": "start_time must be before end_time."}, status=400)
+    # the occurrence's own slot is freed by the edit
+    res = _slot_conflict_response(
+        [detached.date], detached.start_time, detached.end_time,
+        tutor.id if tutor else None, room.id if room else None, _change_request_family(series),
+    )
+    if res:
+        return res
+
+    rule = series.recurrence
+    with transaction.atomic():
+        rule.exceptions = sorted(set(rule.exceptions) | {occurrence_date.isoformat()})
+        rule.save(update_fields=["exceptions"])
+        detached.save()
+
+    try:
+        audit.record(request.user, 'editEvent', event=detached)
+        _notify_related_users(detached, f"updated (was the {occurrence_date.isoformat()} occurrence of '{series.title}')")
+    except Exception as e:
+        logger.exception(f"Failed to create audit log/notification for occurrence edit: {e}")
+    return Response(ScheduledEventSerializer(ScheduledEvent.objects.with_related().get(pk=detached.pk)).data, status=201)
+
+
 # 2. AA / Owner - Edit or cancel pending event
 @api_view(["PUT"])
 @permission_classes([IsAuthenticated])
@@ -331,13 +636,44 @@ def edit_event(request, event_id):
 
     data = request.data.copy() if isinstance(request.data, dict) else dict(request.data)
     action = data.pop("action", None)
+    occurrence = data.pop("occurrence", None)
+    # a series is edited or cancelled as a whole ("series") or for one date ("occurrence");
+    # an occurrence date alone implies the latter
+    scope = data.pop("scope", None) or ("occurrence" if occurrence else None)
+    if scope not in (None, "series", "occurrence"):
+        return Response({"scope": "Expected series or occurrence."}, status=400)
+    if _recurrence_of(event) is not None and scope is None:
+        return Response({"scope": "Repeating event: pass scope=series, or scope=occurrence with its occurrence date."}, status=400)
+    occurrence_date = None
+    if scope == "occurrence":
+        rule = _recurrence_of(event)
+        try:
+            occurrence_date = datetime.date.fromisoformat(str(occurrence))
+        except ValueError:
+            return Response({"occurrence": "Invalid date format, expected YYYY-MM-DD."}, status=400)
+        if rule is None or not occurs_on(event.date, rule.frequency, rule.interval, rule.until, rule.exceptions, occurrence_date):
+            return Response({"occurrence": "Not an occurrence of this event."}, status=400)
+
+    if action == "cancel" and occurrence_date:
+        # cancel one occurrence of a series: record it as an exception of the rule
+        rule.exceptions = sorted(set(rule.exceptions) | {occurrence_date.isoformat()})
+        rule.save(update_fields=["exceptions"])
+
+        try:
+            audit.record(request.user, 'cancelEvent', event=event)
+            _notify_related_users(event, f"cancelled on {occurrence_date.isoformat()}")
+        except Exception as e:
+            logger.exception(f"Failed to create audit log/notification for occurrence cancel: {e}")
+
+        return Response({"message": "Occurrence cancelled"})
+
     if action == "cancel":
         # allow creator or AA/admin
         event.status = "cancelled"
         event.save()
         
         try:
-            AuditLog.objects.create(user=request.user, action='cancelEvent', event=event)
+            audit.record(request.user, 'cancelEvent', event=event)
             _notify_related_users(event, "cancelled")
         except Exception as e:
             logger.exception(f"Failed to create audit log/notification for cancel: {e}")
@@ -350,6 +686,9 @@ def edit_event(request, event_id):
     
     original_status = event.status
     should_reset_status = (is_owner and user_role == "tutor") or (user_role == "academic_assistant")
+
+    if occurrence_date:
+        return _edit_occurrence(request, event, occurrence_date, data, should_reset_status)
     
     if should_reset_status:
         event.status = "pending"
@@ -357,6 +696,38 @@ def edit_event(request, event_id):
     # helper for partial update
     serializer = ScheduledEventSerializer(event, data=data, partial=True)
     if serializer.is_valid():
+        new_data = serializer.validated_data
+
+        # optional new repeat rule ({...} to set, null to make it a single event)
+        current_rule = _recurrence_of(event)
+        rule_changed = "recurrence" in data
+        rule = current_rule
+        if rule_changed:
+            rule = None
+            if data["recurrence"]:
+                rec_serializer = EventRecurrenceSerializer(
+                    data=data["recurrence"], context={"anchor_date": new_data.get("date", event.date)},
+                )
+                if not rec_serializer.is_valid():
+                    return Response({"recurrence": rec_serializer.errors}, status=400)
+                rule = rec_serializer.validated_data
+
+        # Re-check double-booking only when the slot itself moves
+        slot_fields = ("date", "start_time", "end_time", "tutor", "room")
+        if rule_changed or any(f in new_data and new_data[f] != getattr(event, f) for f in slot_fields):
+            tutor = new_data.get("tutor", event.tutor)
+            room = new_data.get("room", event.room)
+            res = _slot_conflict_response(
+                rule_dates(new_data.get("date", event.date), rule),
+                new_data.get("start_time", event.start_time),
+                new_data.get("end_time", event.end_time),
+                tutor.id if tutor else None,
+                room.id if room else None,
+                _change_request_family(event),
+            )
+            if res:
+                return res
+
         # Check if we should create a Change Request instead of direct edit
         # If event is ALREADY approved, and user is NOT Admin/DAA (i.e. is Tutor or AA), or even if Admin wants to follow protocol?
         # User request: "For AA and tutor, upon editing approved events... make this a change request."
@@ -373,6 +744,9 @@ def edit_event(request, event_id):
             and user_role not in ("administrator", "department_assistant")
         )
 
+        if should_create_change_request and rule_changed:
+            return Response({"recurrence": "Only DAA or administrators can change the repeat rule of an approved event."}, status=400)
+
         if should_create_change_request:
             # Clone Approach: Create NEW event with status='request_change' linked to this one
             # copying fields from the serializer validated data + existing event data
@@ -415,7 +789,7 @@ def edit_event(request, event_id):
                 
                 # Notify/Log (Change Request Created)
                 try:
-                    AuditLog.objects.create(user=request.user, action='createEvent', event=new_serializer.instance) # Action could be 'createChangeRequest' but 'createEvent' works
+                    audit.record(request.user, 'createEvent', event=new_serializer.instance) # Action could be 'createChangeRequest' but 'createEvent' works
                     _notify_related_users(event, f"Change Request Created (ID: {new_serializer.instance.id})") # Notify on PARENT event context?
                 except Exception:
                     pass
@@ -425,17 +799,26 @@ def edit_event(request, event_id):
                 return Response(new_serializer.errors, status=400)
 
         # Standard edit path (for pending events)
-        serializer.save()
-        # if we forcibly changed status, save it (serializer might not if it's read-only)
-        if event.status == "pending":
-            event.save()
+        with transaction.atomic():
+            serializer.save()
+            # if we forcibly changed status, save it (serializer might not if it's read-only)
+            if event.status == "pending":
+                event.save()
+            if rule_changed:
+                if current_rule is not None:
+                    current_rule.delete()
+                if rule:
+                    EventRecurrence.objects.create(event=event, **rule)
         
         try:
-            AuditLog.objects.create(user=request.user, action='editEvent', event=event)
+            audit.record(request.user, 'editEvent', event=event)
             _notify_related_users(event, "updated")
         except Exception as e:
             logger.exception(f"Failed to create audit log/notification for edit: {e}")
 
+        if rule_changed:
+            # re-read so the response reflects the new (or removed) repeat rule
+            return Response(ScheduledEventSerializer(ScheduledEvent.objects.with_related().get(pk=event.pk)).data)
         return Response(serializer.data)
     return Response(serializer.errors, status=400)
 
@@ -443,6 +826,7 @@ def edit_event(request, event_id):
 # Public endpoints used by frontend
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@conditional_get(versioning.COURSES)
 def courses_list(request):
     qs = Course.objects.all().order_by("name")
     data = [{"id": c.id, "name": c.name} for c in qs]
@@ -451,6 +835,7 @@ def courses_list(request):
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@conditional_get(versioning.COURSES, versioning.TUTORS)
 def course_tutors(request, course_id):
     # Return tutors who teach the course (based on TutorProfile.courses)
     try:
@@ -466,6 +851,7 @@ def course_tutors(request, course_id):
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@conditional_get(versioning.TUTORS)
 def all_tutors(request):
     # Return ALL tutors
     tutors = User.objects.filter(role="tutor")
@@ -483,14 +869,17 @@ def tutor_schedules(request, tutor_id):
         d = datetime.date.fromisoformat(date_q)
     except Exception:
         return Response({"detail": "invalid date format"}, status=400)
-    events = ScheduledEvent.objects.filter(tutor_id=tutor_id, date=d)
+    events = ScheduledEvent.objects.exclude(status__in=INACTIVE_STATUSES)
     
     # Exclude logic for editing
     exclude_id = request.query_params.get("exclude")
     if exclude_id:
         events = events.exclude(id=exclude_id)
 
-    data = [{"start_time": e.start_time.strftime("%H:%M"), "end_time": e.end_time.strftime("%H:%M")} for e in events]
+    parts = (events.filter(tutor_id=tutor_id).singles_in_window(d, d), events.series_using(d, d, tutor_id=[tutor_id]))
+    windowed = itertools.chain.from_iterable(part.as_rows() for part in parts)
+    rows = sorted(expand_rows(windowed, d, d), key=event_key)
+    data = [{"start_time": e["start_time"].strftime("%H:%M"), "end_time": e["end_time"].strftime("%H:%M")} for e in rows]
     return Response(data)
 
 
@@ -510,51 +899,252 @@ def rooms_available(request):
         return Response({"detail": "invalid date/time format"}, status=400)
     if not s or not e:
         return Response({"detail": "invalid time format, expected HH:MM"}, status=400)
-    # rooms that do NOT have any events overlapping
-    busy_qs = ScheduledEvent.objects.filter(date=d).filter(~Q(end_time__lte=s) & ~Q(start_time__gte=e))
-    
+    # rooms that do NOT have any events overlapping, from the day's cached occupancy bitmaps
     # Exclude logic for editing
+    exclude_ids = ()
     exclude_id = request.query_params.get("exclude")
     if exclude_id:
-        busy_qs = busy_qs.exclude(id=exclude_id)
-        
-    busy_rooms = busy_qs.values_list('room', flat=True)
-    qs = Room.objects.exclude(id__in=list(busy_rooms))
+        try:
+            exclude_ids = (int(exclude_id),)
+        except ValueError:
+            return Response({"detail": "invalid exclude id"}, status=400)
+
+    busy_rooms = day_occupancy(d).busy_rooms(s, e, exclude_ids)
+    qs = Room.objects.exclude(id__in=busy_rooms)
     data = [{"id": r.id, "name": r.name} for r in qs]
     return Response(data)
 
 
+FREE_SLOTS_MAX_DAYS = 200
+FREE_SLOTS_PAGE_SIZE = 20
+FREE_SLOTS_MAX_PAGE_SIZE = 200
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+def free_slots(request):
+    """Ranked slots where a course's tutor, its major/year cohort and at least one room are all free.
+
+    Query params: course, tutor, duration (minutes), start, end (YYYY-MM-DD),
+    optional step (minutes between candidate starts, default 15),
+    day_start / day_end (HH:MM), weekends (true to include them) and limit.
+    """
+    res = _require_role_or_404(request, STAFF_ROLES)
+    if res:
+        return res
+
+    params = request.query_params
+    missing = [p for p in ("course", "tutor", "duration", "start", "end") if not params.get(p)]
+    if missing:
+        return Response({"detail": f"{', '.join(missing)} query param(s) required"}, status=400)
+    try:
+        start = datetime.date.fromisoformat(params["start"])
+        end = datetime.date.fromisoformat(params["end"])
+    except ValueError:
+        return Response({"detail": "invalid date format, expected YYYY-MM-DD"}, status=400)
+    if end < start or (end - start).days >= FREE_SLOTS_MAX_DAYS:
+        return Response({"detail": f"end must be on or after start, at most {FREE_SLOTS_MAX_DAYS} days later"}, status=400)
+    day_start = _parse_time(params["day_start"]) if params.get("day_start") else DAY_START
+    day_end = _parse_time(params["day_end"]) if params.get("day_end") else DAY_END
+    if not day_start or not day_end or day_start >= day_end:
+        return Response({"detail": "invalid day_start/day_end, expected HH:MM with day_start before day_end"}, status=400)
+    try:
+        tutor_id = int(params["tutor"])
+        duration = int(params["duration"])
+        step = int(params.get("step") or 15)
+        limit = parse_limit(params.get("limit"), FREE_SLOTS_PAGE_SIZE, FREE_SLOTS_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({"detail": "tutor, duration, step and limit must be integers"}, status=400)
+    if duration < 5 or step < 5:
+        return Response({"detail": "duration and step must be at least 5 minutes"}, status=400)
+
+    try:
+        course = Course.objects.get(pk=params["course"])
+    except (Course.DoesNotExist, ValueError):
+        return Response({"course": "Course not found."}, status=400)
+    if not User.objects.filter(pk=tutor_id, role="tutor").exists():
+        return Response({"tutor": "Tutor not found."}, status=400)
+
+    slots = find_free_slots(
+        course, tutor_id, duration, start, end, limit=limit, step=step,
+        day_start=day_start, day_end=day_end,
+        include_weekends=params.get("weekends", "").lower() in ("1", "true"),
+    )
+    return Response(slots)
+
+
+def _event_visibility(user):
+    """Q restricting the events `user` may see, or None when they see every event."""
+    if user.role != "student":
+        return None
+    cohort = timetables.student_cohort(user.pk)
+    if cohort == timetables.NO_PROFILE:
+        logger.warning(f"No student profile found for user {user}")
+        # If no profile, return no events for safety
+        return Q(pk__in=[])
+    if cohort:
+        return Q(course__major_id=cohort[0], course__year=cohort[1])
+    return None
+
+
+EVENTS_PAGE_SIZE = 500
+EVENTS_MAX_PAGE_SIZE = 2000
+EVENT_CURSOR_FIELDS = ("date", "start_time", "id")
+EVENT_CURSOR_PARSERS = (datetime.date.fromisoformat, datetime.time.fromisoformat, int)
+
+
+def _timetable_page(rows, start, end, after, limit):
+    """The page of serialized, sorted timetable rows the query path would return, and its next cursor."""
+    # serialized dates and times are ISO strings, which sort like the values
+    start, end = start and start.isoformat(), end and end.isoformat()
+    after = after and (after[0].isoformat(), after[1].isoformat(), after[2])
+    selected = (
+        r for r in rows
+        if (start is None or r["date"] >= start) and (end is None or r["date"] <= end)
+        and (after is None or (r["date"], r["start_time"], r["id"]) > after)
+    )
+    page = list(itertools.islice(selected, limit + 1))
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    last = page[-1]
+    return page, encode_cursor([last["date"], last["start_time"], last["id"]])
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@conditional_get(versioning.EVENTS, versioning.COURSES, versioning.ROOMS, versioning.TUTORS, versioning.STUDENTS, per_user=True)
 def scheduledevents_list(request):
-    """Return scheduled events filtered by user's role and profile."""
+    """Return scheduled events filtered by user's role and profile.
+
+    Optional query params:
+      - start, end (YYYY-MM-DD): only return events inside this date window (inclusive)
+      - cursor: opaque cursor returned as `next_cursor` by the previous page
+      - limit: page size (default 500, max 2000)
+
+    Without any of these the full list is returned as a plain array (legacy
+    behaviour). With any of them the response is paginated by keyset on
+    (date, start_time, id): {"results": [...], "next_cursor": "..." | null}.
+    A student's list, windowed and paged or not, is cut from their cohort's
+    cached timetable (calendar_app.timetables).
+
+    Responses carry an ETag; a matching If-None-Match gets 304 without
+    touching the events table.
+    """
     user = request.user
     logger.info(f"scheduledevents_list called by user: {user}, authenticated: {user.is_authenticated}, role: {getattr(user, 'role', None)}")
     
     # Base queryset
-    qs = ScheduledEvent.objects.all().order_by('date', 'start_time')
+    qs = ScheduledEvent.objects.order_by(*EVENT_CURSOR_FIELDS)
     
-    # If user is a student, filter by their major and year
-    if user.role == "student":
-        try:
-            student_profile = StudentProfile.objects.get(user=user)
-            logger.info(f"Student profile found: major={student_profile.major}, year={student_profile.year}")
-            if student_profile.major and student_profile.year:
-                qs = qs.filter(
-                    course__major=student_profile.major,
-                    course__year=student_profile.year
-                )
-                logger.info(f"Filtered events for student: {qs.count()} events")
-        except StudentProfile.DoesNotExist:
-            logger.warning(f"No student profile found for user {user}")
-            # If no profile, return no events for safety
-            qs = qs.none()
+    # Students only see their major and year; all other roles see every event
+    visible = _event_visibility(user)
+    if visible is not None:
+        qs = qs.filter(visible)
     
-    # For all other roles (tutor, academic_assistant, department_assistant, administrator), return all events
-    logger.info(f"Returning {qs.count()} events for user {user}")
-    
-    serializer = ScheduledEventSerializer(qs, many=True)
-    return Response(serializer.data)
+    params = request.query_params
+    paginated = any(params.get(k) for k in ("start", "end", "cursor", "limit"))
+    cohort = timetables.student_cohort(user.pk) if user.role == "student" else None
+    if cohort == timetables.NO_PROFILE:
+        cohort = None
+    if not paginated:
+        if cohort:
+            # the whole cohort shares one prebuilt timetable
+            return Response(timetables.cohort_timetable(*cohort))
+        rows = sorted(expand_rows(qs.as_rows()), key=event_key)
+        serializer = ScheduledEventRowSerializer(rows, many=True)
+        return Response(serializer.data)
+
+    try:
+        start = datetime.date.fromisoformat(params["start"]) if params.get("start") else None
+        end = datetime.date.fromisoformat(params["end"]) if params.get("end") else None
+    except ValueError:
+        return Response({"detail": "Invalid date format, expected YYYY-MM-DD."}, status=400)
+    try:
+        limit = parse_limit(params.get("limit"), EVENTS_PAGE_SIZE, EVENTS_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({"detail": "limit must be a positive integer."}, status=400)
+    after = None
+    if params.get("cursor"):
+        try:
+            after = decode_cursor(params["cursor"], EVENT_CURSOR_PARSERS)
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+    if cohort:
+        # windows and pages of a student calendar are cut from the cohort's cached timetable
+        page, next_cursor = _timetable_page(timetables.cohort_timetable(*cohort), start, end, after, limit)
+        return Response({"results": page, "next_cursor": next_cursor})
+
+    # Single events page straight off the index; fetch one extra row to know whether another page exists
+    singles = qs.singles_in_window(start, end)
+    if after:
+        singles = singles.filter(keyset_q(EVENT_CURSOR_FIELDS, after))
+    single_rows = list(singles.as_rows()[:limit + 1])
+    # Series are one row each: expand only the occurrences inside the window and past the cursor
+    lower = max(start, after[0]) if (start and after) else (start or (after[0] if after else None))
+    occurrences = sorted(
+        (r for r in expand_rows(qs.series_in_window(lower, end).as_rows(), lower, end)
+         if after is None or event_key(r) > after),
+        key=event_key,
+    )
+    page = list(itertools.islice(heapq.merge(single_rows, occurrences, key=event_key), limit + 1))
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        last = page[-1]
+        next_cursor = encode_cursor([last["date"], last["start_time"], last["id"]])
+    logger.info(f"Returning {len(page)} events for user {user} (next_cursor={next_cursor})")
+
+    serializer = ScheduledEventRowSerializer(page, many=True)
+    return Response({"results": serializer.data, "next_cursor": next_cursor})
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def scheduledevents_changes(request):
+    """Events inserted, updated or deleted since `since`, for incremental calendar refreshes.
+
+    Query params:
+      - since: the `cursor` returned by the previous call; omit it for a full sync
+      - limit: page size (default 500, max 2000)
+
+    Response: {"created": [...], "updated": [...], "deleted": [ids], "cursor": "...", "has_more": bool}.
+    Rows have the events list's shape but series are not expanded; keep
+    calling with the new cursor while has_more is true. A cursor older than
+    the tombstone retention window gets 410 and the client must resync.
+    """
+    user = request.user
+    params = request.query_params
+    try:
+        limit = parse_limit(params.get("limit"), EVENTS_PAGE_SIZE, EVENTS_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({"detail": "limit must be a positive integer."}, status=400)
+    cursor = None
+    if params.get("since"):
+        try:
+            cursor = sync.decode_sync_cursor(params["since"])
+        except sync.CursorExpired as e:
+            return Response({"detail": str(e)}, status=410)
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+
+    # a student is also told about events that left their own cohort
+    cohort = timetables.student_cohort(user.pk) if user.role == "student" else None
+    if cohort == timetables.NO_PROFILE:
+        cohort = None
+    result = sync.changes(ScheduledEvent.objects.all(), limit, cursor, visible=_event_visibility(user), cohort=cohort)
+    logger.info(
+        f"scheduledevents_changes for {user}: {len(result['created'])} created, {len(result['updated'])} updated, "
+        f"{len(result['deleted'])} deleted (has_more={result['has_more']})"
+    )
+    return Response({
+        "created": ScheduledEventRowSerializer(result["created"], many=True).data,
+        "updated": ScheduledEventRowSerializer(result["updated"], many=True).data,
+        "deleted": result["deleted"],
+        "cursor": result["cursor"],
+        "has_more": result["has_more"],
+    })
 
 
 @api_view(["GET"])
@@ -565,14 +1155,97 @@ def events_fallback(request):
 
 
 import csv
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_HEADER = ["Subject", "Start Date", "Start Time", "End Date", "End Time", "All Day Event", "Description", "Location"]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _export_occurrences(start_date, end_date):
+    """Approved events in [start_date, end_date] as rows, one per occurrence, in (date, start_time, id) order.
+
+    Single events are streamed off the (status, date, start_time) index in
+    chunks; each series is expanded lazily and merged in, so memory holds one
+    chunk plus one row per series whatever the range.
+    """
+    approved = ScheduledEvent.objects.filter(status="approved")
+    singles = (
+        approved.singles_in_window(start_date, end_date).order_by(*EVENT_CURSOR_FIELDS)
+        .as_rows().iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    series = approved.series_in_window(start_date, end_date).as_rows()
+    occurrences = heapq.merge(*(expand_rows([row], start_date, end_date) for row in series), key=event_key)
+    return heapq.merge(singles, occurrences, key=event_key)
+
+
+def _export_lines(start_date, end_date):
+    writer = csv.writer(_Echo())
+    # Google Calendar CSV headers: Subject, Start Date, Start Time, End Date, End Time, All Day Event, Description, Location, Private
+    yield writer.writerow(EXPORT_HEADER)
+
+    for row in _export_occurrences(start_date, end_date):
+        # Subject: Course name - Title (Type)
+        subject = f"{row['course_name']} - {row['title']} ({row['event_type']})"
+
+        # Date: DD/MM/YYYY
+        s_date = row["date"].strftime("%d/%m/%Y")
+
+        # Time: HH:MM
+        s_time = row["start_time"].strftime("%H:%M")
+        e_time = row["end_time"].strftime("%H:%M")
+
+        tutor_name = row["tutor_username"] or "TBD"
+        description = f"Tutor: {tutor_name}"
+
+        location = row["room_name"] or "TBD"
+
+        yield writer.writerow([
+            subject,
+            s_date,
+            s_time,
+            s_date,
+            e_time,
+            "False",
+            description,
+            location
+        ])
+
+
+async def _async_lines(lines):
+    """`lines` as an async iterator, for ASGI servers.
+
+    Given a sync iterator, Django's ASGI handler reads it to the end before
+    sending anything. Here blocks of up to EXPORT_CHUNK_SIZE lines are
+    produced in the sync thread (where the database cursor lives) and sent as
+    they are ready.
+    """
+    next_block = sync_to_async(lambda: "".join(itertools.islice(lines, EXPORT_CHUNK_SIZE)))
+    try:
+        while block := await next_block():
+            yield block
+    finally:
+        await sync_to_async(lines.close)()
+
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def export_calendar(request):
     """
-    Export events to CSV for Google Calendar import.
+    Export approved events to CSV for Google Calendar import.
     Query params: start (YYYY-MM-DD), end (YYYY-MM-DD)
+
+    The file is streamed: the header goes out before the first query runs and
+    events are read in chunks, so multi-year ranges start downloading at once
+    and memory stays flat. Under ASGI the lines are served as an async
+    iterator (see _async_lines), so the stream isn't buffered there either.
     """
     start_q = request.query_params.get("start")
     end_q = request.query_params.get("end")
@@ -586,72 +1259,220 @@ def export_calendar(request):
     except ValueError:
         return Response({"detail": "Invalid date format"}, status=400)
 
-    # Filter events
-    events = ScheduledEvent.objects.filter(
-        date__range=[start_date, end_date],
-        status="approved" # Only approved events? Or pending too? User said "export calendar", implying the official one. Let's do approved + pending if user is owner?
-        # For simplicity and "Google Calendar" usage, usually means what I see on the calendar.
-        # Let's export ALL events for now, or maybe just approved.
-        # User didn't specify status. "Export calendar" usually implies the public/visible one.
-        # Re-reading: "Output should be a csv file to import to a google calendar"
-        # Let's export all non-rejected/cancelled logic effectively?
-        # The public list returns ALL events. Let's stick to that matching 'scheduledevents_list' which returns all.
-        # Wait, 'scheduledevents_list' returns all.
-        # But 'export' usually implies personal agenda?
-        # The prompt says "user be able to export calendar".
-        # Let's filter by status='approved' to be safe, creating a clean calendar.
-    ).filter(status='approved').order_by('date', 'start_time')
-
-    # Create response
-    response = HttpResponse(
+    logger.info(f"export_calendar streaming {start_date}..{end_date} for {request.user}")
+    lines = _export_lines(start_date, end_date)
+    if isinstance(request._request, ASGIRequest):
+        lines = _async_lines(lines)
+    return StreamingHttpResponse(
+        lines,
         content_type="text/csv",
         headers={"Content-Disposition": 'attachment; filename="calendar_export.csv"'},
     )
 
-    writer = csv.writer(response)
-    # Google Calendar CSV headers: Subject, Start Date, Start Time, End Date, End Time, All Day Event, Description, Location, Private
-    writer.writerow(["Subject", "Start Date", "Start Time", "End Date", "End Time", "All Day Event", "Description", "Location"])
 
-    for event in events:
-        # Subject: Course name - Title (Type)
-        subject = f"{event.course.name} - {event.title} ({event.event_type})"
-        
-        # Date: DD/MM/YYYY
-        s_date = event.date.strftime("%d/%m/%Y")
-        
-        # Time: HH:MM
-        s_time = event.start_time.strftime("%H:%M")
-        e_time = event.end_time.strftime("%H:%M")
-        
-        tutor_name = event.tutor.username if event.tutor else "TBD"
-        description = f"Tutor: {tutor_name}"
-        # Removed event.notes as it is not in the model
-        
-        location = event.room.name if event.room else "TBD"
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def calendar_feed_token(request):
+    """The caller's iCalendar subscription URL. GET returns it (creating it on first use); POST rotates the token."""
+    if request.method == "POST":
+        token = feeds.rotate_token(request.user)
+        logger.info(f"Calendar feed token rotated for {request.user}")
+    else:
+        token = feeds.token_for(request.user)
+    url = request.build_absolute_uri(f"/api/calendar/feeds/{token}.ics")
+    return Response({"token": token, "url": url})
 
-        writer.writerow([
-            subject,
-            s_date,
-            s_time,
-            s_date, 
-            e_time,
-            "False",
-            description,
-            location
-        ])
 
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def calendar_feed(request, token):
+    """iCalendar feed for subscription clients; the token in the URL is the credential.
+
+    Served from the rendered file of the token owner's audience (calendar_app.feeds),
+    with an ETag so polling clients mostly get 304.
+    """
+    audience = feeds.audience_for_token(token)
+    if audience is None:
+        return Response({"detail": "Not found."}, status=404)
+    path, version = feeds.feed_file(audience)
+    etag = quote_etag(version)
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, "rb"), content_type="text/calendar; charset=utf-8")
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
     return response
 
 
+AUDIT_PAGE_SIZE = 100
+AUDIT_MAX_PAGE_SIZE = 1000
+AUDIT_CURSOR_FIELDS = ("timestamp", "id")
+AUDIT_CURSOR_PARSERS = (datetime.datetime.fromisoformat, int)
+
+
+def _parse_instant(value):
+    """(aware datetime, whether it was a bare date) for an ISO date or datetime param; UTC unless given."""
+    if len(value) == 10:
+        return datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time.min, datetime.timezone.utc), True
+    # parse_datetime, unlike fromisoformat before 3.11, accepts the "...Z" the API renders
+    instant = parse_datetime(value)
+    if instant is None:
+        raise ValueError(f"not an ISO datetime: {value!r}")
+    return (instant if instant.tzinfo else instant.replace(tzinfo=datetime.timezone.utc)), False
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_audit_logs(request):
+    """Audit log entries, newest first. Administrators only.
+
+    Optional query params:
+      - action: one action or a comma-separated list (e.g. approveEvent,rejectEvent)
+      - user: id of the user who acted
+      - start, end: ISO date or datetime (UTC unless given); a date `end` includes that day
+      - cursor: opaque cursor returned as `next_cursor` by the previous page
+      - limit: page size (default 100, max 1000)
+
+    Without any of these the latest 100 entries are returned as a plain array
+    (legacy behaviour). With any of them the response is paginated by keyset
+    on (timestamp, id): {"results": [...], "next_cursor": "..." | null}.
+    Every page is one query; pages that reach back into archived months also
+    read the monthly archive files (calendar_app.audit_archive).
+    """
     # Only administrators can view audit logs
     if request.user.role != "administrator":
         return Response({"detail": "Not found."}, status=404)
-    logs = AuditLog.objects.all().order_by("-timestamp")
-    serializer = AuditLogSerializer(logs, many=True)
-    return Response(serializer.data)
+
+    params = request.query_params
+    paginated = any(params.get(k) for k in ("action", "user", "start", "end", "cursor", "limit"))
+    try:
+        limit = parse_limit(params.get("limit"), AUDIT_PAGE_SIZE, AUDIT_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({"detail": "limit must be a positive integer."}, status=400)
+
+    qs = AuditLog.objects.with_related().order_by("-timestamp", "-id")
+    actions = user_id = since = before = after = None
+    if params.get("action"):
+        actions = [a.strip() for a in params["action"].split(",") if a.strip()]
+        qs = qs.filter(action__in=actions)
+    if params.get("user"):
+        try:
+            user_id = int(params["user"])
+        except ValueError:
+            return Response({"detail": "user must be a user id."}, status=400)
+        qs = qs.filter(user_id=user_id)
+    try:
+        if params.get("start"):
+            since = _parse_instant(params["start"])[0]
+            qs = qs.filter(timestamp__gte=since)
+        if params.get("end"):
+            end, whole_day = _parse_instant(params["end"])
+            # an exclusive bound; timestamps have microsecond precision
+            before = end + (datetime.timedelta(days=1) if whole_day else datetime.timedelta(microseconds=1))
+            qs = qs.filter(timestamp__lt=before)
+    except ValueError:
+        return Response({"detail": "Invalid start/end, expected an ISO date or datetime."}, status=400)
+    if params.get("cursor"):
+        try:
+            after = decode_cursor(params["cursor"], AUDIT_CURSOR_PARSERS)
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+        qs = qs.filter(keyset_q(AUDIT_CURSOR_FIELDS, after, descending=True))
+
+    # one extra row tells whether another page exists
+    logs = list(qs[:limit + 1])
+    page = [((log.timestamp, log.id), row) for log, row in zip(logs, AuditLogSerializer(logs, many=True).data)]
+    # older months live in the archive (calendar_app.audit_archive): read it
+    # only when this page reaches back past the newest archived month
+    horizon = audit_archive.horizon()
+    if horizon is not None and (len(logs) <= limit or logs[-1].timestamp < horizon):
+        archived = audit_archive.search(limit + 1, actions=actions, user_id=user_id, start=since, before=before, after=after)
+        page = sorted(page + archived, key=lambda item: item[0], reverse=True)[:limit + 1]
+
+    data = [{field: row[field] for field in AuditLogSerializer.Meta.fields} for _, row in page[:limit]]
+    if not paginated:
+        return Response(data)
+
+    next_cursor = None
+    if len(page) > limit:
+        next_cursor = encode_cursor(list(page[limit - 1][0]))
+    return Response({"results": data, "next_cursor": next_cursor})
+
+
+AUDIT_STATS_DEFAULT_DAYS = 30
+AUDIT_STATS_MAX_DAYS = 3 * 366
+AUDIT_STATS_GROUPS = ("action", "user")
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_audit_stats(request):
+    """Audit entries per day, for dashboard histograms. Administrators only.
+
+    Optional query params:
+      - start, end: ISO dates, inclusive (default: the last 30 days; at most 3 years)
+      - action: one action or a comma-separated list
+      - user: id of the user who acted
+      - group_by: "action", "user" or "action,user" to split each day's count
+
+    Response: {"start", "end", "group_by": [...], "total": n, "results":
+    [{"day", "action"?, "user"?, "user_email"?, "count"}]}, by day; days and
+    groups without entries are left out. Counts come from the daily rollup
+    (calendar_app.audit), so the cost follows the number of days, not of
+    entries, and includes archived entries.
+    """
+    if request.user.role != "administrator":
+        return Response({"detail": "Not found."}, status=404)
+
+    params = request.query_params
+    try:
+        end = datetime.date.fromisoformat(params["end"]) if params.get("end") else timezone.localdate()
+        start = datetime.date.fromisoformat(params["start"]) if params.get("start") else end - datetime.timedelta(days=AUDIT_STATS_DEFAULT_DAYS - 1)
+    except ValueError:
+        return Response({"detail": "Invalid start/end, expected YYYY-MM-DD."}, status=400)
+    if start > end:
+        return Response({"detail": "start must not be after end."}, status=400)
+    if (end - start).days >= AUDIT_STATS_MAX_DAYS:
+        return Response({"detail": f"The range can span at most {AUDIT_STATS_MAX_DAYS} days."}, status=400)
+    group_by = [g.strip() for g in params.get("group_by", "").split(",") if g.strip()]
+    if any(g not in AUDIT_STATS_GROUPS for g in group_by):
+        return Response({"detail": f"group_by must be a comma-separated subset of {', '.join(AUDIT_STATS_GROUPS)}."}, status=400)
+    group_by = [g for g in AUDIT_STATS_GROUPS if g in group_by]
+    actions = [a.strip() for a in params.get("action", "").split(",") if a.strip()]
+    user_id = None
+    if params.get("user"):
+        try:
+            user_id = int(params["user"])
+        except ValueError:
+            return Response({"detail": "user must be a user id."}, status=400)
+
+    rows = audit.daily_counts(start, end, actions=actions, user_id=user_id, group_by=group_by)
+    emails = {}
+    if "user" in group_by:
+        users = get_user_model().objects.filter(id__in={r["user_id"] for r in rows}).values_list("id", "email", "username")
+        emails = {pk: email or username for pk, email, username in users}
+    results = []
+    for r in rows:
+        item = {"day": r["day"].isoformat()}
+        if "action" in group_by:
+            item["action"] = r["action"]
+        if "user" in group_by:
+            item["user"] = r["user_id"]
+            item["user_email"] = emails.get(r["user_id"])
+        item["count"] = r["total"]
+        results.append(item)
+    return Response({
+        "start": start.isoformat(), "end": end.isoformat(), "group_by": group_by,
+        "total": sum(item["count"] for item in results), "results": results,
+    })
+
+
+NOTIFICATIONS_PAGE_SIZE = 50
+NOTIFICATIONS_MAX_PAGE_SIZE = 200
+NOTIFICATION_CURSOR_FIELDS = ("created_at", "id")
+NOTIFICATION_CURSOR_PARSERS = (datetime.datetime.fromisoformat, int)
 
 
 @api_view(["GET"])
@@ -660,21 +1481,123 @@ def get_notifications(request):
     """
     Returns readonly list of notifications for the current user.
     Ordered by most recent first.
+
+    Optional query params:
+      - cursor: opaque cursor returned as `next_cursor` by the previous page
+      - limit: page size (default 50, max 200)
+
+    Without them the latest 50 are returned as a plain array (legacy
+    behaviour). With either the response is paginated by keyset on
+    (created_at, id), newest first: {"results": [...], "next_cursor": "..." | null}.
     """
+    params = request.query_params
+    paginated = any(params.get(k) for k in ("cursor", "limit"))
     try:
-        # Fetch notifications
-        notifs = Notification.objects.filter(user=request.user).order_by('-created_at')[:50] # Limit to 50 for now
-        
-        data = []
-        for n in notifs:
-            data.append({
-                "id": n.id,
-                "message": n.message,
-                "is_read": n.is_read,
-                "created_at": n.created_at.isoformat(),
-            })
-            
-        return Response(data, status=200)
+        limit = parse_limit(params.get("limit"), NOTIFICATIONS_PAGE_SIZE, NOTIFICATIONS_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({"detail": "limit must be a positive integer."}, status=400)
+
+    qs = notifications.for_user(request.user).order_by("-created_at", "-id")
+    if params.get("cursor"):
+        try:
+            after = decode_cursor(params["cursor"], NOTIFICATION_CURSOR_PARSERS)
+        except InvalidCursor as e:
+            return Response({"detail": str(e)}, status=400)
+        qs = qs.filter(keyset_q(NOTIFICATION_CURSOR_FIELDS, after, descending=True))
+
+    try:
+        # Fetch one extra row to know whether another page exists
+        notifs = list(qs[:limit + 1])
     except Exception as e:
         logger.error(f"Error fetching notifications for user {request.user.id}: {e}")
         return Response({"detail": "Error fetching notifications"}, status=500)
+
+    data = []
+    for n in notifs[:limit]:
+        data.append({
+            "id": n.id,
+            "message": n.message,
+            "is_read": n.is_read,
+            "created_at": n.created_at.isoformat(),
+        })
+    if not paginated:
+        return Response(data, status=200)
+
+    next_cursor = None
+    if len(notifs) > limit:
+        last = notifs[limit - 1]
+        next_cursor = encode_cursor([last.created_at, last.id])
+    return Response({"results": data, "next_cursor": next_cursor}, status=200)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def notifications_unread_count(request):
+    """Number of unread notifications of the current user, for the badge: {"unread": n}."""
+    return Response({"unread": notifications.unread_count(request.user)})
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def notifications_mark_read(request):
+    """Mark notifications of the current user as read.
+
+    Body: {"ids": [...]} for those notifications, or {"all": true} for
+    everything received so far. Response: {"marked": n, "unread": n}; `marked`
+    is omitted for "all".
+    """
+    data = request.data
+    if data.get("all") is True:
+        notifications.mark_all_read(request.user)
+        logger.info(f"User {request.user.id} marked all notifications read")
+        return Response({"unread": 0})
+
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return Response({"detail": "Provide 'ids' (a non-empty list of notification ids) or 'all': true."}, status=400)
+    marked = notifications.mark_read(request.user, ids)
+    return Response({"marked": marked, "unread": notifications.unread_count(request.user)})
+
+
+def _stream_user(request):
+    """User of a JWT access token sent as a Bearer header or, for EventSource (which cannot set headers), `?token=`."""
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw = auth.get_raw_token(header) if header else request.GET.get("token")
+    if not raw:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def notifications_stream(request):
+    """Server-Sent Events stream of the current user's new notifications (calendar_app.push).
+
+    A plain async Django view (DRF views are synchronous), served only under
+    ASGI, where an open stream holds no thread. Each event is
+    `event: notification` with the notifications list's item as JSON data and
+    the notification id as the event id; on reconnect the browser's
+    Last-Event-ID header replays what was missed. `event: resync` asks the
+    client to refetch the list.
+    """
+    if request.method != "GET":
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Notification streaming requires an ASGI server."}, status=501)
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    last_event_id = request.headers.get("Last-Event-ID")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    logger.info(f"Notification stream opened for user {user.id}")
+    response = StreamingHttpResponse(push.stream(user, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # keep reverse proxies from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,367 @@
+"""Streaming, set-based student import, used by StudentImportView.
+
+`read_sheet(upload)` yields the rows of an uploaded .xlsx (openpyxl in
+read-only mode) or .csv file as they are read, and
+`import_students(header, rows)` consumes them CHUNK_SIZE rows at a time, so
+memory depends on the chunk size, not on the size of the file. For each
+chunk:
+
+  1. parse: rows are checked and their dob parsed; bad rows become errors;
+  2. lookup: the chunk's student ids, emails and usernames that already exist
+     (earlier chunks included) are read with two queries, instead of a few
+     queries per row;
+  3. majors: names are resolved from a {name: id} map loaded once per
+     import, and the missing ones are created together;
+  4. hash: passwords are hashed in the importing process, or in a process
+     pool shared by the chunks when STUDENT_IMPORT_WORKERS or the caller's
+     `workers` asks for more than one (PBKDF2 is the bulk of the cost: a few
+     hundred milliseconds a password);
+  5. write: Users and StudentProfiles are inserted with bulk_create in the
+     chunk's own transaction.
+
+What became of each row goes to an ImportReport. bulk_create sends no
+post_save, so the version scopes the signals would bump are bumped here.
+Each new student's password is their student id followed by their dob as
+ddmmyy.
+"""
+import contextlib
+import csv
+import io
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from calendar_app import versioning
+from calendar_app.models import Major
+
+from .models import StudentProfile
+
+logger = logging.getLogger(__name__)
+
+# rows read, checked, hashed and written at a time; memory is bounded by this, not the file
+CHUNK_SIZE = 1000
+INSERT_BATCH_SIZE = 1000
+# below this many passwords a process pool costs more than it saves
+POOL_MIN_PASSWORDS = 64
+
+DOB_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y")
+
+COLUMNS = {
+	"name": ["name", "full name", "student name", "student_name"],
+	"dob": ["dob", "date of birth", "birthdate", "date of birth (yyyy-mm-dd)"],
+	"email": ["email", "student email", "student_email", "email address"],
+	"student_id": ["student id", "student_id", "studentid", "id"],
+	"major": ["major", "department", "faculty"],
+}
+REQUIRED = {
+	"name": "name / student name",
+	"dob": "dob / date of birth",
+	"email": "email / student email",
+	"student_id": "student id",
+}
+
+
+class UnreadableFile(ValueError):
+	pass
+
+
+class MissingColumns(ValueError):
+	def __init__(self, missing):
+		super().__init__(f"Missing required columns in Excel header: {', '.join(missing)}")
+		self.missing = missing
+
+
+def normalize(s):
+	"""Header text lowercased, with punctuation and runs of spaces collapsed to one space."""
+	if s is None:
+		return ""
+	s = str(s).strip().lower()
+	s = re.sub(r"[^0-9a-z]+", " ", s)
+	return re.sub(r"\s+", " ", s).strip()
+
+
+def find_columns(header):
+	"""{field: column index} for the header row; raises MissingColumns when a required one isn't there."""
+	headers = [normalize(h) for h in header]
+	columns = {}
+	for field, names in COLUMNS.items():
+		wanted = {normalize(n) for n in names}
+		columns[field] = next((i for i, h in enumerate(headers) if h in wanted), None)
+	missing = [label for field, label in REQUIRED.items() if columns[field] is None]
+	if missing:
+		raise MissingColumns(missing)
+	return columns
+
+
+def parse_dob(value):
+	if isinstance(value, datetime):
+		return value.date()
+	if isinstance(value, date):
+		return value
+	for fmt in DOB_FORMATS:
+		try:
+			return datetime.strptime(str(value).strip(), fmt).date()
+		except ValueError:
+			continue
+	raise ValueError(f"Could not parse dob '{value}'")
+
+
+def _cell(row, col):
+	return row[col] if col is not None and col < len(row) else None
+
+
+def hash_passwords(passwords, workers=None, pool=None):
+	"""make_password() of each password, in `pool` or in `workers` new processes (default: STUDENT_IMPORT_WORKERS)."""
+	if pool is None:
+		workers = _workers(workers)
+		if workers <= 1 or len(passwords) < POOL_MIN_PASSWORDS:
+			return [make_password(p) for p in passwords]
+		with _pool(workers) as pool:
+			return hash_passwords(passwords, pool=pool)
+	return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (_workers(workers) * 4))))
+
+
+def _workers(workers):
+	if workers is None:
+		workers = getattr(settings, "STUDENT_IMPORT_WORKERS", 1)
+	return workers or os.cpu_count() or 1
+
+
+def _pool(workers):
+	# django.setup() lets the workers hash with the project's PASSWORD_HASHERS under spawn
+	return ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+
+
+def read_csv(file):
+	"""Rows of a CSV upload as tuples, header first, read as they are consumed."""
+	text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+	reader = csv.reader(text)
+	try:
+		while True:
+			try:
+				row = next(reader)
+			except StopIteration:
+				return
+			except (csv.Error, UnicodeDecodeError) as e:
+				raise UnreadableFile(f"Failed to read CSV file: {e}") from e
+			yield tuple(row)
+	finally:
+		# leave the upload open for Django to clean up
+		text.detach()
+
+
+def read_xlsx(file):
+	"""Rows of the active sheet of an .xlsx upload, header first, read as they are consumed (openpyxl read-only mode).
+
+	Raises ImportError when openpyxl isn't installed.
+	"""
+	import openpyxl
+
+	try:
+		workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+	except Exception as e:
+		raise UnreadableFile(f"Failed to read Excel file: {e}") from e
+	try:
+		yield from workbook.active.iter_rows(values_only=True)
+	finally:
+		workbook.close()
+
+
+def read_sheet(upload):
+	"""Row iterator for an uploaded .csv or .xlsx file."""
+	if upload.name.lower().endswith(".csv") or upload.content_type in ("text/csv", "application/csv"):
+		return read_csv(upload.file)
+	return read_xlsx(upload.file)
+
+
+class ImportReport:
+	"""What became of each row, as StudentImportView returns it."""
+
+	def __init__(self):
+		self.created, self.skipped, self.errors = [], [], []
+		# why the rest of the file couldn't be read, if it broke part way
+		self.unreadable = None
+
+	def add_created(self, row, student_id, username):
+		self.created.append({"row": row, "student_id": student_id, "username": username})
+
+	def add_skipped(self, row, name, student_id, dob):
+		self.skipped.append({
+			"row": row, "name": name, "reason": "Student already exists",
+			"student_id": student_id, "dob": dob.strftime("%Y-%m-%d") if dob else None,
+		})
+
+	def add_error(self, row, error):
+		self.errors.append({"row": row, "error": error})
+
+	def add_unreadable(self, row, error):
+		"""The file broke at `row`: nothing from there on was read."""
+		self.unreadable = error
+		self.add_error(row, f"{error}; this row and the ones after it were not imported")
+
+	def __str__(self):
+		return f"{len(self.created)} created, {len(self.skipped)} skipped, {len(self.errors)} errors"
+
+	def as_dict(self):
+		return {
+			"created": self.created, "updated": [], "skipped": self.skipped,
+			"errors": sorted(self.errors, key=lambda e: e["row"]),
+		}
+
+
+def _chunks(items, size):
+	chunk = []
+	for item in items:
+		chunk.append(item)
+		if len(chunk) == size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+def _numbered(rows, report):
+	"""(row number, row) from row 2 on; a file that breaks part way ends here, reported, rather than raising."""
+	idx = 1
+	try:
+		for idx, row in enumerate(rows, start=2):
+			yield idx, row
+	except UnreadableFile as e:
+		report.add_unreadable(idx + 1, str(e))
+
+
+def import_students(header, rows, workers=None, timings=None, report=None):
+	"""Create the students of a spreadsheet; returns the ImportReport (`report` if given).
+
+	`rows` are the data rows (row 2 onwards), any iterable: they are read
+	CHUNK_SIZE at a time. Existing students (same student id or email) are
+	skipped; rows that can't be imported are reported as errors with their
+	row number. When `rows` raises UnreadableFile part way, the rows read
+	before it are still imported and the report's `unreadable` says why the
+	rest wasn't. `timings`, if given, receives the seconds spent in each phase.
+	"""
+	columns = find_columns(header)
+	report = ImportReport() if report is None else report
+	timings = {} if timings is None else timings
+	workers = _workers(workers)
+	state = {"majors": dict(Major.objects.values_list("name", "id")), "created": 0, "workers": workers}
+	with contextlib.ExitStack() as stack:
+		pool = stack.enter_context(_pool(workers)) if workers > 1 else None
+		for chunk in _chunks(_numbered(rows, report), CHUNK_SIZE):
+			_import_chunk(chunk, columns, pool, state, timings, report)
+	if state["created"]:
+		# what the post_save handlers of User and StudentProfile would have bumped
+		versioning.bump(versioning.STUDENTS, versioning.TUTORS)
+	logger.info(f"Student import: {report}")
+	return report
+
+
+def _import_chunk(chunk, columns, pool, state, timings, report):
+	started = time.perf_counter()
+
+	def lap(phase):
+		nonlocal started
+		now = time.perf_counter()
+		timings[phase] = timings.get(phase, 0) + now - started
+		started = now
+
+	User = get_user_model()
+	candidates = []
+	for idx, row in chunk:
+		if not any(cell not in (None, "") for cell in row):
+			continue  # blank line
+		name, dob_val, email, student_id = (_cell(row, columns[f]) for f in ("name", "dob", "email", "student_id"))
+		if not all((name, dob_val, email, student_id)):
+			report.add_error(idx, "Missing one of required fields: name, dob, email, student_id")
+			continue
+		try:
+			dob = parse_dob(dob_val)
+		except ValueError as e:
+			report.add_error(idx, str(e))
+			continue
+		major = _cell(row, columns["major"])
+		candidates.append((idx, str(name).strip(), dob, str(email).strip(), str(student_id).strip(), str(major).strip() if major else ""))
+	lap("parse")
+	if not candidates:
+		return
+
+	# students and usernames that already exist, earlier chunks of this file included
+	by_sid, by_email = {}, {}
+	existing = StudentProfile.objects.filter(
+		Q(student_id__in={c[4] for c in candidates}) | Q(email__in={c[3] for c in candidates})
+	).values_list("student_id", "email", "dob")
+	for sid, email, dob in existing:
+		by_sid[sid] = by_email[email] = (sid, dob)
+	names = {User.normalize_username(c[1]) for c in candidates}
+	usernames = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+	lap("lookup")
+
+	accepted = []
+	for idx, name, dob, email, sid, major in candidates:
+		found = by_sid.get(sid) or by_email.get(email)
+		if found:
+			report.add_skipped(idx, name, *found)
+			continue
+		username = User.normalize_username(name)
+		if username in usernames:
+			report.add_error(idx, f"Username '{username}' is already taken")
+			continue
+		# later rows of the chunk see this one as existing
+		by_sid[sid] = by_email[email] = (sid, dob)
+		usernames.add(username)
+		accepted.append((idx, username, name, dob, email, sid, major))
+
+	majors = state["majors"]
+	missing = sorted({row[6] for row in accepted if row[6] and row[6] not in majors})
+	if missing:
+		Major.objects.bulk_create([Major(name=m) for m in missing], ignore_conflicts=True)
+		majors.update(Major.objects.filter(name__in=missing).values_list("name", "id"))
+		versioning.bump(versioning.MAJORS)
+	lap("resolve")
+	if not accepted:
+		return
+
+	passwords = [f"{sid}{dob.strftime('%d%m%y')}" for _, _, _, dob, _, sid, _ in accepted]
+	if pool is not None and len(passwords) >= POOL_MIN_PASSWORDS:
+		hashes = hash_passwords(passwords, workers=state["workers"], pool=pool)
+	else:
+		hashes = hash_passwords(passwords, workers=1)
+	lap("hash")
+
+	try:
+		# one transaction per chunk: hashing happens outside it, and a failed chunk leaves the others
+		with transaction.atomic():
+			users = User.objects.bulk_create([
+				User(username=username, email=BaseUserManager.normalize_email(email), password=password, role="student")
+				for (_, username, _, _, email, _, _), password in zip(accepted, hashes)
+			], batch_size=INSERT_BATCH_SIZE)
+			if users and users[0].pk is None:
+				# backends that don't return ids from bulk inserts (MySQL)
+				ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list("username", "id"))
+				for user in users:
+					user.pk = ids[user.username]
+			# by id: assigning user= caches each object on the other, a reference cycle per row
+			StudentProfile.objects.bulk_create([
+				StudentProfile(user_id=user.pk, name=name, email=email, dob=dob, student_id=sid, major_id=majors.get(major), year=1)
+				for user, (_, _, name, dob, email, sid, major) in zip(users, accepted)
+			], batch_size=INSERT_BATCH_SIZE)
+	except IntegrityError as e:
+		# a student created concurrently with this import
+		for idx, *_ in accepted:
+			report.add_error(idx, f"Not imported: {e}")
+	else:
+		state["created"] += len(accepted)
+		for idx, username, _, _, _, sid, _ in accepted:
+			report.add_created(idx, sid, username)
+	lap("write")
@@ -0,0 +1 @@
+# commands package for Django management commands
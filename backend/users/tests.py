@@ -1,3 +1,235 @@
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password
+from rest_framework.test import APITestCase
+from calendar_app import versioning
+from calendar_app.models import AuditLog, Major
+from users import importing
+from users.models import StudentProfile
+import csv
+import datetime
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+from unittest import mock
 
-# Create your tests here.
+User = get_user_model()
+
+HEADER = ("Student Name", "Date of Birth", "Email", "Student ID", "Major")
+
+# PBKDF2 costs ~0.3s a password; these tests are about the pipeline, not the hash
+FAST_HASHER = override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+
+
+def student_rows(n, start=0, major="CS"):
+    return [(f"Student {i}", "01/02/2003", f"s{i}@uni.test", f"S{i:05d}", major) for i in range(start, start + n)]
+
+
+def student_csv(rows, header=HEADER):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return out.getvalue().encode()
+
+
+class CountingReport(importing.ImportReport):
+    """Keeps counts instead of a dict per row, so only the ingestion shows in a memory measurement."""
+
+    def __init__(self):
+        super().__init__()
+        self.created = self.skipped = self.errors = 0
+
+    def add_created(self, row, student_id, username):
+        self.created += 1
+
+    def add_skipped(self, row, name, student_id, dob):
+        self.skipped += 1
+
+    def add_error(self, row, error):
+        self.errors += 1
+
+    def __str__(self):
+        return f"{self.created} created, {self.skipped} skipped, {self.errors} errors"
+
+
+@FAST_HASHER
+class StudentImportTests(TestCase):
+    def test_creates_each_student_once(self):
+        result = importing.import_students(HEADER, student_rows(3) + [("Other", datetime.date(2004, 5, 6), "o@uni.test", "S9", "Maths")], workers=1).as_dict()
+        self.assertEqual(result["errors"], [])
+        self.assertEqual([c["row"] for c in result["created"]], [2, 3, 4, 5])
+        self.assertEqual(StudentProfile.objects.count(), 4)
+
+        profile = StudentProfile.objects.select_related("user", "major").get(student_id="S9")
+        self.assertEqual((profile.user.username, profile.user.role, profile.major.name, profile.year), ("Other", "student", "Maths", 1))
+        self.assertTrue(check_password("S9060504", profile.user.password))
+        self.assertEqual(set(Major.objects.values_list("name", flat=True)), {"CS", "Maths"})
+
+    def test_skips_and_errors(self):
+        User.objects.create_user(username="Taken", password="x")
+        existing = StudentProfile.objects.create(name="Old", email="old@uni.test", dob=datetime.date(2001, 1, 1), student_id="S1", year=2)
+        rows = [
+            ("New", "2003-02-01", "new@uni.test", "S2"),
+            ("Again", "2003-02-01", "other@uni.test", "S1"),      # existing student id
+            ("Again", "2003-02-01", "old@uni.test", "S3"),        # existing email
+            ("Copy", "2003-02-01", "new@uni.test", "S4"),         # same email as row 2
+            ("Taken", "2003-02-01", "taken@uni.test", "S5"),      # username in use
+            ("No dob", None, "x@uni.test", "S6"),
+            ("Bad dob", "yesterday", "y@uni.test", "S7"),
+        ]
+        result = importing.import_students(HEADER[:4], rows, workers=1).as_dict()
+        self.assertEqual([c["student_id"] for c in result["created"]], ["S2"])
+        self.assertEqual(
+            [(s["row"], s["student_id"], s["dob"]) for s in result["skipped"]],
+            [(3, "S1", "2001-01-01"), (4, "S1", "2001-01-01"), (5, "S2", "2003-02-01")],
+        )
+        self.assertEqual([e["row"] for e in result["errors"]], [6, 7, 8])
+        self.assertIn("Username 'Taken' is already taken", result["errors"][0]["error"])
+        self.assertEqual(StudentProfile.objects.exclude(pk=existing.pk).get().student_id, "S2")
+
+    def test_query_count_does_not_grow_with_rows(self):
+        Major.objects.create(name="CS")
+
+        def run(n, start):
+            with CaptureQueriesContext(connection) as ctx:
+                report = importing.import_students(HEADER, student_rows(n, start=start), workers=1)
+            self.assertEqual(len(report.created), n)
+            sql = [q["sql"] for q in ctx.captured_queries]
+            inserts = [q for q in sql if q.startswith("INSERT")]
+            return len(sql) - len(inserts), len(inserts)
+
+        small_reads, small_inserts = run(10, 0)
+        large_reads, large_inserts = run(500, 10)
+        # the prefetches and major lookup are a fixed number of queries...
+        self.assertEqual(small_reads, large_reads)
+        # ...and rows are inserted in chunks (SQLite caps parameters per statement)
+        self.assertEqual(small_inserts, 2)
+        self.assertLess(large_inserts, 500 // 20)
+
+    def test_rows_are_imported_in_chunks(self):
+        def rows():
+            yield from student_rows(5)
+            yield ("", None, "", "", "")                      # blank line
+            yield ("Dup", "01/02/2003", "dup@uni.test", "S00001", "CS")   # student of the first chunk
+            yield from student_rows(2, start=5)
+
+        with mock.patch.object(importing, "CHUNK_SIZE", 3):
+            result = importing.import_students(HEADER, rows(), workers=1).as_dict()
+        self.assertEqual([c["row"] for c in result["created"]], [2, 3, 4, 5, 6, 9, 10])
+        self.assertEqual([(s["row"], s["student_id"]) for s in result["skipped"]], [(8, "S00001")])
+        self.assertEqual(result["errors"], [])
+        self.assertEqual(Major.objects.filter(name="CS").count(), 1)
+
+    def test_read_csv(self):
+        data = student_csv([("Ana", "2003-02-01", "ana@uni.test", "S1", "CS"), (), ("Bo", "2003-02-01", "bo@uni.test", "S2", "")])
+        rows = importing.read_csv(io.BytesIO(b"\xef\xbb\xbf" + data))
+        self.assertEqual(next(rows), HEADER)
+        result = importing.import_students(HEADER, rows, workers=1).as_dict()
+        self.assertEqual([c["student_id"] for c in result["created"]], ["S1", "S2"])
+
+        with self.assertRaises(importing.UnreadableFile):
+            list(importing.read_csv(io.BytesIO(b"name,dob\n\xff\xfe,1\n")))
+
+    def test_file_broken_part_way(self):
+        # decoded a block at a time: the rows of the blocks before the bad bytes are read
+        rows = importing.read_csv(io.BytesIO(student_csv(student_rows(400)) + b"\xff\xfe,1\n"))
+        before = versioning.versions([versioning.STUDENTS])
+        report = importing.import_students(next(rows), rows, workers=1)
+        self.assertTrue(0 < len(report.created) < 400)
+        self.assertEqual(StudentProfile.objects.count(), len(report.created))
+        self.assertIn("Failed to read CSV file", report.unreadable)
+        self.assertEqual([e["row"] for e in report.errors], [len(report.created) + 2])
+        # the students created so far invalidate as a complete import does
+        self.assertNotEqual(versioning.versions([versioning.STUDENTS]), before)
+
+    def test_memory_does_not_grow_with_the_file(self):
+        Major.objects.create(name="CS")
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        def peak(n, start):
+            path = os.path.join(directory, f"{n}.csv")
+            with open(path, "wb") as f:
+                f.write(student_csv(student_rows(n, start=start)))
+            report = CountingReport()
+            with open(path, "rb") as f:
+                tracemalloc.start()
+                try:
+                    rows = importing.read_csv(f)
+                    importing.import_students(next(rows), rows, workers=1, report=report)
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+            self.assertEqual(report.created, n)
+            return peak
+
+        with mock.patch.object(importing, "CHUNK_SIZE", 200):
+            # fills the interpreter's free lists, whose state otherwise depends on the tests that ran before
+            peak(1000, 0)
+            small = peak(2000, 1000)
+            large = peak(10000, 3000)
+        # five times the rows, about the same peak: it follows the chunk size, not the file
+        self.assertLess(large, small * 1.5)
+
+    def test_passwords_are_hashed_in_a_pool(self):
+        passwords = [f"pw{i}" for i in range(importing.POOL_MIN_PASSWORDS + 6)]
+        hashes = importing.hash_passwords(passwords, workers=2)
+        self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+
+    def test_default_import_hashes_in_process(self):
+        passwords = [f"pw{i}" for i in range(importing.POOL_MIN_PASSWORDS + 6)]
+        with mock.patch.object(importing, "_pool") as pool:
+            hashes = importing.hash_passwords(passwords)
+            importing.import_students(HEADER, student_rows(importing.POOL_MIN_PASSWORDS + 6))
+        pool.assert_not_called()
+        self.assertTrue(all(check_password(p, h) for p, h in zip(passwords, hashes)))
+
+    def test_missing_columns(self):
+        with self.assertRaises(importing.MissingColumns) as ctx:
+            importing.import_students(("name", "email"), [], workers=1)
+        self.assertEqual(ctx.exception.missing, ["dob / date of birth", "student id"])
+
+
+@FAST_HASHER
+class StudentImportViewTests(APITestCase):
+    url = "/api/users/import-students/"
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username="admin", password="x", role="administrator"))
+
+    def upload(self, content, name="students.csv"):
+        return self.client.post(self.url, {"file": SimpleUploadedFile(name, content, content_type="text/csv")}, format="multipart")
+
+    def test_csv_upload(self):
+        res = self.upload(student_csv(student_rows(3) + [("Bad", "soon", "b@uni.test", "S9", "")]))
+        self.assertEqual(res.status_code, 200, res.data)
+        self.assertEqual([c["student_id"] for c in res.data["created"]], ["S00000", "S00001", "S00002"])
+        self.assertEqual([e["row"] for e in res.data["errors"]], [5])
+        self.assertEqual(StudentProfile.objects.count(), 3)
+
+    def test_file_broken_part_way(self):
+        res = self.upload(student_csv(student_rows(400)) + b"\xff\xfe,1\n")
+        self.assertEqual(res.status_code, 200, res.data)
+        created = len(res.data["created"])
+        self.assertTrue(0 < created < 400)
+        self.assertEqual(res.data["errors"][-1]["row"], created + 2)
+        self.assertEqual(AuditLog.objects.get(action="createStudent").notes, f"Imported {created} students; skipped 0; errors 1")
+
+        # nothing created before it broke: a 400, with the report
+        res = self.upload(student_csv(student_rows(400)) + b"\xff\xfe,1\n")
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("Failed to read CSV file", res.data["detail"])
+        self.assertEqual((len(res.data["skipped"]), res.data["errors"][-1]["row"]), (created, created + 2))
+        self.assertEqual(AuditLog.objects.filter(action="createStudent").count(), 1)
+
+    def test_bad_files(self):
+        self.assertEqual(self.upload(b"").data["detail"], "File is empty.")
+        res = self.upload(student_csv([], header=("name", "email")))
+        self.assertEqual((res.status_code, res.data["found_headers"]), (400, ("name", "email")))
+        self.assertEqual(self.upload(b"name,dob\n\xff\xfe,1\n").status_code, 400)
@@ -7,12 +7,15 @@ from rest_framework.pagination import PageNumberPagination
 from django.db import models
 
 from .models import StudentProfile
-from calendar_app.models import Major, AuditLog
+from . import importing
+from calendar_app.models import Major
+from calendar_app import audit, timetables, versioning
+from calendar_app.versioning import conditional_get
+from django.utils.decorators import method_decorator
 from .serializers import StudentProfileSerializer, UserSerializer
 from .permissions import IsDAAOrAdminOrHasModelPerm
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
 from django.db.models import F
 from .serializers import StaffSerializer, StaffCreateSerializer
 from rest_framework import generics
@@ -48,7 +51,7 @@ class StudentProfileCreateView(generics.CreateAPIView):
 					sp = StudentProfile.objects.filter(id=created_id).first()
 					if sp:
 						try:
-							AuditLog.objects.create(user=request.user, action='createStudent', student=sp)
+							audit.record(request.user, 'createStudent', notes=f"Created student {sp.student_id}")
 						except Exception:
 							pass
 			except Exception:
@@ -57,9 +60,9 @@ class StudentProfileCreateView(generics.CreateAPIView):
 
 
 class StudentImportView(APIView):
-	"""Import students from an uploaded Excel file.
+	"""Import students from an uploaded Excel (.xlsx) or CSV file, streamed (see users.importing).
 
-	Expected Excel columns (in order or by header name):
+	Expected columns (in order or by header name):
 	  - name
 	  - dob (date or string parseable to date)
 	  - email
@@ -70,6 +73,10 @@ class StudentImportView(APIView):
 	  - email: the student's `email`
 	  - password: `student_id` + `dob` formatted as ddmmyy
 
+	A file that can't be read past some row still imports the rows before it:
+	the report lists the failure among its errors, and is a 400 only when
+	nothing was created.
+
 	The view requires `IsDAAOrAdminOrHasModelPerm` permission.
 	"""
 	parser_classes = (MultiPartParser, FormParser)
@@ -80,171 +87,36 @@ class StudentImportView(APIView):
 		if not upload:
 			return Response({"detail": "No file uploaded (use 'file' form field)."}, status=status.HTTP_400_BAD_REQUEST)
 
-		# lazy import so project doesn't hard-require openpyxl until used
+		rows = importing.read_sheet(upload)
 		try:
-			import openpyxl
-		except Exception:
-			return Response({"detail": "openpyxl is required to import Excel files. Install it in your environment."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+			header = next(rows, None)
+		except ImportError:
+			return Response({"detail": "openpyxl is required to import Excel files. Install it in your environment or upload a CSV file."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+		except importing.UnreadableFile as exc:
+			return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+		if header is None:
+			return Response({"detail": "File is empty."}, status=status.HTTP_400_BAD_REQUEST)
 
 		try:
-			wb = openpyxl.load_workbook(upload, data_only=True)
-		except Exception as exc:
-			return Response({"detail": f"Failed to read Excel file: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
-
-		sheet = wb.active
-		rows = list(sheet.iter_rows(values_only=True))
-		if not rows:
-			return Response({"detail": "Excel file is empty."}, status=status.HTTP_400_BAD_REQUEST)
-
-		# Normalize headers (lowercase, collapse spaces, remove punctuation)
-		import re
-
-		def normalize(s):
-			if s is None:
-				return ""
-			s = str(s)
-			s = s.strip().lower()
-			# replace non-alphanumeric with space, collapse spaces
-			s = re.sub(r"[^0-9a-z]+", " ", s)
-			s = re.sub(r"\s+", " ", s).strip()
-			return s
-
-		raw_headers = rows[0]
-		headers = [normalize(h) for h in raw_headers]
-
-		# Flexible matching for expected columns
-		def find_col(names):
-			for i, h in enumerate(headers):
-				for n in names:
-					if normalize(n) == h:
-						return i
-			return None
-
-		# required fields
-		name_col = find_col(["name", "full name", "student name", "student_name"])
-		dob_col = find_col(["dob", "date of birth", "birthdate", "date of birth (yyyy-mm-dd)"])
-		email_col = find_col(["email", "student email", "student_email", "email address"])
-		sid_col = find_col(["student id", "student_id", "studentid", "id"])
-		major_col = find_col(["major", "department", "faculty"])
-
-		missing = []
-		if name_col is None:
-			missing.append("name / student name")
-		if dob_col is None:
-			missing.append("dob / date of birth")
-		if email_col is None:
-			missing.append("email / student email")
-		if sid_col is None:
-			missing.append("student id")
-
-		if missing:
-			return Response({"detail": f"Missing required columns in Excel header: {', '.join(missing)}", "found_headers": raw_headers}, status=status.HTTP_400_BAD_REQUEST)
-
-		user_model = get_user_model()
-		created = []
-		updated = []
-		skipped = []
-		errors = []
-
-		for idx, row in enumerate(rows[1:], start=2):
-			try:
-				name = row[name_col] if name_col is not None and name_col < len(row) else None
-				dob_val = row[dob_col] if dob_col is not None and dob_col < len(row) else None
-				email = row[email_col] if email_col is not None and email_col < len(row) else None
-				student_id = row[sid_col] if sid_col is not None and sid_col < len(row) else None
-				major_val = row[major_col] if major_col is not None and major_col < len(row) else None
-
-				if not all((name, dob_val, email, student_id)):
-					raise ValueError("Missing one of required fields: name, dob, email, student_id")
-
-				# parse dob (accept date or datetime from openpyxl, or parse strings)
-				from datetime import datetime, date
-
-				if isinstance(dob_val, datetime):
-					dob = dob_val.date()
-				elif isinstance(dob_val, date):
-					dob = dob_val
-				else:
-					# try parsing a string
-					dob = None
-					for fmt in ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y"):
-						try:
-							dob = datetime.strptime(str(dob_val).strip(), fmt).date()
-							break
-						except Exception:
-							continue
-					if dob is None:
-						raise ValueError(f"Could not parse dob '{dob_val}'")
-
-				# password: student_id + dob in ddmmyy
-				pwd = f"{str(student_id)}{dob.strftime('%d%m%y')}"
-
-				# check if student already exists by student_id or email
-				sid_clean = str(student_id).strip()
-				email_clean = str(email).strip()
-				exists_by_sid = StudentProfile.objects.filter(student_id=sid_clean).exists()
-				exists_by_email = StudentProfile.objects.filter(email=email_clean).exists()
-				if exists_by_sid or exists_by_email:
-					# try to fetch the existing profile to include details
-					existing = None
-					if exists_by_sid:
-						existing = StudentProfile.objects.filter(student_id=sid_clean).first()
-					if not existing and exists_by_email:
-						existing = StudentProfile.objects.filter(email=email_clean).first()
-
-					skipped_item = {"row": idx, "name": str(name).strip(), "reason": "Student already exists"}
-					if existing:
-						try:
-							skipped_item["student_id"] = existing.student_id
-						except Exception:
-							skipped_item["student_id"] = sid_clean
-						try:
-							skipped_item["dob"] = existing.dob.strftime("%Y-%m-%d") if existing.dob else None
-						except Exception:
-							skipped_item["dob"] = None
-
-					skipped.append(skipped_item)
-				else:
-					# create user
-					username = str(name).strip()
-					user = user_model.objects.create_user(username=username, email=email_clean, password=pwd)
-					# set role if model supports it
-					try:
-						user.role = "student"
-						user.save()
-					except Exception:
-						pass
-
-					# create student profile; set a default year=1 if not provided
-					profile_kwargs = dict(user=user, name=str(name).strip(), email=email_clean, dob=dob, student_id=sid_clean, year=1)
-					# attach major if provided
-					try:
-						if major_val:
-							major_name = str(major_val).strip()
-							if major_name:
-								major_obj, _ = Major.objects.get_or_create(name=major_name)
-								profile_kwargs['major'] = major_obj
-					except Exception:
-						pass
-
-					profile = StudentProfile.objects.create(**profile_kwargs)
-					profile = StudentProfile.objects.create(**profile_kwargs)
-					created.append({"row": idx, "student_id": profile.student_id, "username": user.username})
-					created.append({"row": idx, "student_id": profile.student_id, "username": user.username})
-			except IntegrityError as ie:
-				errors.append({"row": idx, "error": str(ie)})
-			except Exception as e:
-				errors.append({"row": idx, "error": str(e)})
+			report = importing.import_students(header, rows)
+		except importing.MissingColumns as exc:
+			return Response({"detail": str(exc), "found_headers": header}, status=status.HTTP_400_BAD_REQUEST)
+		finally:
+			rows.close()
+		result = report.as_dict()
 
 		# create aggregated audit log for import
 		try:
-			if created:
-				AuditLog.objects.create(user=request.user, action='createStudent', notes=f"Imported {len(created)} students; skipped {len(skipped)}; errors {len(errors)}")
+			if result["created"]:
+				audit.record(request.user, 'createStudent', notes=f"Imported {len(result['created'])} students; skipped {len(result['skipped'])}; errors {len(result['errors'])}")
 		except Exception:
 			pass
 
+		if report.unreadable and not result["created"]:
+			return Response({"detail": report.unreadable, **result}, status=status.HTTP_400_BAD_REQUEST)
 		# include updated/skipped arrays for frontend summary compatibility
-		return Response({"created": created, "updated": updated, "skipped": skipped, "errors": errors}, status=status.HTTP_200_OK)
+		# (a file that broke part way lists the failure among the errors)
+		return Response(result, status=status.HTTP_200_OK)
 
 
 class StudentPagePagination(PageNumberPagination):
@@ -291,7 +163,7 @@ class StaffCreateView(generics.CreateAPIView):
 		# return created user using StaffSerializer
 		out = StaffSerializer(user, context={"request": request}).data
 		try:
-			AuditLog.objects.create(user=request.user, action='createStaff', notes=f"Created staff user {out.get('email')}")
+			audit.record(request.user, 'createStaff', notes=f"Created staff user {out.get('email')}")
 		except Exception:
 			pass
 		return Response(out, status=status.HTTP_201_CREATED)
@@ -336,6 +208,7 @@ class MajorListView(APIView):
 	"""Return list of majors for frontend filters."""
 	permission_classes = (IsDAAOrAdminOrHasModelPerm,)
 
+	@method_decorator(conditional_get(versioning.MAJORS))
 	def get(self, request):
 		majors = Major.objects.all().order_by('name')
 		data = [{"id": m.id, "name": m.name} for m in majors]
@@ -359,10 +232,14 @@ class BulkPromoteView(APIView):
 		MAX_YEAR = 4
 		# find eligible: in ids, year < MAX_YEAR, can_advance True
 		eligible_qs = StudentProfile.objects.filter(id__in=ids, year__lt=MAX_YEAR, can_advance=True)
-		eligible_ids = list(eligible_qs.values_list('id', flat=True))
+		eligible = list(eligible_qs.values_list('id', 'user_id'))
+		eligible_ids = [sid for sid, _ in eligible]
 
 		# update by incrementing year
 		updated_count = eligible_qs.update(year=F('year') + 1)
+		# update() sends no post_save, so the calendar's per-student caches are dropped by hand
+		versioning.bump(versioning.STUDENTS)
+		timetables.forget_students([uid for _, uid in eligible])
 
 		promoted_ids = eligible_ids
 
@@ -386,7 +263,7 @@ class BulkPromoteView(APIView):
 
 		# create an aggregated audit log for the promotion operation
 		try:
-			AuditLog.objects.create(user=request.user, action='promoteStudent', notes=f"Promoted {updated_count} students; skipped {len(skipped)}")
+			audit.record(request.user, 'promoteStudent', notes=f"Promoted {updated_count} students; skipped {len(skipped)}")
 		except Exception:
 			pass
 
@@ -1,4 +1,4 @@
-interface AuditLog {
+export interface AuditLog {
   id: number;
   user_email: string;
   action: string;
@@ -8,13 +8,25 @@ interface AuditLog {
 
 const API_BASE = (import.meta.env && (import.meta.env.VITE_API_BASE as string)) || "";
 
-export const getAuditLogs = async (): Promise<AuditLog[]> => {
+// entries fetched per request; the trail loads further pages only when they are asked for
+const AUDIT_PAGE_SIZE = 100;
+
+export interface AuditLogPage {
+  results: AuditLog[];
+  nextCursor: string | null;
+}
+
+// One page of the log, newest first; pass the previous page's nextCursor to continue
+export const getAuditLogs = async (cursor: string | null = null): Promise<AuditLogPage> => {
   const token = localStorage.getItem("accessToken");
   const headers: any = {};
   if (token) headers.Authorization = `Bearer ${token}`;
-  const res = await fetch(`${API_BASE}/api/calendar/audit/logs/`, { headers });
+  let url = `${API_BASE}/api/calendar/audit/logs/?limit=${AUDIT_PAGE_SIZE}`;
+  if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+  const res = await fetch(url, { headers });
   if (!res.ok) throw new Error("Failed to fetch audit logs");
-  return await res.json();
+  const data = await res.json();
+  return { results: data.results, nextCursor: data.next_cursor || null };
 };
 
 export const addAuditLog = async (action: string, eventId: number) => {
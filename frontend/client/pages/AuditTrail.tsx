@@ -2,29 +2,25 @@ import React, { useEffect, useState } from "react";
 import { getLocalProfile } from "@/lib/profileService";
 import { Button } from "@/components/ui/button";
 import Sidebar from "@/components/Sidebar";
-import { getAuditLogs } from "@/lib/auditService";
-
-interface AuditLog {
-  id: number;
-  user_email: string;
-  action: string;
-  event_details: string;
-  timestamp: string;
-}
+import { getAuditLogs, type AuditLog } from "@/lib/auditService";
 
 export default function AuditTrail() {
   const [logs, setLogs] = useState<AuditLog[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [currentPage, setCurrentPage] = useState(1);
+  // cursor of the next unloaded page of the log; null once everything is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const logsPerPage = 10;
   const profile = getLocalProfile();
 
   useEffect(() => {
     const fetchLogs = async () => {
       try {
-        const fetchedLogs = await getAuditLogs();
-        setLogs(fetchedLogs);
+        const page = await getAuditLogs();
+        setLogs(page.results);
+        setNextCursor(page.nextCursor);
       } catch (err) {
         setError("Failed to load audit logs");
       } finally {
@@ -34,6 +30,28 @@ export default function AuditTrail() {
     fetchLogs();
   }, []);
 
+  const loadedPages = Math.ceil(logs.length / logsPerPage);
+
+  // "Next" past the loaded entries fetches the following page of the log
+  const goToNextPage = async () => {
+    if (currentPage < loadedPages) {
+      setCurrentPage(currentPage + 1);
+      return;
+    }
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await getAuditLogs(nextCursor);
+      setLogs((loaded) => [...loaded, ...page.results]);
+      setNextCursor(page.nextCursor);
+      if (page.results.length) setCurrentPage(currentPage + 1);
+    } catch (err) {
+      setError("Failed to load audit logs");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (!profile || profile.role !== "administrator") {
     return (
       <div className="flex min-h-screen bg-gray-50 font-sans text-gray-900">
@@ -82,8 +100,8 @@ export default function AuditTrail() {
 
               <div className="flex items-center gap-3">
                 <div className="hidden sm:flex flex-col text-right">
-                  <span className="text-xs text-gray-500">Total Logs</span>
-                  <span className="text-lg font-semibold text-gray-900">{logs.length}</span>
+                  <span className="text-xs text-gray-500">{nextCursor ? "Loaded Logs" : "Total Logs"}</span>
+                  <span className="text-lg font-semibold text-gray-900">{logs.length}{nextCursor ? "+" : ""}</span>
                 </div>
                 <div>
                   <Button variant="outline" className="hidden sm:inline-flex" onClick={() => window.location.reload()}>
@@ -119,10 +137,10 @@ export default function AuditTrail() {
                   ))}
                 </div>
 
-                {logs.length > logsPerPage && (
+                {(logs.length > logsPerPage || nextCursor) && (
                   <div className="mt-6 px-6 flex items-center justify-between">
                     <div className="text-sm text-gray-600">
-                      Showing {(currentPage - 1) * logsPerPage + 1}-{Math.min(currentPage * logsPerPage, logs.length)} of {logs.length} logs
+                      Showing {(currentPage - 1) * logsPerPage + 1}-{Math.min(currentPage * logsPerPage, logs.length)} of {logs.length}{nextCursor ? "+" : ""} logs
                     </div>
                     <div className="flex gap-2">
                       <Button
@@ -133,7 +151,7 @@ export default function AuditTrail() {
                         Previous
                       </Button>
                       <div className="flex items-center gap-2">
-                        {Array.from({ length: Math.ceil(logs.length / logsPerPage) }).map((_, i) => (
+                        {Array.from({ length: loadedPages }).map((_, i) => (
                           <button
                             key={i + 1}
                             onClick={() => setCurrentPage(i + 1)}
@@ -149,10 +167,10 @@ export default function AuditTrail() {
                       </div>
                       <Button
                         variant="outline"
-                        disabled={currentPage === Math.ceil(logs.length / logsPerPage)}
-                        onClick={() => setCurrentPage(currentPage + 1)}
+                        disabled={loadingMore || (currentPage === loadedPages && !nextCursor)}
+                        onClick={goToNextPage}
                       >
-                        Next
+                        {loadingMore ? "Loading..." : "Next"}
                       </Button>
                     </div>
                   </div>
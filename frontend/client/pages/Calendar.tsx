@@ -237,15 +237,27 @@ export default function CalendarPage() {
         console.log("Token exists:", !!token, "Token length:", token?.length);
         console.log("Headers being sent:", headers);
         console.log("API_BASE:", API_BASE);
-        console.log("Full URL:", `${API_BASE}/api/calendar/scheduledevents/`);
-        const res = await fetch(`${API_BASE}/api/calendar/scheduledevents/`, { headers });
-        if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
-        const data = await res.json();
-        console.log("Fetched events raw:", data);
+        // only fetch the weeks currently visible (month grid or week view)
+        const rangeStart = viewMode === 'week' ? new Date(weekStart) : getMonthMatrix(displayMonth)[0][0];
+        const rangeEnd = new Date(rangeStart);
+        rangeEnd.setDate(rangeStart.getDate() + (viewMode === 'week' ? 6 : 41));
+        const baseUrl = `${API_BASE}/api/calendar/scheduledevents/?start=${formatDateLocal(rangeStart)}&end=${formatDateLocal(rangeEnd)}`;
+        console.log("Full URL:", baseUrl);
+        // follow next_cursor until the window is complete
+        const collected: EventItem[] = [];
+        let cursor: string | null = null;
+        do {
+          const url = cursor ? `${baseUrl}&cursor=${encodeURIComponent(cursor)}` : baseUrl;
+          const res = await fetch(url, { headers });
+          if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
+          const data = await res.json();
+          console.log("Fetched events raw:", data);
+          // normalize to array of events
+          collected.push(...(Array.isArray(data) ? data : (data.results || [])));
+          cursor = Array.isArray(data) ? null : (data.next_cursor || null);
+        } while (cursor && mounted);
         if (!mounted) return;
-        // normalize to array of events
-        const normalized = Array.isArray(data) ? data : (data.results || []);
-        setEvents(normalized);
+        setEvents(collected);
       } catch (err: any) {
         setError(String(err));
         console.warn("Failed to fetch /scheduledevents/, trying /events/:", err);
@@ -269,7 +281,7 @@ export default function CalendarPage() {
     };
     fetchEvents();
     return () => { mounted = false; };
-  }, [editingEvent]); // Reload events when editing finishes (simple way)
+  }, [editingEvent, viewMode, displayMonth, weekStart]); // Reload events when editing finishes or the visible range changes
 
   const handleEditDone = () => {
     setEditingEvent(null);
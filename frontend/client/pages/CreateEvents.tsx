@@ -27,6 +27,13 @@ export function CreateEventForm({ onDone, initialData }: CreateEventFormProps) {
   const [endMinute, setEndMinute] = useState<string>("");
   const [notes, setNotes] = useState("");
   const [saved, setSaved] = useState(false);
+  // A repeating event is changed either for the opened occurrence or for the whole series
+  const isSeries = Boolean(initialData?.recurrence);
+  const [scope, setScope] = useState<'occurrence' | 'series'>('occurrence');
+  const scopeFields = () => {
+    if (!isSeries) return {};
+    return scope === 'occurrence' ? { scope, occurrence: initialData.date } : { scope };
+  };
 
   // Pre-fill form if initialData is provided
   useEffect(() => {
@@ -210,7 +217,7 @@ export function CreateEventForm({ onDone, initialData }: CreateEventFormProps) {
     }
 
     // Submit to backend API
-    const payload = {
+    const payload: any = {
       title,
       date,
       course: course,
@@ -221,7 +228,10 @@ export function CreateEventForm({ onDone, initialData }: CreateEventFormProps) {
       room: location,
       notes,
       status: "pending",
+      ...scopeFields(),
     };
+    // the form shows the opened occurrence's date; never move the series anchor to it
+    if (isSeries && scope === 'series') delete payload.date;
     try {
       const token = localStorage.getItem("accessToken");
       const headers: any = { 'Content-Type': 'application/json' };
@@ -286,10 +296,20 @@ export function CreateEventForm({ onDone, initialData }: CreateEventFormProps) {
         <input value={title} onChange={(e) => setTitle(e.target.value)} className="mt-1 block w-full rounded-md border border-gray-200 shadow-sm px-3 py-2" placeholder="Short, descriptive title" />
       </div>
 
+      {isSeries && (
+        <div>
+          <label className="block text-sm font-medium text-gray-700">Apply changes to</label>
+          <select value={scope} onChange={(e) => setScope(e.target.value as 'occurrence' | 'series')} className="mt-1 block w-full rounded-md border border-gray-200 shadow-sm px-3 py-2">
+            <option value="occurrence">This occurrence ({initialData.date})</option>
+            <option value="series">Whole series</option>
+          </select>
+        </div>
+      )}
+
       <div className="grid grid-cols-2 gap-4">
         <div>
           <label className="block text-sm font-medium text-gray-700">Date</label>
-          <input type="date" value={date} onChange={(e) => setDate(e.target.value)} className="mt-1 block w-full rounded-md border border-gray-200 shadow-sm px-3 py-2" />
+          <input type="date" value={date} onChange={(e) => setDate(e.target.value)} disabled={isSeries && scope === 'series'} className="mt-1 block w-full rounded-md border border-gray-200 shadow-sm px-3 py-2" />
         </div>
         <div>
           {/* placeholder column to keep layout consistent until location appears after time selectors */}
@@ -402,7 +422,7 @@ export function CreateEventForm({ onDone, initialData }: CreateEventFormProps) {
                 const res = await fetch(`${API_BASE}/api/calendar/edit_event/${initialData.id}/`, {
                   method: 'PUT',
                   headers,
-                  body: JSON.stringify({ action: 'cancel' }),
+                  body: JSON.stringify({ action: 'cancel', ...scopeFields() }),
                 });
 
                 if (!res.ok) {